@@ -0,0 +1,58 @@
+# Measures with tracemalloc how much memory the parsed tree of a generated program keeps alive.
+# Pass --root to measure another checkout, such as the commit before nodes were slotted.
+import argparse, gc, os, sys, time, tracemalloc
+
+argument_parser = argparse.ArgumentParser(description='Measure the memory retained by lexing and parsing a generated program.')
+argument_parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), help='checkout whose fresh package is measured')
+argument_parser.add_argument('--sizes', type=float, nargs='+', default=[0.5, 2.0], help='sizes of the generated programs in megabytes (default: 0.5 2)')
+arguments = argument_parser.parse_args()
+
+sys.path.insert(0, os.path.abspath(arguments.root))
+sys.setrecursionlimit(100000)
+from fresh.lexer import Lexer
+from fresh.parser import Parser
+
+
+PROGRAMS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'programs')
+# testing.fr is a scratch file that does not parse
+PROGRAMS = [
+    open(os.path.join(PROGRAMS_DIRECTORY, name)).read() for name in sorted(os.listdir(PROGRAMS_DIRECTORY))
+    if name.endswith('.fr') and name != 'testing.fr'
+]
+
+
+# The example programs over and over, with generated lines in between so names and literals keep changing
+def generate(megabytes):
+    parts = []
+    size = 0
+    while size < megabytes * 1000 * 1000:
+        i = len(parts)
+        part = '\n'.join([
+            PROGRAMS[i % len(PROGRAMS)],
+            f'set v{i} = (v{i % 7} + {i}) * 2.5 - "str{i}" ? 3 // comment',
+            f'func f{i}(a, b) -> if a < b then a else [b, 1, 2]',
+            '',
+        ])
+        parts.append(part)
+        size += len(part)
+    return ''.join(parts)
+
+
+for megabytes in arguments.sizes:
+    text = generate(megabytes)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    tokens, error = Lexer('<benchmark>', text, False).make_tokens()
+    result = Parser(tokens).parse()
+    if error or result.error:
+        sys.exit((error or result.error).as_string())
+    tree = result.node
+    elapsed = time.perf_counter() - start
+    # The tokens are only needed while parsing, the tree is what stays around
+    del tokens, result
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{len(text) / 1000 / 1000:.1f} MB program: retained {retained / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB, lex + parse {elapsed:.2f}s')
+    del tree
@@ -0,0 +1,57 @@
+# Times programs that mostly make calls: recursive fib and a loop calling small helpers.
+# Pass --root to time another checkout, such as the commit before the call path changed.
+import argparse, contextlib, inspect, io, os, sys, time
+
+argument_parser = argparse.ArgumentParser(description='Time call-heavy Fresh programs on every engine.')
+argument_parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), help='checkout whose fresh package is timed')
+argument_parser.add_argument('--fib', type=int, default=22, help='argument of the recursive fib (default: 22)')
+argument_parser.add_argument('--calls', type=int, default=100000, help='helper calls made by the loop (default: 100000)')
+argument_parser.add_argument('--engines', nargs='+', help='engines to time (default: all of them)')
+argument_parser.add_argument('--repeat', type=int, default=3, help='runs to take the best of (default: 3)')
+arguments = argument_parser.parse_args()
+
+sys.path.insert(0, os.path.abspath(arguments.root))
+sys.setrecursionlimit(100000)
+import fresh.run
+
+# Checkouts from before the other engines only have the interpreter
+ENGINES = getattr(fresh.run, 'ENGINES', ('interpreter',))
+# fib is pure, so memoization is turned off where there is any to keep timing the calls themselves
+OPTIONS = {'memo_size': 0} if 'memo_size' in inspect.signature(fresh.run.run).parameters else {}
+
+PROGRAMS = {
+    'fib': f'''func fib(n)
+    if n < 2 then return n
+    return fib(n - 1) + fib(n - 2)
+end
+log(fib({arguments.fib}))
+''',
+    'helpers': f'''func square(x) -> x * x
+func clamp(x, low, high) -> if x < low then low elif x > high then high else x
+set total = 0
+for i = 0 to {arguments.calls} then set total = total + clamp(square(i), 10, 5000)
+log(total)
+''',
+}
+
+
+def run(text, engine):
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        if engine == 'interpreter':
+            _, error = fresh.run.run('<benchmark>', text, **OPTIONS)
+        else:
+            _, error = fresh.run.run('<benchmark>', text, engine=engine, **OPTIONS)
+    if error:
+        sys.exit(error.as_string())
+    return output.getvalue().strip()
+
+
+for name, text in PROGRAMS.items():
+    for engine in arguments.engines or ENGINES:
+        best = None
+        for _ in range(arguments.repeat):
+            start = time.perf_counter()
+            output = run(text, engine)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f'{name:<8} {engine:<12} {best:7.3f}s  {output}')
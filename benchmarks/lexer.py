@@ -0,0 +1,42 @@
+# Times lexing a large generated program. Pass --root to time the lexer of another checkout, such as the baseline commit.
+import argparse, os, sys, time
+
+argument_parser = argparse.ArgumentParser(description='Time Lexer.make_tokens on a generated multi-megabyte program.')
+argument_parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), help='checkout whose fresh package is timed')
+argument_parser.add_argument('--size', type=float, default=2.0, help='size of the generated program in megabytes (default: 2)')
+argument_parser.add_argument('--repeat', type=int, default=3, help='runs to take the best of (default: 3)')
+arguments = argument_parser.parse_args()
+
+sys.path.insert(0, os.path.abspath(arguments.root))
+from fresh.lexer import Lexer
+
+BLOCK = '''func score_{0}(list, weight)
+    set total = 0.5 // running total
+    for i = 0 to len(list) step 1 then
+        if (list ? i) >= weight and not (i == 3) then set total = total + (list ? i) * weight ^ 2
+        elif (list ? i) != 0 then set total = total - 1 / (list ? i)
+    end
+    set label = "score \\"{0}\\"\\n"
+    log(label + str(total)); return total
+end
+set result_{0} = score_{0}([1, 2.25, 3, 40], {0}) -> 'done'
+'''
+
+blocks = []
+size = 0
+while size < arguments.size * 1024 * 1024:
+    block = BLOCK.format(len(blocks))
+    blocks.append(block)
+    size += len(block)
+text = ''.join(blocks)
+
+best = None
+for _ in range(arguments.repeat):
+    start = time.perf_counter()
+    tokens, error = Lexer('<benchmark>', text, False).make_tokens()
+    elapsed = time.perf_counter() - start
+    if error:
+        sys.exit(error.as_string())
+    best = elapsed if best is None else min(best, elapsed)
+
+print(f'{len(text) / 1024 / 1024:.1f} MB, {len(tokens)} tokens: {best:.3f}s ({len(text) / best / 1024 / 1024:.1f} MB/s)')
@@ -0,0 +1,48 @@
+# Times building lists one element at a time with the functional + and taking them apart again with -.
+# Lists are built through tail calls, and through set, which copies what it assigns.
+# Pass --root to time another checkout, such as the commit before lists shared their stores.
+import argparse, contextlib, io, os, sys, time
+
+argument_parser = argparse.ArgumentParser(description='Time building Fresh lists element by element.')
+argument_parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), help='checkout whose fresh package is timed')
+argument_parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000], help='elements in the built lists (default: 100000 1000000)')
+argument_parser.add_argument('--programs', nargs='+', help='programs to time (default: all of them)')
+argument_parser.add_argument('--engine', default='interpreter', help='engine that runs the programs (default: interpreter)')
+arguments = argument_parser.parse_args()
+
+sys.path.insert(0, os.path.abspath(arguments.root))
+sys.setrecursionlimit(100000)
+import fresh.run
+
+PROGRAMS = {
+    # Tail calls pass the new list on without assigning it
+    'recursive': '''func build(list, i, n) -> if i == n then list else build(list + i, i + 1, n)
+log(len(build([], 0, {size})))
+''',
+    'concatenated': '''func build(list, i, n) -> if i == n then list else build(list * [i, "x"], i + 2, n)
+log(len(build([], 0, {size})))
+''',
+    'unbuilt': '''func unbuild(list) -> if len(list) == 0 then 0 else unbuild(list - -1)
+set numbers = for i = 0 to {size} then i
+log(unbuild(numbers))
+''',
+    # Every set copies the list, and the loop keeps each copy as a result
+    'assigned': '''set numbers = []
+for i = 0 to {size} then
+    set numbers = numbers + i
+end
+log(len(numbers))
+''',
+}
+OPTIONS = {'engine': arguments.engine} if arguments.engine != 'interpreter' else {}
+
+
+for size in arguments.sizes:
+    for name in arguments.programs or PROGRAMS:
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            start = time.perf_counter()
+            _, error = fresh.run.run('<benchmark>', PROGRAMS[name].format(size=size), **OPTIONS)
+            elapsed = time.perf_counter() - start
+        if error:
+            sys.exit(error.as_string())
+        print(f'{size:>8} {name:<13} {elapsed:8.3f}s  {output.getvalue().strip()}')
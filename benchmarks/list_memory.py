@@ -0,0 +1,41 @@
+# Measures with tracemalloc how much memory numeric lists built by a Fresh program keep alive.
+# Pass --root to measure another checkout, such as the commit before numeric lists were packed.
+import argparse, gc, os, sys, time, tracemalloc
+
+argument_parser = argparse.ArgumentParser(description='Measure the memory retained by numeric Fresh lists.')
+argument_parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), help='checkout whose fresh package is measured')
+argument_parser.add_argument('--elements', type=int, default=1000000, help='elements in each list (default: 1000000)')
+argument_parser.add_argument('--engine', default='interpreter', help='engine that runs the programs (default: interpreter)')
+arguments = argument_parser.parse_args()
+
+sys.path.insert(0, os.path.abspath(arguments.root))
+import fresh.run
+
+PROGRAMS = {
+    'ints': f'set numbers = for i = 0 to {arguments.elements} then i * 3',
+    'floats': f'set numbers = for i = 0 to {arguments.elements} then i / 4',
+    'appended': f'''set numbers = []
+for i = 0 to {arguments.elements} then append(numbers, i - 5)
+''',
+    'mixed': f'set numbers = for i = 0 to {arguments.elements} then if i == 0 then "first" else i * 3',
+}
+OPTIONS = {'engine': arguments.engine} if arguments.engine != 'interpreter' else {}
+
+
+for name, text in PROGRAMS.items():
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    value, error = fresh.run.run('<benchmark>', text, **OPTIONS)
+    if error:
+        sys.exit(error.as_string())
+    elapsed = time.perf_counter() - start
+    # Only the list the program set stays around, the results of its statements go
+    numbers = fresh.run.global_symbol_table.get('numbers')
+    del value
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{name:<9} retained {retained / 1e6:7.1f} MB, peak {peak / 1e6:7.1f} MB, {retained / arguments.elements:6.1f} bytes per element, run {elapsed:.2f}s')
+    fresh.run.global_symbol_table.remove('numbers')
+    del numbers
@@ -0,0 +1,68 @@
+# Times numeric loops with hot loop compilation on and off, next to the other engines.
+# Pass --root to time another checkout, such as the commit before hot loops were compiled.
+import argparse, contextlib, inspect, io, os, sys, time
+
+argument_parser = argparse.ArgumentParser(description='Time numeric Fresh loops on every tier.')
+argument_parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), help='checkout whose fresh package is timed')
+argument_parser.add_argument('--iterations', type=int, default=200000, help='iterations of each loop (default: 200000)')
+argument_parser.add_argument('--tiers', nargs='+', help='tiers to time (default: all of them)')
+argument_parser.add_argument('--repeat', type=int, default=3, help='runs to take the best of (default: 3)')
+arguments = argument_parser.parse_args()
+
+sys.path.insert(0, os.path.abspath(arguments.root))
+import fresh.run
+
+# Checkouts from before hot loops only have the plain interpreter
+SPECIALIZES = 'specialize' in inspect.signature(fresh.run.run).parameters
+TIERS = {'interpreter': {'specialize': False} if SPECIALIZES else {}}
+if SPECIALIZES:
+    TIERS['hot loops'] = {}
+for engine in getattr(fresh.run, 'ENGINES', ())[1:]:
+    TIERS[engine] = {'engine': engine}
+
+PROGRAMS = {
+    'sum': f'''set total = 0
+for i = 0 to {arguments.iterations} then
+    set total = total + i * i
+    if total > 1000000 then set total = total - 1000000
+end
+log(total)
+''',
+    'while': f'''set n = 0
+set a = 0.5
+while n < {arguments.iterations} then
+    set n = n + 1
+    set a = a * 1.000001 + n / 3
+end
+log(a)
+''',
+    'index': f'''set weights = [3, 1, 4, 1, 5, 9, 2, 6]
+set score = 0
+set j = 0
+for i = 0 to {arguments.iterations} then
+    set score = score + weights ? j * i
+    set j = j + 1
+    if j == 8 then set j = 0
+end
+log(score)
+''',
+}
+
+
+def run(text, options):
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        _, error = fresh.run.run('<benchmark>', text, **options)
+    if error:
+        sys.exit(error.as_string())
+    return output.getvalue().strip()
+
+
+for name, text in PROGRAMS.items():
+    for tier in arguments.tiers or TIERS:
+        best = None
+        for _ in range(arguments.repeat):
+            start = time.perf_counter()
+            output = run(text, TIERS[tier])
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f'{name:<6} {tier:<12} {best:7.3f}s  {output}')
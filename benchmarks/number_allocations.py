@@ -0,0 +1,81 @@
+# Counts the Number values loop-heavy programs build, and times them.
+# Pass --root to measure another checkout, such as the commit before small ints and boolean results were shared.
+import argparse, contextlib, io, os, sys, time
+from collections import Counter
+
+argument_parser = argparse.ArgumentParser(description='Count the Number values Fresh programs build.')
+argument_parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), help='checkout whose fresh package is measured')
+argument_parser.add_argument('--engine', default='interpreter', help='engine that runs the programs (default: interpreter)')
+argument_parser.add_argument('--repeat', type=int, default=3, help='runs to take the best time of (default: 3)')
+arguments = argument_parser.parse_args()
+
+sys.path.insert(0, os.path.abspath(arguments.root))
+sys.setrecursionlimit(100000)
+import fresh.run
+from fresh.values import Number
+
+PROGRAMS = {
+    'nested small loops': '''set total = 0
+for i = 0 to 300 then
+    for j = 0 to 100 then
+        if j < 50 and not (i == j) then set total = total + 1
+    end
+end
+log(total)
+''',
+    '400-element sort': '''set items = []
+for i = 0 to 400 then append(items, 400 - i)
+set sorted = []
+while len(items) > 0 then
+    set smallest = 0
+    for j = 1 to len(items) then
+        if items ? j < items ? smallest then set smallest = j
+    end
+    append(sorted, items ? smallest)
+    set items = items - smallest
+end
+log(sorted ? 0)
+''',
+    'counting': '''set count = 0
+set i = 0
+while i < 50000 then
+    if i == 3 or i > 40000 then set count = count + 1
+    set i = i + 1
+end
+log(count)
+''',
+}
+OPTIONS = {'engine': arguments.engine} if arguments.engine != 'interpreter' else {}
+
+built = Counter()
+
+
+# Every Number, Int and Float goes through Number.__new__, the shared ones are only built once
+def counting_new(cls, *args, **kwargs):
+    built[cls] += 1
+    return object.__new__(cls)
+
+
+def run(text):
+    with contextlib.redirect_stdout(io.StringIO()):
+        value, error = fresh.run.run('<benchmark>', text, **OPTIONS)
+    if error:
+        sys.exit(error.as_string())
+
+
+times = {}
+for name, text in PROGRAMS.items():
+    best = None
+    for _ in range(arguments.repeat):
+        start = time.perf_counter()
+        run(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    times[name] = best
+
+# Counting slows every allocation down, so it only starts once the timing is done
+Number.__new__ = staticmethod(counting_new)
+for name, text in PROGRAMS.items():
+    built.clear()
+    run(text)
+    print(f'{name:<20} {sum(built.values()):>8} Numbers built, best {times[name]:.3f}s')
@@ -0,0 +1,59 @@
+# Times Parser.parse on programs of deeply nested if, for and while blocks at increasing token counts.
+# Pass --root to time the parser of another checkout, such as the baseline commit.
+import argparse, gc, os, sys, time
+
+argument_parser = argparse.ArgumentParser(description='Time Parser.parse on generated programs of nested blocks.')
+argument_parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), help='checkout whose fresh package is timed')
+argument_parser.add_argument('--tokens', type=int, nargs='+', default=[32000, 65000, 130000, 260000], help='tokens in each generated program (default: 32000 65000 130000 260000)')
+argument_parser.add_argument('--depth', type=int, default=30, help='blocks nested inside each other (default: 30)')
+argument_parser.add_argument('--repeat', type=int, default=3, help='runs to take the best of (default: 3)')
+arguments = argument_parser.parse_args()
+
+sys.path.insert(0, os.path.abspath(arguments.root))
+sys.setrecursionlimit(100000)
+from fresh.lexer import Lexer
+from fresh.parser import Parser
+
+
+# One if, for or while block per level in turn, each with a statement before and after the block inside it
+def nested(depth, level=0):
+    indent = '    ' * level
+    if level == depth:
+        return f'{indent}set x = x + {level} * (y - 1)\n'
+    inner = nested(depth, level + 1)
+    kind = level % 3
+    if kind == 0:
+        head, tail = f'{indent}if x < {level} and not y then\n', f'{indent}elif x == {level} then\n{indent}    set y = y - 1\n{indent}else\n{indent}    log(x)\n{indent}end\n'
+    elif kind == 1:
+        head, tail = f'{indent}for i{level} = 0 to {level} step 1 then\n', f'{indent}end\n'
+    else:
+        head, tail = f'{indent}while y > {level} then\n', f'{indent}end\n'
+    return f'{head}{indent}    set y = y + 1\n{inner}{indent}    log(str(y))\n{tail}'
+
+
+def lex(text):
+    tokens, error = Lexer('<benchmark>', text, False).make_tokens()
+    if error:
+        sys.exit(error.as_string())
+    return tokens
+
+
+UNIT = nested(arguments.depth)
+UNIT_TOKENS = len(lex(UNIT)) - 1
+
+for target in arguments.tokens:
+    text = UNIT * max(1, round(target / UNIT_TOKENS))
+    tokens = lex(text)
+    best = None
+    for _ in range(arguments.repeat):
+        # The collector would otherwise run in the middle of some parses and not others
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        result = Parser(tokens).parse()
+        elapsed = time.perf_counter() - start
+        gc.enable()
+        if result.error:
+            sys.exit(result.error.as_string())
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'{len(tokens):>7} tokens, depth {arguments.depth}: {best:.3f}s ({len(tokens) / best / 1000:.0f}k tokens/s)')
@@ -0,0 +1,71 @@
+# Times the selection sort from programs/sorting_algorithm.fr on larger lists, on the tree-walking interpreter and the other engines.
+# Pass --root to time another checkout, such as the commit before the bytecode VM was added.
+import argparse, contextlib, inspect, io, os, sys, time
+
+argument_parser = argparse.ArgumentParser(description='Time a selection sort in Fresh on every engine.')
+argument_parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), help='checkout whose fresh package is timed')
+argument_parser.add_argument('--sizes', type=int, nargs='+', default=[200, 400], help='lengths of the sorted lists (default: 200 400)')
+argument_parser.add_argument('--engines', nargs='+', help='engines to time (default: all of them)')
+argument_parser.add_argument('--repeat', type=int, default=3, help='runs to take the best of (default: 3)')
+arguments = argument_parser.parse_args()
+
+sys.path.insert(0, os.path.abspath(arguments.root))
+sys.setrecursionlimit(100000)
+import fresh.run
+
+# Checkouts from before the other engines only have the interpreter
+ENGINES = getattr(fresh.run, 'ENGINES', ('interpreter',))
+# The tree-walker itself is timed, without its hot loops compiled to Python
+OPTIONS = {'specialize': False} if 'specialize' in inspect.signature(fresh.run.run).parameters else {}
+
+
+# The sort of programs/sorting_algorithm.fr, on a reversed list instead of a random one so every run does the same work
+def program(size):
+    return f'''set list = []
+for i = 0 to {size} then
+    append(list, {size} - i)
+end
+
+func sort(list)
+    set list_ = list
+    set new_list = []
+    while len(list_) > 0 then
+        set minimum = 0
+        for i = 0 to len(list_) then
+            if (list_ ? i) < list_ ? minimum then
+                set minimum = i
+            end
+        end
+        append(new_list, list_ ? minimum)
+        pop(list_, minimum)
+    end
+    return new_list
+end
+
+set new_list = sort(list)
+log(new_list ? 0)
+log(new_list ? -1)
+'''
+
+
+def run(text, engine):
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        if engine == 'interpreter':
+            _, error = fresh.run.run('<benchmark>', text, **OPTIONS)
+        else:
+            _, error = fresh.run.run('<benchmark>', text, engine=engine, **OPTIONS)
+    if error:
+        sys.exit(error.as_string())
+    return ' '.join(output.getvalue().split())
+
+
+for size in arguments.sizes:
+    text = program(size)
+    for engine in arguments.engines or ENGINES:
+        best = None
+        for _ in range(arguments.repeat):
+            start = time.perf_counter()
+            output = run(text, engine)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f'{size:>5} items {engine:<12} {best:7.3f}s  {output}')
@@ -0,0 +1,37 @@
+# Times building a large string by concatenating a short piece onto it over and over, then reading it once.
+# Pass --root to time another checkout, such as the commit before strings kept their pieces.
+import argparse, contextlib, io, os, sys, time
+
+argument_parser = argparse.ArgumentParser(description='Time building a Fresh string by concatenation.')
+argument_parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), help='checkout whose fresh package is timed')
+argument_parser.add_argument('--megabytes', type=float, nargs='+', default=[1.0, 10.0], help='sizes of the built strings (default: 1 10)')
+argument_parser.add_argument('--piece', type=int, default=100, help='characters added by each concatenation (default: 100)')
+argument_parser.add_argument('--engine', default='interpreter', help='engine that runs the program (default: interpreter)')
+arguments = argument_parser.parse_args()
+
+sys.path.insert(0, os.path.abspath(arguments.root))
+import fresh.run
+
+PROGRAM = '''set piece = "{piece}"
+set text = ""
+set n = 0
+while n < {count} then
+    set text = text + piece
+    set n = n + 1
+end
+log(len(text))
+'''
+OPTIONS = {'engine': arguments.engine} if arguments.engine != 'interpreter' else {}
+
+
+for megabytes in arguments.megabytes:
+    count = int(megabytes * 1000 * 1000 / arguments.piece)
+    text = PROGRAM.format(piece='x' * arguments.piece, count=count)
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        start = time.perf_counter()
+        _, error = fresh.run.run('<benchmark>', text, **OPTIONS)
+        elapsed = time.perf_counter() - start
+    if error:
+        sys.exit(error.as_string())
+    length = int(output.getvalue())
+    print(f'{length / 1e6:5.1f} MB in {count} pieces: {elapsed:7.3f}s, {length / 1e6 / elapsed:7.2f} MB/s')
@@ -0,0 +1,47 @@
+# Times tail recursion at growing depths on every engine, along with the memory it peaks at.
+# The Python recursion limit stays at its default, so depths past it only finish where tail calls run in constant stack.
+import argparse, os, sys, time, tracemalloc
+
+argument_parser = argparse.ArgumentParser(description='Time deep tail recursion on every engine.')
+argument_parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), help='checkout whose fresh package is timed')
+argument_parser.add_argument('--depths', type=int, nargs='+', default=[10000, 100000, 1000000], help='recursion depths (default: 10000 100000 1000000)')
+argument_parser.add_argument('--engines', nargs='+', help='engines to time (default: all of them)')
+argument_parser.add_argument('--memory', action='store_true', help='also report the peak traced memory, which slows the runs down')
+arguments = argument_parser.parse_args()
+
+sys.path.insert(0, os.path.abspath(arguments.root))
+import fresh.run
+
+# Checkouts from before the other engines only have the interpreter
+ENGINES = getattr(fresh.run, 'ENGINES', ('interpreter',))
+
+
+def run(text, engine):
+    if engine == 'interpreter':
+        return fresh.run.run('<benchmark>', text)
+    return fresh.run.run('<benchmark>', text, engine=engine)
+
+PROGRAM = '''func count(n, total)
+    if n == 0 then return total
+    return count(n - 1, total + 1)
+end
+count({0}, 0)
+'''
+
+for depth in arguments.depths:
+    for engine in arguments.engines or ENGINES:
+        text = PROGRAM.format(depth)
+        if arguments.memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            value, error = run(text, engine)
+            outcome = error.details if error else f'returned {value.elements[-1].value}'
+        except RecursionError:
+            outcome = 'RecursionError'
+        elapsed = time.perf_counter() - start
+        if arguments.memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            outcome += f', peak {peak / 1024:.0f} KB'
+        print(f'depth {depth:>8} {engine:<12} {elapsed:7.3f}s  {outcome}')
@@ -0,0 +1,58 @@
+# Times tight loops on the tree-walking interpreter, where bookkeeping around each expression costs the most next to the work.
+# Pass --root to time another checkout, such as the commit before the interpreter returned plain values.
+import argparse, contextlib, inspect, io, os, sys, time
+
+argument_parser = argparse.ArgumentParser(description='Time tight Fresh loops on the interpreter.')
+argument_parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), help='checkout whose fresh package is timed')
+argument_parser.add_argument('--iterations', type=int, default=100000, help='iterations of each loop (default: 100000)')
+argument_parser.add_argument('--repeat', type=int, default=3, help='runs to take the best of (default: 3)')
+arguments = argument_parser.parse_args()
+
+sys.path.insert(0, os.path.abspath(arguments.root))
+import fresh.run
+
+# The tree-walker itself is timed, without its hot loops compiled to Python
+OPTIONS = {'specialize': False} if 'specialize' in inspect.signature(fresh.run.run).parameters else {}
+
+PROGRAMS = {
+    'empty for': f'''for i = 0 to {arguments.iterations} then 0
+log(i)
+''',
+    'counter': f'''set n = 0
+while n < {arguments.iterations} then set n = n + 1
+log(n)
+''',
+    'continue': f'''set kept = 0
+for i = 0 to {arguments.iterations} then
+    if i > 10 then continue
+    set kept = kept + 1
+end
+log(kept)
+''',
+    'return': f'''func half(x)
+    if x < 0 then return 0
+    return x / 2
+end
+set total = 0
+for i = 0 to {arguments.iterations} then set total = total + half(i)
+log(total)
+''',
+}
+
+
+def run(text):
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        _, error = fresh.run.run('<benchmark>', text, **OPTIONS)
+    if error:
+        sys.exit(error.as_string())
+    return output.getvalue().strip()
+
+
+for name, text in PROGRAMS.items():
+    best = None
+    for _ in range(arguments.repeat):
+        start = time.perf_counter()
+        output = run(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'{name:<10} {best:7.3f}s  {output}')
@@ -0,0 +1,67 @@
+# Measures the memory the lexer's tokens take and how long the parser takes to read them, on generated programs.
+# Pass --root to measure another checkout, such as the commit before tokens were kept in a columnar TokenStream.
+import argparse, gc, os, sys, time, tracemalloc
+
+argument_parser = argparse.ArgumentParser(description='Measure the memory of lexed tokens and the time to parse them.')
+argument_parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), help='checkout whose fresh package is measured')
+argument_parser.add_argument('--sizes', type=float, nargs='+', default=[0.5, 2.0], help='sizes of the generated programs in megabytes (default: 0.5 2)')
+argument_parser.add_argument('--repeat', type=int, default=3, help='parses to take the best of (default: 3)')
+arguments = argument_parser.parse_args()
+
+sys.path.insert(0, os.path.abspath(arguments.root))
+sys.setrecursionlimit(100000)
+from fresh.lexer import Lexer
+from fresh.parser import Parser
+
+
+PROGRAMS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'programs')
+# testing.fr is a scratch file that does not parse
+PROGRAMS = [
+    open(os.path.join(PROGRAMS_DIRECTORY, name)).read() for name in sorted(os.listdir(PROGRAMS_DIRECTORY))
+    if name.endswith('.fr') and name != 'testing.fr'
+]
+
+
+# The example programs over and over, with generated lines in between so names and literals keep changing
+def generate(megabytes):
+    parts = []
+    size = 0
+    while size < megabytes * 1000 * 1000:
+        i = len(parts)
+        part = '\n'.join([
+            PROGRAMS[i % len(PROGRAMS)],
+            f'set v{i} = (v{i % 7} + {i}) * 2.5 - "str{i}" ? 3 // comment',
+            f'func f{i}(a, b) -> if a < b then a else [b, 1, 2]',
+            '',
+        ])
+        parts.append(part)
+        size += len(part)
+    return ''.join(parts)
+
+
+for megabytes in arguments.sizes:
+    text = generate(megabytes)
+    gc.collect()
+    tracemalloc.start()
+    tokens, error = Lexer('<benchmark>', text, False).make_tokens()
+    if error:
+        sys.exit(error.as_string())
+    # Everything the lexer allocated that is still alive belongs to the tokens
+    token_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    best = None
+    for _ in range(arguments.repeat):
+        # The collector would otherwise run in the middle of some parses and not others
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        result = Parser(tokens).parse()
+        elapsed = time.perf_counter() - start
+        gc.enable()
+        if result.error:
+            sys.exit(result.error.as_string())
+        best = elapsed if best is None else min(best, elapsed)
+        del result
+    print(f'{len(text) / 1000 / 1000:.1f} MB program, {len(tokens)} tokens: {token_memory / len(tokens):.0f} bytes per token ({token_memory / 1e6:.1f} MB), parse {best:.3f}s')
+    del tokens
@@ -0,0 +1,77 @@
+# Measures with tracemalloc the bytes each kind of runtime object takes, and the memory Fresh programs use.
+# Pass --root to measure another checkout, such as the commit before the runtime classes were slotted.
+import argparse, contextlib, gc, io, os, sys, tracemalloc
+
+argument_parser = argparse.ArgumentParser(description='Measure the memory of Fresh runtime objects and programs.')
+argument_parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), help='checkout whose fresh package is measured')
+argument_parser.add_argument('--count', type=int, default=100000, help='objects of each kind, and the size of the generated programs (default: 100000)')
+argument_parser.add_argument('--engine', default='interpreter', help='engine that runs the programs (default: interpreter)')
+arguments = argument_parser.parse_args()
+
+sys.path.insert(0, os.path.abspath(arguments.root))
+sys.setrecursionlimit(100000)
+import fresh.run
+from fresh.context import Context
+from fresh.position import Position, SourceFile
+from fresh.runtimeresult import RuntimeResult
+from fresh.symboltable import SymbolTable
+from fresh.values import Number, String, List, Function, BuiltInFunction
+
+SOURCE = SourceFile('<benchmark>', '')
+# Each makes one object from a number that keeps changing, big enough that Number.of never hands out a cached one
+OBJECTS = {
+    'int': lambda i: Number.of(i + 100000),
+    'float': lambda i: Number.of(i + 0.5),
+    'string': lambda i: String(str(i)),
+    'list': lambda i: List([]),
+    'function': lambda i: Function(None, None, ['a'], True),
+    'builtin': lambda i: BuiltInFunction('log'),
+    'context': lambda i: Context('<benchmark>'),
+    'symbol table': lambda i: SymbolTable(),
+    'result': lambda i: RuntimeResult(),
+    'position': lambda i: Position(i, SOURCE),
+}
+
+PROGRAMS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'programs')
+# testing.fr does not parse, and the games wait for input
+PROGRAMS = {
+    name: open(os.path.join(PROGRAMS_DIRECTORY, name)).read() for name in sorted(os.listdir(PROGRAMS_DIRECTORY))
+    if name.endswith('.fr') and name != 'testing.fr' and 'input' not in open(os.path.join(PROGRAMS_DIRECTORY, name)).read()
+}
+PROGRAMS.update({
+    'floats': f'set kept = for i = 0 to {arguments.count} then if i == 0 then "mixed" else i / 3',
+    'strings': f'set kept = for i = 0 to {arguments.count} then "s" + str(i)',
+    'functions': f'set kept = for i = 0 to {arguments.count // 10} then func(x) -> x + i',
+    'recursion': f'''func depth(n) -> if n == 0 then [] else [n, depth(n - 1)] ? 1
+set kept = depth({arguments.count // 100})
+''',
+})
+OPTIONS = {'engine': arguments.engine} if arguments.engine != 'interpreter' else {}
+
+
+def measure(make):
+    gc.collect()
+    tracemalloc.start()
+    kept = make()
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return kept, retained, peak
+
+
+for name, make in OBJECTS.items():
+    # The list holding them is measured too, so its 8 bytes a pointer are taken off again
+    _, retained, _ = measure(lambda: [make(i) for i in range(arguments.count)])
+    print(f'{name:<13} {retained / arguments.count - 8:6.1f} bytes each')
+
+for name, text in PROGRAMS.items():
+    # What stays is the results of the statements and the globals the program set
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            value, error = fresh.run.run('<benchmark>', text, **OPTIONS)
+        if error:
+            sys.exit(error.as_string())
+        return value
+
+    _, retained, peak = measure(run)
+    print(f'{name:<22} retained {retained / 1e6:6.2f} MB, peak {peak / 1e6:6.2f} MB')
@@ -0,0 +1,255 @@
+import functools
+import gc
+import hashlib
+import marshal
+import os
+import sys
+from array import array
+
+from fresh.nodes import NumberNode, BinOpNode, UnaryOpNode, VariableAccessNode, VariableAssignNode, IfNode, ForNode, WhileNode, FunctionDefinitionNode, CallNode, \
+    StringNode, ListNode, ReturnNode, ContinueNode, BreakNode
+from fresh.position import Position, SourceFile
+from fresh.tokens import Token
+from fresh.tokenstream import TOKEN_CODES, TOKEN_TYPES
+
+# Bump whenever the node classes or the encoding below change, older cache files are then ignored
+CACHE_FORMAT = 1
+CACHE_SUFFIX = '.frc'
+DEFAULT_CACHE_DIRECTORY = '__frcache__'
+
+# Constructor arguments of every node and how each one is encoded
+NODE_SCHEMAS = [
+    (NumberNode, (('token', 'token'),)),
+    (StringNode, (('token', 'token'),)),
+    (BinOpNode, (('left_node', 'node'), ('operator_token', 'token'), ('right_node', 'node'))),
+    (UnaryOpNode, (('operator_token', 'token'), ('node', 'node'))),
+    (VariableAccessNode, (('variable_name_token', 'token'),)),
+    (VariableAssignNode, (('token', 'token'), ('value_node', 'node'))),
+    (IfNode, (('cases', 'cases'), ('else_case', 'else_case'))),
+    (ForNode, (('variable_name_token', 'token'), ('start_value_node', 'node'), ('end_value_node', 'node'),
+               ('step_value_node', 'node'), ('body_node', 'node'), ('should_return_null', 'flag'))),
+    (WhileNode, (('condition_node', 'node'), ('body_node', 'node'), ('should_return_null', 'flag'))),
+    (FunctionDefinitionNode, (('variable_name_token', 'token'), ('argument_name_tokens', 'tokens'),
+                              ('body_node', 'node'), ('should_auto_return', 'flag'))),
+    (CallNode, (('function_node', 'node'), ('argument_nodes', 'nodes'))),
+    (ListNode, (('element_nodes', 'nodes'), ('pos_start', 'pos_start'), ('pos_end', 'pos_end'))),
+    (ReturnNode, (('node_to_return', 'node'), ('pos_start', 'pos_start'), ('pos_end', 'pos_end'))),
+    (ContinueNode, (('pos_start', 'pos_start'), ('pos_end', 'pos_end'))),
+    (BreakNode, (('pos_start', 'pos_start'), ('pos_end', 'pos_end'))),
+]
+NODE_CODES = {node_class: code for code, (node_class, _) in enumerate(NODE_SCHEMAS)}
+
+
+# Digest of the sources of the fresh package. A cache written by another version of Fresh is never read back, even one
+# whose parser builds a different tree from the same node classes.
+@functools.lru_cache(maxsize=None)
+def fresh_version():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.py'):
+            with open(os.path.join(directory, name), 'rb') as file:
+                digest.update(name.encode('utf-8', 'surrogatepass'))
+                digest.update(file.read())
+    return digest.hexdigest()
+
+
+class ASTCache:
+    suffix = CACHE_SUFFIX
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    @staticmethod
+    def source_key(text):
+        # The token values are marshalled, so the marshal format and the Python that wrote them are part of the key too
+        return (CACHE_FORMAT, fresh_version(), marshal.version, tuple(sys.version_info[:2]),
+                hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest())
+
+    def path_for(self, filename):
+        # The path digest keeps scripts with the same name apart when they share a cache directory
+        path_digest = hashlib.sha1(os.path.abspath(filename).encode('utf-8', 'surrogatepass')).hexdigest()[:12]
+        return os.path.join(self.directory, f'{os.path.basename(filename)}.{path_digest}{self.suffix}')
+
+    def load(self, filename, text):
+        try:
+            payload = self.read(filename, text)
+            if payload is None:
+                return None
+            codes, values = payload
+            return Decoder(SourceFile(filename, text), codes, values).decode()
+        except (OSError, EOFError, ValueError, TypeError, IndexError, KeyError, RecursionError):
+            # A missing, stale or damaged cache file just means parsing again
+            return None
+
+    def store(self, filename, text, node):
+        encoder = Encoder()
+        try:
+            encoder.node(node)
+        except RecursionError:
+            return
+        self.write(filename, text, encoder.codes.tobytes(), encoder.values)
+
+    def read(self, filename, text):
+        with open(self.path_for(filename), 'rb') as file:
+            key, *payload = marshal.load(file)
+        if tuple(key) != self.source_key(text):
+            return None
+        return payload
+
+    def write(self, filename, text, *payload):
+        path = self.path_for(filename)
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temporary_path, 'wb') as file:
+                marshal.dump((self.source_key(text), *payload), file)
+            os.replace(temporary_path, path)
+        except (OSError, ValueError):
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+
+
+# The tree is flattened in pre-order into one array of ints, with token values kept in a separate table
+class Encoder:
+    def __init__(self):
+        self.codes = array('i')
+        self.values = [None]
+        self.value_ids = {}
+
+    def node(self, node):
+        if node is None:
+            self.codes.append(-1)
+            return
+        code = NODE_CODES[type(node)]
+        self.codes.append(code)
+        for name, kind in NODE_SCHEMAS[code][1]:
+            self.field(kind, getattr(node, name))
+
+    def token(self, token):
+        if token is None:
+            self.codes.append(-1)
+            return
+        value = token.value
+        if value is None:
+            value_id = 0
+        else:
+            key = (type(value), value)
+            value_id = self.value_ids.get(key)
+            if value_id is None:
+                value_id = self.value_ids[key] = len(self.values)
+                self.values.append(value)
+        self.codes.extend((TOKEN_CODES[token.type], value_id, token.start, token.end))
+
+    def field(self, kind, value):
+        codes = self.codes
+        if kind == 'node':
+            self.node(value)
+        elif kind == 'nodes':
+            codes.append(len(value))
+            for node in value:
+                self.node(node)
+        elif kind == 'token':
+            self.token(value)
+        elif kind == 'tokens':
+            codes.append(len(value))
+            for token in value:
+                self.token(token)
+        elif kind in ('pos_start', 'pos_end'):
+            codes.append(value.index)
+        elif kind == 'cases':
+            codes.append(len(value))
+            for condition, expression, should_return_null in value:
+                self.node(condition)
+                self.node(expression)
+                codes.append(int(should_return_null))
+        elif kind == 'else_case':
+            if value is None:
+                codes.append(-1)
+            else:
+                codes.append(1)
+                self.node(value[0])
+                codes.append(int(value[1]))
+        else:
+            codes.append(int(value))
+
+
+class Decoder:
+    def __init__(self, source, codes, values):
+        self.source = source
+        self.codes = array('i')
+        self.codes.frombytes(codes)
+        self.values = values
+        self.index = 0
+        self.readers = [self.make_reader(node_class, schema) for node_class, schema in NODE_SCHEMAS]
+
+    def decode(self):
+        # The tree has no reference cycles, so the collector would only slow the bulk allocation down
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            node = self.node()
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        if self.index != len(self.codes):
+            raise ValueError('trailing data in cache file')
+        return node
+
+    def next(self):
+        code = self.codes[self.index]
+        self.index += 1
+        return code
+
+    def node(self):
+        code = self.next()
+        if code == -1:
+            return None
+        return self.readers[code]()
+
+    def token(self):
+        type_code = self.next()
+        if type_code == -1:
+            return None
+        index = self.index
+        codes = self.codes
+        self.index = index + 3
+        return Token(TOKEN_TYPES[type_code], self.values[codes[index]], codes[index + 1], codes[index + 2], self.source)
+
+    def make_reader(self, node_class, schema):
+        field_readers = [getattr(self, 'read_' + kind) for _, kind in schema]
+
+        def read():
+            return node_class(*[field_reader() for field_reader in field_readers])
+        return read
+
+    def read_node(self):
+        return self.node()
+
+    def read_nodes(self):
+        return [self.node() for _ in range(self.next())]
+
+    def read_token(self):
+        return self.token()
+
+    def read_tokens(self):
+        return [self.token() for _ in range(self.next())]
+
+    def read_pos_start(self):
+        return Position(self.next(), self.source)
+
+    def read_pos_end(self):
+        return Position(self.next(), self.source, True)
+
+    def read_flag(self):
+        return bool(self.next())
+
+    def read_cases(self):
+        return [(self.node(), self.node(), bool(self.next())) for _ in range(self.next())]
+
+    def read_else_case(self):
+        if self.next() == -1:
+            return None
+        return self.node(), bool(self.next())
@@ -0,0 +1,363 @@
+from fresh.errors import RTError, RuntimeFailure
+from fresh.nodes import VariableAssignNode, IfNode, CallNode, origin_node
+from fresh.operations import lookup_operator_table
+from fresh.signals import ReturnSignal, BreakSignal, ContinueSignal, TailCall, unwrap
+from fresh.tokens import *
+from fresh.values import Number, Function, String, List
+
+
+class CompiledFunction(Function):
+    __slots__ = ('body',)
+
+    def __init__(self, name, body_node, arguments, should_auto_return, body, memo_size=0):
+        super().__init__(name, body_node, arguments, should_auto_return, memo_size=memo_size)
+        self.body = body
+
+    # Function.call makes the calls, including the tail calls the body hands back
+    def run(self, execute_context):
+        try:
+            value = self.body(execute_context)
+        except ReturnSignal as signal:
+            return signal.value
+
+        return value if self.should_auto_return else Number.null
+
+
+# Turns the tree into nested closures once, so running it is just calling them
+class ClosureCompiler:
+    def __init__(self):
+        # Whether the code being compiled is a function body, and how many loops deep inside it
+        self.in_function = False
+        self.loop_depth = 0
+
+    def run(self, node, context):
+        program = self.compile(node)
+        try:
+            return program(context), None
+        except RuntimeFailure as failure:
+            return None, failure.error
+        except (ReturnSignal, BreakSignal, ContinueSignal):
+            return None, None
+
+    def compile(self, node):
+        method_name = f'compile_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_compile_method)
+        return method(node)
+
+    def no_compile_method(self, node):
+        raise Exception(f'No compile_{type(node).__name__} method defined')
+
+    # Like Interpreter.visit_tail, the code returns a TailCall instead of calling another Fresh function
+    def compile_tail(self, node):
+        node_type = type(node)
+        if node_type is CallNode:
+            return self.compile_CallNode(node, True)
+        if node_type is IfNode:
+            return self.compile_IfNode(node, True)
+        return self.compile(node)
+
+    def compile_NumberNode(self, node):
+        value = Number.of(node.token.value)
+
+        def number(context):
+            return value
+        return number
+
+    def compile_VariableAccessNode(self, node):
+        variable_name = node.variable_name_token.value
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def variable_access(context):
+            value = context.symbol_table.get(variable_name)
+            if not value:
+                raise RuntimeFailure(RTError(pos_start, pos_end, f'{variable_name} is not defined.', context))
+            return value
+        return variable_access
+
+    def compile_VariableAssignNode(self, node):
+        variable_name = node.token.value
+        value_code = self.compile(node.value_node)
+
+        def variable_assign(context):
+            value = value_code(context)
+            if isinstance(value, List):
+                value = value.copy_as_true_new()
+            context.symbol_table.set(variable_name, value)
+            return value
+        return variable_assign
+
+    def compile_BinOpNode(self, node):
+        operation = lookup_operator_table(node.operator_token)
+        if node.traces_branches:
+            left_code = self.compile_operand(node.left_node)
+            right_code = self.compile_operand(node.right_node)
+
+            def traced_binary_operation(context):
+                left, left_node = left_code(context)
+                right, right_node = right_code(context)
+                result, error = operation[type(left), type(right)](left, right)
+                if error:
+                    raise RuntimeFailure(error.at(left_node.pos_start, left_node.pos_end, right_node.pos_end, context))
+                return result
+            return traced_binary_operation
+
+        left_code = self.compile(node.left_node)
+        right_code = self.compile(node.right_node)
+        left_node, right_node = origin_node(node.left_node), origin_node(node.right_node)
+        pos_start, pos_end, other_pos_end = left_node.pos_start, left_node.pos_end, right_node.pos_end
+
+        def binary_operation(context):
+            left = left_code(context)
+            right = right_code(context)
+            result, error = operation[type(left), type(right)](left, right)
+            if error:
+                raise RuntimeFailure(error.at(pos_start, pos_end, other_pos_end, context))
+            return result
+        return binary_operation
+
+    def compile_UnaryOpNode(self, node):
+        if node.traces_branches and node.operator_token.type != TT_PLUS:
+            return self.compile_traced_unary_operation(node)
+
+        operand_code = self.compile(node.node)
+        operand_node = origin_node(node.node)
+        pos_start, pos_end = operand_node.pos_start, operand_node.pos_end
+
+        if node.operator_token.type == TT_MINUS:
+            def negation(context):
+                number, error = operand_code(context).multiplied_by(Number.of(-1))
+                if error:
+                    raise RuntimeFailure(error.at(pos_start, pos_end, pos_end, context))
+                return number
+            return negation
+
+        if node.operator_token.matches(TT_KEYWORD, 'not'):
+            def logical_not(context):
+                number, error = operand_code(context).notted()
+                if error:
+                    raise RuntimeFailure(error.at(pos_start, pos_end, pos_end, context))
+                return number
+            return logical_not
+
+        # A plus leaves the value as it is
+        return operand_code
+
+    def compile_traced_unary_operation(self, node):
+        operand_code = self.compile_operand(node.node)
+        negates = node.operator_token.type == TT_MINUS
+
+        def traced_unary_operation(context):
+            operand, operand_node = operand_code(context)
+            number, error = operand.multiplied_by(Number.of(-1)) if negates else operand.notted()
+            if error:
+                raise RuntimeFailure(error.at(operand_node.pos_start, operand_node.pos_end, operand_node.pos_end, context))
+            return number
+        return traced_unary_operation
+
+    # Like Interpreter.visit_operand, the code returns the value along with the node an error about it points at
+    def compile_operand(self, node):
+        node_type = type(node)
+        if node_type is IfNode:
+            return self.compile_if_operand(node)
+
+        if node_type is VariableAssignNode:
+            variable_name = node.token.value
+            value_code = self.compile_operand(node.value_node)
+
+            def variable_assign(context):
+                value, origin = value_code(context)
+                if isinstance(value, List):
+                    value = value.copy_as_true_new()
+                context.symbol_table.set(variable_name, value)
+                return value, origin
+            return variable_assign
+
+        code = self.compile(node)
+
+        def operand(context):
+            return code(context), node
+        return operand
+
+    def compile_if_operand(self, node):
+        cases = [
+            (self.compile(condition), self.compile(expression) if should_return_null else self.compile_operand(expression), should_return_null)
+            for condition, expression, should_return_null in node.cases
+        ]
+        if node.else_case:
+            else_code = self.compile(node.else_case[0]) if node.else_case[1] else self.compile_operand(node.else_case[0])
+            else_should_return_null = node.else_case[1]
+        else:
+            else_code = None
+
+        def if_operand(context):
+            for condition_code, expression_code, should_return_null in cases:
+                if condition_code(context).is_true():
+                    value = expression_code(context)
+                    return (Number.null, node) if should_return_null else value
+
+            if else_code:
+                value = else_code(context)
+                return (Number.null, node) if else_should_return_null else value
+
+            return Number.null, node
+        return if_operand
+
+    def compile_IfNode(self, node, tail=False):
+        compile_branch = self.compile_tail if tail else self.compile
+        cases = [
+            (self.compile(condition), self.compile(expression) if should_return_null else compile_branch(expression), should_return_null)
+            for condition, expression, should_return_null in node.cases
+        ]
+        if node.else_case:
+            else_code = self.compile(node.else_case[0]) if node.else_case[1] else compile_branch(node.else_case[0])
+            else_should_return_null = node.else_case[1]
+        else:
+            else_code = None
+
+        def if_expression(context):
+            for condition_code, expression_code, should_return_null in cases:
+                if condition_code(context).is_true():
+                    value = expression_code(context)
+                    return Number.null if should_return_null else value
+
+            if else_code:
+                value = else_code(context)
+                return Number.null if else_should_return_null else value
+
+            return Number.null
+        return if_expression
+
+    def compile_ForNode(self, node):
+        variable_name = node.variable_name_token.value
+        start_code = self.compile(node.start_value_node)
+        end_code = self.compile(node.end_value_node)
+        step_code = self.compile(node.step_value_node) if node.step_value_node else None
+        self.loop_depth += 1
+        body_code = self.compile(node.body_node)
+        self.loop_depth -= 1
+        should_return_null = node.should_return_null
+
+        def for_expression(context):
+            elements = []
+            start_value = start_code(context)
+            end_value = end_code(context)
+            step_value = step_code(context) if step_code else None
+            symbol_table = context.symbol_table
+
+            # Operands are unwrapped in the same order as the tree-walker so bad ones fail the same way
+            i = start_value.value
+            step_value = step_value.value if step_value else 1
+            ascending = step_value >= 0
+            end_value = end_value.value
+            while (i < end_value) if ascending else (i > end_value):
+                symbol_table.set(variable_name, Number.of(i))
+                i += step_value
+
+                try:
+                    value = body_code(context)
+                except ContinueSignal:
+                    continue
+                except BreakSignal:
+                    break
+
+                elements.append(value)
+
+            return Number.null if should_return_null else List(elements)
+        return for_expression
+
+    def compile_WhileNode(self, node):
+        # The interpreter counts the condition as inside the loop as well
+        self.loop_depth += 1
+        condition_code = self.compile(node.condition_node)
+        body_code = self.compile(node.body_node)
+        self.loop_depth -= 1
+        should_return_null = node.should_return_null
+
+        def while_expression(context):
+            while condition_code(context).is_true():
+                try:
+                    body_code(context)
+                except ContinueSignal:
+                    continue
+                except BreakSignal:
+                    break
+
+            # The tree-walker never collects the body values of a while loop either
+            return Number.null if should_return_null else List([])
+        return while_expression
+
+    def compile_FunctionDefinitionNode(self, node):
+        function_name = node.variable_name_token.value if node.variable_name_token else None
+        body_node = node.body_node
+        outer = self.in_function, self.loop_depth
+        self.in_function, self.loop_depth = True, 0
+        body_code = self.compile_tail(body_node) if node.should_auto_return else self.compile(body_node)
+        self.in_function, self.loop_depth = outer
+        arguments = [argument.value for argument in node.argument_name_tokens]
+        should_auto_return = node.should_auto_return
+        memo_size = node.memo_size
+
+        def function_definition(context):
+            function_value = CompiledFunction(function_name, body_node, arguments, should_auto_return, body_code, memo_size)
+            if function_name:
+                context.symbol_table.set(function_name, function_value)
+            return function_value
+        return function_definition
+
+    def compile_CallNode(self, node, tail=False):
+        function_code = self.compile(node.function_node)
+        argument_codes = [self.compile(argument_node) for argument_node in node.argument_nodes]
+        pos_start, pos_end = node.pos_start, node.pos_end
+        function_node = origin_node(node.function_node)
+        function_pos_start, function_pos_end = function_node.pos_start, function_node.pos_end
+
+        def call(context):
+            value_to_call = None
+            try:
+                value_to_call = function_code(context)
+                arguments = [argument_code(context) for argument_code in argument_codes]
+
+                if type(value_to_call) is CompiledFunction:
+                    if tail:
+                        return TailCall(value_to_call, arguments, pos_start)
+                    return value_to_call.call(arguments, context, pos_start)
+                return unwrap(value_to_call.execute(arguments, context, pos_start, pos_end))
+            except RecursionError:
+                # Reported at the call of the function that went too deep, like in the interpreter
+                if type(value_to_call) is not CompiledFunction and context.parent is not None:
+                    raise
+                raise RuntimeFailure(RTError(function_pos_start, function_pos_end, 'Max recursion depth exceeded', context))
+        return call
+
+    def compile_StringNode(self, node):
+        value = String(node.token.value)
+
+        def string(context):
+            return value
+        return string
+
+    def compile_ListNode(self, node):
+        element_codes = [self.compile(element_node) for element_node in node.element_nodes]
+
+        def list_expression(context):
+            return List([element_code(context) for element_code in element_codes])
+        return list_expression
+
+    def compile_ReturnNode(self, node):
+        value_code = None
+        if node.node_to_return:
+            value_code = self.compile_tail(node.node_to_return) if self.in_function and not self.loop_depth else self.compile(node.node_to_return)
+
+        def return_statement(context):
+            raise ReturnSignal(value_code(context) if value_code else Number.null)
+        return return_statement
+
+    def compile_ContinueNode(self, node):
+        def continue_statement(context):
+            raise ContinueSignal
+        return continue_statement
+
+    def compile_BreakNode(self, node):
+        def break_statement(context):
+            raise BreakSignal
+        return break_statement
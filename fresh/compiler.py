@@ -0,0 +1,399 @@
+from fresh.nodes import VariableAssignNode, IfNode, CallNode, origin_node
+from fresh.operations import OperatorTable, lookup_operator_table
+from fresh.tokens import *
+from fresh.values import Number, String
+
+# Opcodes, every instruction is an (opcode, argument, position) tuple where position indexes CodeObject.positions
+NUMBER = 0
+STRING = 1
+LOAD_NAME = 2
+STORE_NAME = 3
+BINARY = 4
+NEGATE = 5
+NOT = 6
+POP = 7
+NULL = 8
+BUILD_LIST = 9
+JUMP = 10
+POP_JUMP_IF_FALSE = 11
+FOR_SETUP = 12
+# FOR_ITER jumps to its argument once the loop is done, its third field is the name of the loop variable instead
+FOR_ITER = 13
+FOR_APPEND = 14
+FOR_END = 15
+WHILE_END = 16
+MAKE_FUNCTION = 17
+CALL = 18
+# A call whose value the function returns, a BytecodeFunction runs in place of the caller's frame and anything else is called like CALL
+TAIL_CALL = 19
+RETURN = 20
+UNWIND = 21
+END_FUNCTION = 22
+END_PROGRAM = 23
+# Pushes the index of the position an error about the value after it points at, for operations whose operand is an if
+ORIGIN = 24
+# BINARY for operands that each sit on top of their ORIGIN, NEGATE and NOT take an argument of 1 for that
+TRACED_BINARY = 25
+
+OPCODE_NAMES = [
+    'NUMBER', 'STRING', 'LOAD_NAME', 'STORE_NAME', 'BINARY', 'NEGATE', 'NOT', 'POP', 'NULL', 'BUILD_LIST', 'JUMP',
+    'POP_JUMP_IF_FALSE', 'FOR_SETUP', 'FOR_ITER', 'FOR_APPEND', 'FOR_END', 'WHILE_END', 'MAKE_FUNCTION', 'CALL', 'TAIL_CALL', 'RETURN',
+    'UNWIND', 'END_FUNCTION', 'END_PROGRAM', 'ORIGIN', 'TRACED_BINARY'
+]
+
+# UNWIND arguments
+UNWIND_BREAK = 0
+UNWIND_CONTINUE = 1
+
+
+class CodeObject:
+    def __init__(self, name, is_function):
+        self.name = name
+        self.is_function = is_function
+        self.instructions = []
+        self.constants = []
+        self.names = []
+        self.positions = []
+        # (body start, body end, continue target, break target, stack depth) for every loop, innermost first
+        self.loops = []
+
+    def disassemble(self):
+        lines = []
+        for index, (opcode, argument, position) in enumerate(self.instructions):
+            lines.append(f'{index:>5} {OPCODE_NAMES[opcode]:<18} {argument}')
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return f'<code {self.name}>'
+
+
+# Holds what MAKE_FUNCTION needs to build a function value
+class FunctionTemplate:
+    def __init__(self, name, body_node, arguments, should_auto_return, code, memo_size):
+        self.name = name
+        self.body_node = body_node
+        self.arguments = arguments
+        self.should_auto_return = should_auto_return
+        self.code = code
+        self.memo_size = memo_size
+
+
+class Loop:
+    def __init__(self, depth, continue_target):
+        self.depth = depth
+        self.continue_target = continue_target
+        self.break_jumps = []
+
+
+class Compiler:
+    def __init__(self):
+        self.code = None
+        # Values on the stack at the current instruction, known statically since every branch leaves the same amount
+        self.depth = 0
+        self.loops = []
+        # Loops around the current instruction, conditions included, a call inside one is never compiled as a tail call
+        self.loop_depth = 0
+        self.constant_indexes = None
+        self.name_indexes = None
+
+    def compile_program(self, node):
+        return self.compile_code('<program>', node, False, END_PROGRAM, 0)
+
+    def compile_code(self, name, node, is_function, end_opcode, end_argument):
+        outer_state = self.code, self.depth, self.loops, self.loop_depth, self.constant_indexes, self.name_indexes
+        self.code = CodeObject(name, is_function)
+        self.depth = 0
+        self.loops = []
+        self.loop_depth = 0
+        self.constant_indexes = {}
+        self.name_indexes = {}
+
+        if is_function and end_argument:
+            self.compile_tail(node)
+        else:
+            self.compile(node)
+        self.emit(end_opcode, end_argument, stack_effect=-1)
+
+        code = self.code
+        self.code, self.depth, self.loops, self.loop_depth, self.constant_indexes, self.name_indexes = outer_state
+        return code
+
+    # Like Interpreter.visit_tail, calls to compile where the function returns their value as it is
+    def compile_tail(self, node):
+        node_type = type(node)
+        if node_type is CallNode:
+            self.compile_CallNode(node, True)
+        elif node_type is IfNode:
+            self.compile_IfNode(node, True)
+        else:
+            self.compile(node)
+
+    def compile(self, node):
+        method_name = f'compile_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_compile_method)
+        method(node)
+
+    def no_compile_method(self, node):
+        raise Exception(f'No compile_{type(node).__name__} method defined')
+
+    def emit(self, opcode, argument=0, position=-1, stack_effect=0):
+        self.code.instructions.append((opcode, argument, position))
+        self.depth += stack_effect
+        return len(self.code.instructions) - 1
+
+    def patch(self, index, argument):
+        opcode, _, position = self.code.instructions[index]
+        self.code.instructions[index] = (opcode, argument, position)
+
+    def next_index(self):
+        return len(self.code.instructions)
+
+    def constant(self, value, key=None):
+        # Keyed by type as well so 1 and 1.0 stay apart
+        if key is None:
+            key = (type(value), value)
+        index = self.constant_indexes.get(key)
+        if index is None:
+            index = self.constant_indexes[key] = len(self.code.constants)
+            self.code.constants.append(value)
+        return index
+
+    # Operator tables are dicts, which are neither hashable nor equal only to themselves
+    def operator_constant(self, operator_token):
+        table = lookup_operator_table(operator_token)
+        return self.constant(table, (OperatorTable, table.method_name))
+
+    def name(self, name):
+        index = self.name_indexes.get(name)
+        if index is None:
+            index = self.name_indexes[name] = len(self.code.names)
+            self.code.names.append(name)
+        return index
+
+    def position(self, node):
+        self.code.positions.append((node.pos_start, node.pos_end))
+        return len(self.code.positions) - 1
+
+    def compile_NumberNode(self, node):
+        # Values are immutable, so every run of the instruction pushes the same one
+        value = node.token.value
+        self.emit(NUMBER, self.constant(Number.of(value), (Number, type(value), value)), stack_effect=1)
+
+    def compile_StringNode(self, node):
+        value = node.token.value
+        self.emit(STRING, self.constant(String(value), (String, value)), stack_effect=1)
+
+    def compile_VariableAccessNode(self, node):
+        self.emit(LOAD_NAME, self.name(node.variable_name_token.value), self.position(node), 1)
+
+    def compile_VariableAssignNode(self, node):
+        self.compile(node.value_node)
+        # The assigned value stays on the stack as the value of the expression
+        self.emit(STORE_NAME, self.name(node.token.value))
+
+    def compile_BinOpNode(self, node):
+        if node.traces_branches:
+            self.compile_operand(node.left_node)
+            self.compile_operand(node.right_node)
+            self.emit(TRACED_BINARY, self.operator_constant(node.operator_token), stack_effect=-3)
+            return
+
+        self.compile(node.left_node)
+        self.compile(node.right_node)
+        # A failed operation is reported from the start of the left operand to the end of the right one, or on the left one alone
+        left_node, right_node = origin_node(node.left_node), origin_node(node.right_node)
+        self.code.positions.append((left_node.pos_start, left_node.pos_end, right_node.pos_end))
+        self.emit(BINARY, self.operator_constant(node.operator_token), len(self.code.positions) - 1, -1)
+
+    def compile_UnaryOpNode(self, node):
+        # A plus leaves the value on the stack as it is
+        if node.operator_token.type == TT_PLUS:
+            self.compile(node.node)
+            return
+
+        opcode = NEGATE if node.operator_token.type == TT_MINUS else NOT
+        if node.traces_branches:
+            self.compile_operand(node.node)
+            self.emit(opcode, 1, stack_effect=-1)
+        else:
+            self.compile(node.node)
+            self.emit(opcode, 0, self.position(origin_node(node.node)))
+
+    # Like Interpreter.visit_operand, leaves the value on top of the ORIGIN of the node an error about it points at
+    def compile_operand(self, node):
+        node_type = type(node)
+        if node_type is IfNode:
+            self.compile_if_operand(node)
+        elif node_type is VariableAssignNode:
+            self.compile_operand(node.value_node)
+            self.emit(STORE_NAME, self.name(node.token.value))
+        else:
+            self.emit(ORIGIN, 0, self.position(node), 1)
+            self.compile(node)
+
+    def compile_if_operand(self, node):
+        end_jumps = []
+        depth = self.depth
+
+        for condition, expression, should_return_null in node.cases:
+            self.compile(condition)
+            next_case_jump = self.emit(POP_JUMP_IF_FALSE, stack_effect=-1)
+            self.compile_operand_branch(node, expression, should_return_null)
+            end_jumps.append(self.emit(JUMP))
+            self.depth = depth
+            self.patch(next_case_jump, self.next_index())
+
+        if node.else_case:
+            expression, should_return_null = node.else_case
+            self.compile_operand_branch(node, expression, should_return_null)
+        else:
+            self.emit(ORIGIN, 0, self.position(node), 1)
+            self.emit(NULL, stack_effect=1)
+
+        for jump in end_jumps:
+            self.patch(jump, self.next_index())
+
+    def compile_operand_branch(self, node, expression, should_return_null):
+        if not should_return_null:
+            self.compile_operand(expression)
+            return
+        self.emit(ORIGIN, 0, self.position(node), 1)
+        self.compile(expression)
+        self.emit(POP, 1, stack_effect=-1)
+        self.emit(NULL, stack_effect=1)
+
+    def compile_IfNode(self, node, tail=False):
+        end_jumps = []
+        depth = self.depth
+
+        for condition, expression, should_return_null in node.cases:
+            self.compile(condition)
+            next_case_jump = self.emit(POP_JUMP_IF_FALSE, stack_effect=-1)
+            self.compile_branch(expression, should_return_null, tail)
+            end_jumps.append(self.emit(JUMP))
+            self.depth = depth
+            self.patch(next_case_jump, self.next_index())
+
+        if node.else_case:
+            expression, should_return_null = node.else_case
+            self.compile_branch(expression, should_return_null, tail)
+        else:
+            self.emit(NULL, stack_effect=1)
+
+        for jump in end_jumps:
+            self.patch(jump, self.next_index())
+
+    def compile_branch(self, expression, should_return_null, tail):
+        if tail and not should_return_null:
+            self.compile_tail(expression)
+        else:
+            self.compile(expression)
+        if should_return_null:
+            self.emit(POP, 1, stack_effect=-1)
+            self.emit(NULL, stack_effect=1)
+
+    def compile_ForNode(self, node):
+        self.loop_depth += 1
+        self.compile(node.start_value_node)
+        self.compile(node.end_value_node)
+        if node.step_value_node:
+            self.compile(node.step_value_node)
+            self.emit(FOR_SETUP, 1, stack_effect=-2)
+        else:
+            self.emit(FOR_SETUP, 0, stack_effect=-1)
+
+        # The loop state sits on the stack below the body
+        iteration = self.emit(FOR_ITER, 0, self.name(node.variable_name_token.value))
+        loop = Loop(self.depth, iteration)
+        body_start, body_end = self.compile_loop_body(node.body_node, loop)
+        self.emit(FOR_APPEND, stack_effect=-1)
+        self.emit(JUMP, iteration)
+
+        self.patch(iteration, self.next_index())
+        self.finish_loop(loop, body_start, body_end)
+        self.emit(FOR_END, int(node.should_return_null))
+        self.loop_depth -= 1
+
+    def compile_WhileNode(self, node):
+        self.loop_depth += 1
+        condition = self.next_index()
+        self.compile(node.condition_node)
+        exit_jump = self.emit(POP_JUMP_IF_FALSE, stack_effect=-1)
+
+        loop = Loop(self.depth, condition)
+        body_start, body_end = self.compile_loop_body(node.body_node, loop)
+        self.emit(POP, 1, stack_effect=-1)
+        self.emit(JUMP, condition)
+
+        self.patch(exit_jump, self.next_index())
+        self.finish_loop(loop, body_start, body_end)
+        self.emit(WHILE_END, int(node.should_return_null), stack_effect=1)
+        self.loop_depth -= 1
+
+    def compile_loop_body(self, body_node, loop):
+        body_start = self.next_index()
+        self.loops.append(loop)
+        self.compile(body_node)
+        self.loops.pop()
+        return body_start, self.next_index()
+
+    def finish_loop(self, loop, body_start, body_end):
+        break_target = self.next_index()
+        for jump in loop.break_jumps:
+            self.patch(jump, break_target)
+        # break and continue coming out of a call made in the body are only resolved at runtime, through this table
+        self.code.loops.append((body_start, body_end, loop.continue_target, break_target, loop.depth))
+
+    def compile_FunctionDefinitionNode(self, node):
+        function_name = node.variable_name_token.value if node.variable_name_token else None
+        arguments = [argument.value for argument in node.argument_name_tokens]
+        code = self.compile_code(
+            function_name or '<anonymous>', node.body_node, True, END_FUNCTION, int(node.should_auto_return)
+        )
+        template = FunctionTemplate(function_name, node.body_node, arguments, node.should_auto_return, code, node.memo_size)
+        self.emit(MAKE_FUNCTION, self.constant(template), stack_effect=1)
+
+    def compile_CallNode(self, node, tail=False):
+        self.compile(node.function_node)
+        for argument_node in node.argument_nodes:
+            self.compile(argument_node)
+        # Calls keep the callee position as well, Max recursion depth exceeded is reported there
+        function_node = origin_node(node.function_node)
+        self.code.positions.append((node.pos_start, node.pos_end, function_node.pos_start, function_node.pos_end))
+        self.emit(TAIL_CALL if tail else CALL, len(node.argument_nodes), len(self.code.positions) - 1, -len(node.argument_nodes))
+
+    def compile_ListNode(self, node):
+        for element_node in node.element_nodes:
+            self.compile(element_node)
+        count = len(node.element_nodes)
+        self.emit(BUILD_LIST, count, stack_effect=1 - count)
+
+    def compile_ReturnNode(self, node):
+        if not node.node_to_return:
+            self.emit(NULL, stack_effect=1)
+        elif self.code.is_function and not self.loop_depth:
+            self.compile_tail(node.node_to_return)
+        else:
+            self.compile(node.node_to_return)
+        self.emit(RETURN)
+
+    def compile_ContinueNode(self, node):
+        self.compile_loop_exit(UNWIND_CONTINUE)
+
+    def compile_BreakNode(self, node):
+        self.compile_loop_exit(UNWIND_BREAK)
+
+    def compile_loop_exit(self, kind):
+        depth = self.depth
+        if not self.loops:
+            self.emit(UNWIND, kind)
+        else:
+            loop = self.loops[-1]
+            if depth > loop.depth:
+                self.emit(POP, depth - loop.depth)
+            if kind == UNWIND_CONTINUE:
+                self.emit(JUMP, loop.continue_target)
+            else:
+                loop.break_jumps.append(self.emit(JUMP))
+        # Nothing after this runs, but the statement still counts as a value for the enclosing list
+        self.depth = depth + 1
@@ -1,6 +1,23 @@
 class Context:
+    __slots__ = ('display_name', 'parent', 'parent_entry_position', 'symbol_table', 'tail_calls', 'loop_depth')
+
     def __init__(self, display_name, parent=None, parent_entry_position=None):
         self.display_name = display_name
         self.parent = parent
         self.parent_entry_position = parent_entry_position
         self.symbol_table = None
+        # Calls in tail position run in the context of the function that made them, see Function.generate_tail_context.
+        # Each one is kept as [display name, position, count] so tracebacks still list them, repeats of the same call share one entry.
+        self.tail_calls = None
+        # Loops the interpreter is inside of in this call right now, a call in one of them is never a tail call
+        self.loop_depth = 0
+
+    def add_tail_call(self, display_name, position):
+        if self.tail_calls is None:
+            self.tail_calls = [[display_name, position, 1]]
+            return
+        last = self.tail_calls[-1]
+        if last[0] == display_name and last[1] is position:
+            last[2] += 1
+        else:
+            self.tail_calls.append([display_name, position, 1])
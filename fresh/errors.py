@@ -46,6 +46,10 @@ class RTError(Error):
         contexts = []
         while context:
             contexts.append(f'\n    File {pos.filename}, line {pos.line + 1}:{pos.column + 1}, in {context.display_name}')
+            if context.tail_calls:
+                for display_name, tail_pos, count in reversed(context.tail_calls):
+                    line = f'\n    File {tail_pos.filename}, line {tail_pos.line + 1}:{tail_pos.column + 1}, in {display_name}'
+                    contexts.extend([line] * count)
             pos = context.parent_entry_position
             context = context.parent
         contexts.reverse()
@@ -53,11 +57,34 @@ class RTError(Error):
         return 'Traceback (most recent call last):' + result
 
 
+# What a failed operation on values returns, values have no position so the engine places it at the operands
+class OperationError:
+    def __init__(self, details, spans_operands=True):
+        self.details = details
+        # Whether the error runs on to the end of the right operand or stays on the left one
+        self.spans_operands = spans_operands
+
+    def at(self, pos_start, pos_end, other_pos_end, context):
+        return RTError(pos_start, other_pos_end if self.spans_operands else pos_end, self.details, context)
+
+
 class ExpectedCharError(Error):
     def __init__(self, pos_start, pos_end, details, expected_char):
         super().__init__(pos_start, pos_end, 'ExpectedCharError', f"'{expected_char}' {details}")
 
 
+class ParseFailure(Exception):
+    def __init__(self, error):
+        super().__init__(error.details)
+        self.error = error
+
+
+class RuntimeFailure(Exception):
+    def __init__(self, error):
+        super().__init__(error.details)
+        self.error = error
+
+
 # Error Arrows #
 
 
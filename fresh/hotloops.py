@@ -0,0 +1,373 @@
+import math
+
+from fresh.nodes import NumberNode, BinOpNode, UnaryOpNode, VariableAccessNode, VariableAssignNode, IfNode, ForNode, WhileNode, ListNode, children
+from fresh.tokens import *
+from fresh.values import Number, Int, Float, List
+
+# Interpreted iterations a loop runs before it is compiled, and again each time compiled code hands it back
+HOT_LOOP_THRESHOLD = 64
+
+# Python for each operator on unboxed numbers, operands are always both evaluated like in the interpreter.
+# Comparisons give 1 or 0 like Number.true and Number.false.
+OPERATORS = {
+    TT_PLUS: '({} + {})',
+    TT_MINUS: '({} - {})',
+    TT_MUL: '({} * {})',
+    TT_DIV: '({} / {})',
+    TT_POW: 'power({}, {})',
+    TT_DOUBLEEQUALS: '(1 if {} == {} else 0)',
+    TT_NOTEQUALS: '(1 if {} != {} else 0)',
+    TT_GREATER: '(1 if {} > {} else 0)',
+    TT_GREATEREQUALS: '(1 if {} >= {} else 0)',
+    TT_LESS: '(1 if {} < {} else 0)',
+    TT_LESSEQUALS: '(1 if {} <= {} else 0)',
+    TT_QUESTIONMARK: 'index({}, {})',
+    'and': 'both({}, {})',
+    'or': 'either({}, {})',
+}
+
+
+class Unsupported(Exception):
+    pass
+
+
+# Raised by compiled code for a value the interpreter would carry on with but compiled code cannot hold
+class HandBack(Exception):
+    pass
+
+
+def power(left, right):
+    result = left ** right
+    if type(result) is complex:
+        raise HandBack
+    return result
+
+
+# Packed lists hold their numbers unboxed already
+def index(elements, position):
+    element = elements[position]
+    element_type = type(element)
+    if element_type is int or element_type is float:
+        return element
+    if element_type is not Int and element_type is not Float:
+        raise HandBack
+    return element.value
+
+
+def both(left, right):
+    return int(left and right)
+
+
+def either(left, right):
+    return int(left or right)
+
+
+RUNTIME = {
+    'power': power,
+    'index': index,
+    'both': both,
+    'either': either,
+    'box': Number.of,
+}
+
+
+# Finds the loops whose bodies only set variables to arithmetic, comparisons and ? on lists, and gives each a HotLoop.
+# Calls, strings, list literals, nested loops, break, continue and return keep a loop in the interpreter.
+class LoopSpecializer:
+    def __init__(self, threshold=HOT_LOOP_THRESHOLD):
+        self.threshold = threshold
+
+    def specialize_program(self, node):
+        try:
+            self.visit(node)
+        except RecursionError:
+            # Loops not reached stay interpreted
+            pass
+        return node
+
+    def visit(self, node):
+        node_type = type(node)
+        if node_type is ForNode or node_type is WhileNode:
+            try:
+                node.hot_loop = HotLoop(node, LoopShape(node), self.threshold)
+            except Unsupported:
+                pass
+        for child in children(node):
+            self.visit(child)
+
+
+# The variables a loop uses and the Python it compiles to. Names the loop sets are kept in locals while it runs,
+# the ones it only reads are passed in once, as numbers or as the elements of a list that ? indexes.
+class LoopShape:
+    def __init__(self, node):
+        self.node = node
+        self.locals = {}
+        self.slots = {}
+        # Names set in the loop, in order, and those read before the loop sets them in the same iteration
+        self.assigned = []
+        self.read_first = set()
+        self.numbers = []
+        self.lists = []
+        self.definitely_set = set()
+        self.lines = []
+
+        # Every name the loop sets gets its local first, reads before the set in the body then find it
+        if type(node) is ForNode:
+            self.loop_variable = self.declare(node.variable_name_token.value, node.slot)
+        self.declare_assigned(node.body_node)
+        if not self.assigned:
+            # The condition of such a while loop never changes
+            raise Unsupported
+
+        if type(node) is ForNode:
+            self.definitely_set.add(node.variable_name_token.value)
+            if node.should_return_null:
+                self.statement(node.body_node, 3)
+            else:
+                self.line(3, f'elements.append(box({self.expression(node.body_node)}))')
+        else:
+            self.condition = self.expression(node.condition_node)
+            self.statement(node.body_node, 3)
+
+    def line(self, depth, text):
+        self.lines.append('    ' * depth + text)
+
+    def slot(self, name, slot):
+        if self.slots.setdefault(name, slot) != slot:
+            raise Unsupported
+
+    def declare(self, name, slot):
+        self.slot(name, slot)
+        local = self.locals.get(name)
+        if local is None:
+            local = self.locals[name] = f'v{len(self.assigned)}'
+            self.assigned.append(name)
+        return local
+
+    def declare_assigned(self, node):
+        if type(node) is VariableAssignNode:
+            self.declare(node.token.value, node.slot)
+        for child in children(node):
+            self.declare_assigned(child)
+
+    def assign(self, name, slot):
+        self.slot(name, slot)
+        return self.locals[name]
+
+    def read(self, name, slot):
+        self.slot(name, slot)
+        if name not in self.definitely_set:
+            self.read_first.add(name)
+        local = self.locals.get(name)
+        if local is None:
+            if name in self.lists:
+                raise Unsupported
+            local = self.locals[name] = f'n{len(self.numbers)}'
+            self.numbers.append(name)
+        return local
+
+    def read_list(self, name, slot):
+        self.slot(name, slot)
+        # A list the loop sets or also does arithmetic with is not a plain list of elements
+        if name in self.locals:
+            raise Unsupported
+        if name not in self.lists:
+            self.lists.append(name)
+        return f'l{self.lists.index(name)}'
+
+    def statement(self, node, depth, definite=True):
+        node_type = type(node)
+        if node_type is ListNode:
+            if not node.element_nodes:
+                self.line(depth, 'pass')
+            for element_node in node.element_nodes:
+                self.statement(element_node, depth, definite)
+        elif node_type is VariableAssignNode:
+            value = self.expression(node.value_node, definite)
+            self.line(depth, f'{self.assign(node.token.value, node.slot)} = {value}')
+            if definite:
+                self.definitely_set.add(node.token.value)
+        elif node_type is IfNode:
+            keyword = 'if'
+            for condition, expression, should_return_null in node.cases:
+                # Only the first condition always runs
+                self.line(depth, f'{keyword} {self.expression(condition, definite and keyword == "if")}:')
+                self.statement(expression, depth + 1, False)
+                keyword = 'elif'
+            if node.else_case:
+                self.line(depth, 'else:')
+                self.statement(node.else_case[0], depth + 1, False)
+        else:
+            self.line(depth, self.expression(node, definite))
+
+    def expression(self, node, definite=True):
+        node_type = type(node)
+        if node_type is NumberNode:
+            value = node.token.value
+            if type(value) is float and not math.isfinite(value):
+                raise Unsupported
+            return repr(value)
+        if node_type is VariableAccessNode:
+            return self.read(node.variable_name_token.value, node.slot)
+        if node_type is VariableAssignNode:
+            value = self.expression(node.value_node, definite)
+            local = self.assign(node.token.value, node.slot)
+            if definite:
+                self.definitely_set.add(node.token.value)
+            return f'({local} := {value})'
+        if node_type is BinOpNode and not node.traces_branches:
+            operator_token = node.operator_token
+            template = OPERATORS.get(operator_token.value if operator_token.type == TT_KEYWORD else operator_token.type)
+            if template is None:
+                raise Unsupported
+            if operator_token.type == TT_QUESTIONMARK:
+                if type(node.left_node) is not VariableAccessNode:
+                    raise Unsupported
+                left = self.read_list(node.left_node.variable_name_token.value, node.left_node.slot)
+            else:
+                left = self.expression(node.left_node, definite)
+            # and and or only short-circuit in Python, here the right operand always runs
+            return template.format(left, self.expression(node.right_node, definite))
+        if node_type is UnaryOpNode and not node.traces_branches:
+            operand = self.expression(node.node, definite)
+            if node.operator_token.type == TT_MINUS:
+                return f'({operand} * -1)'
+            if node.operator_token.matches(TT_KEYWORD, 'not'):
+                return f'(0 if {operand} else 1)'
+            return operand
+        raise Unsupported
+
+    # The generated function returns whether the loop finished, where to resume and the values of the names it set.
+    # An exception stops it with the values from the start of the iteration, which the interpreter then runs again.
+    def source(self, ascending):
+        assigned = [self.locals[name] for name in self.assigned]
+        snapshot = [f's{local}' for local in assigned]
+        arguments = ', '.join(assigned + [self.locals[name] for name in self.numbers] + [f'l{i}' for i in range(len(self.lists))])
+        values = ', '.join(assigned)
+        saved = ', '.join(snapshot)
+        lines = []
+        if type(self.node) is ForNode:
+            lines.append(f'def loop(i, end, step, elements, {arguments}):')
+            lines.append(f'    si, {saved} = i, {values}')
+            lines.append('    try:')
+            lines.append(f'        while i {"<" if ascending else ">"} end:')
+            lines.append(f'            si, {saved} = i, {values}')
+            lines.append(f'            {self.loop_variable} = i')
+            lines.append('            i += step')
+        else:
+            lines.append(f'def loop({arguments}):')
+            lines.append(f'    si, {saved} = None, {values}')
+            lines.append('    try:')
+            lines.append('        while True:')
+            lines.append(f'            si, {saved} = None, {values}')
+            lines.append(f'            if not {self.condition}:')
+            lines.append('                break')
+        lines.extend(self.lines)
+        lines.append('    except Exception:')
+        lines.append(f'        return False, si, {saved}')
+        lines.append(f'    return True, {"i" if type(self.node) is ForNode else "None"}, {values}')
+        return '\n'.join(lines)
+
+
+# Counts down the interpreted iterations of one loop, then runs the rest of the loop as compiled Python
+class HotLoop:
+    # Across all loops, shown by run.py --profile
+    compiled = 0
+    handed_back = 0
+
+    def __init__(self, node, shape, threshold):
+        self.shape = shape
+        self.threshold = threshold
+        self.countdown = threshold
+        # Compiled loop by whether it counts up, a for loop can be run with a step of either sign
+        self.functions = {}
+
+    def function(self, ascending):
+        function = self.functions.get(ascending)
+        if function is None:
+            namespace = dict(RUNTIME)
+            try:
+                exec(compile(self.shape.source(ascending), '<fresh hot loop>', 'exec'), namespace)
+            except (SyntaxError, RecursionError, MemoryError):
+                # CPython limits how deeply expressions nest, the loop stays interpreted
+                return None
+            function = self.functions[ascending] = namespace['loop']
+            HotLoop.compiled += 1
+        return function
+
+    # The values the loop starts from, or None when one of them is not what the compiled code works on
+    def arguments(self, context):
+        shape = self.shape
+        table = context.symbol_table
+        arguments = []
+        for name in shape.assigned:
+            if name in shape.read_first:
+                value = unboxed(read(table, name, shape.slots[name]))
+                if value is None:
+                    return None
+                arguments.append(value)
+            else:
+                arguments.append(None)
+        for name in shape.numbers:
+            value = unboxed(read(table, name, shape.slots[name]))
+            if value is None:
+                return None
+            arguments.append(value)
+        for name in shape.lists:
+            value = read(table, name, shape.slots[name])
+            if type(value) is not List:
+                return None
+            arguments.append(value.trimmed_store())
+        return arguments
+
+    # Runs the loop from iteration i on. Returns None when it could not, otherwise whether it finished and the i to go on from.
+    # A loop that finished goes straight to compiled code next time, one that could not run or was handed back cools down first.
+    def run_for(self, context, i, end, step, elements):
+        if type(end) not in (int, float) or type(step) not in (int, float):
+            self.countdown = self.threshold
+            return None
+        arguments = self.arguments(context)
+        function = self.function(step >= 0) if arguments is not None else None
+        if function is None:
+            self.countdown = self.threshold
+            return None
+        finished, i, *values = function(i, end, step, elements, *arguments)
+        self.store(context, values, finished)
+        return finished, i
+
+    def run_while(self, context):
+        arguments = self.arguments(context)
+        function = self.function(True) if arguments is not None else None
+        if function is None:
+            self.countdown = self.threshold
+            return None
+        finished, _, *values = function(*arguments)
+        self.store(context, values, finished)
+        return finished
+
+    def store(self, context, values, finished):
+        if not finished:
+            HotLoop.handed_back += 1
+            self.countdown = self.threshold
+        table = context.symbol_table
+        for name, value in zip(self.shape.assigned, values):
+            # A name the loop never got to set keeps whatever it had
+            if value is None:
+                continue
+            slot = self.shape.slots[name]
+            if slot is None:
+                table.set(name, Number.of(value))
+            else:
+                table.values[slot] = Number.of(value)
+
+
+def read(table, name, slot):
+    if slot is None:
+        return table.get(name)
+    # Like Interpreter.visit_VariableAccessNode, until the function sets its local the name comes from its callers
+    return table.values[slot] or table.parent.get(name)
+
+
+def unboxed(value):
+    value_type = type(value)
+    return value.value if value_type is Int or value_type is Float else None
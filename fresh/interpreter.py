@@ -1,10 +1,23 @@
-from fresh.errors import RTError
-from fresh.runtimeresult import RuntimeResult
+from fresh.errors import RTError, RuntimeFailure
+from fresh.nodes import VariableAccessNode, VariableAssignNode, IfNode, CallNode, origin_node
+from fresh.signals import ReturnSignal, BreakSignal, ContinueSignal, TailCall, unwrap
+from fresh.symboltable import shadow_versions, LOCAL_NAME, LookupCacheStats
 from fresh.values import Number, Function, String, List
 from fresh.tokens import *
 
 
+# Every visit returns the plain value of its node. Errors, return, break and continue are raised and only cost anything when they happen.
+# Values carry no position, errors are placed at the nodes that produced the values involved.
 class Interpreter:
+    def run(self, node, context):
+        try:
+            return self.visit(node, context), None
+        except RuntimeFailure as failure:
+            return None, failure.error
+        except (ReturnSignal, BreakSignal, ContinueSignal):
+            # A return or break at the top level ends the program without a value
+            return None, None
+
     def visit(self, node, context):
         method_name = f'visit_{type(node).__name__}'
         method = getattr(self, method_name, self.no_visit_method)
@@ -13,133 +26,139 @@ class Interpreter:
     def no_visit_method(self, node, context):
         raise Exception(f'No visit_{type(node).__name__} method defined')
 
+    # Visits a node whose value the running function returns as it is. A call to another Fresh function
+    # comes back as a TailCall, and the branches of an if are in tail position too.
+    def visit_tail(self, node, context):
+        node_type = type(node)
+        if node_type is CallNode:
+            return self.visit_CallNode(node, context, True)
+        if node_type is IfNode:
+            return self.visit_IfNode(node, context, True)
+        return self.visit(node, context)
+
     def visit_NumberNode(self, node, context):
-        return RuntimeResult().success(Number(node.token.value).set_context(context).set_pos(node.pos_start, node.pos_end))
+        value = node.constant
+        if value is None:
+            return Number.of(node.token.value)
+        return value
 
     def visit_VariableAccessNode(self, node, context):
-        response = RuntimeResult()
         variable_name = node.variable_name_token.value
-        value = context.symbol_table.get(variable_name)
+        if node.slot is None:
+            # A tree only ever runs against one global table, so an unchanged version means the name is still found there
+            cache = node.cache
+            if cache is not None and cache[1] == shadow_versions.get(variable_name, 0):
+                value = cache[0].symbols.get(variable_name)
+                if value is not None:
+                    LookupCacheStats.hits += 1
+                    return value
+            LookupCacheStats.misses += 1
+            version = shadow_versions.get(variable_name, 0)
+            value, table = context.symbol_table.lookup(variable_name)
+            if table is not None and table.parent is None and version != LOCAL_NAME:
+                node.cache = (table, version)
+        else:
+            # Until the function sets its local the name can still come from one of its callers
+            frame = context.symbol_table
+            value = frame.values[node.slot] or frame.parent.get(variable_name)
         if not value:
-            return response.failure(RTError(node.pos_start, node.pos_end, f'{variable_name} is not defined.', context))
+            raise RuntimeFailure(RTError(node.pos_start, node.pos_end, f'{variable_name} is not defined.', context))
 
-        value = value.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
-        return response.success(value)
+        return value
 
     def visit_VariableAssignNode(self, node, context):
-        response = RuntimeResult()
+        return self.assign(node, self.visit(node.value_node, context), context)
+
+    def assign(self, node, value, context):
         variable_name = node.token.value
-        value = response.register(self.visit(node.value_node, context))
-        if response.should_return():
-            return response
         if isinstance(value, List):
             value = value.copy_as_true_new()
-        context.symbol_table.set(variable_name, value)
-        return response.success(value)
+        if node.slot is None:
+            context.symbol_table.set(variable_name, value)
+        else:
+            context.symbol_table.values[node.slot] = value
+        return value
 
     def visit_BinOpNode(self, node, context):
-        response = RuntimeResult()
-        error = None
-        result = None
-        left_node = response.register(self.visit(node.left_node, context))
-        if response.should_return():
-            return response
-        right_node = response.register(self.visit(node.right_node, context))
-        if response.should_return():
-            return response
-
-        if node.operator_token.type == TT_PLUS:
-            result, error = left_node.added_to(right_node)
-        elif node.operator_token.type == TT_MINUS:
-            result, error = left_node.subtracted_by(right_node)
-        elif node.operator_token.type == TT_MUL:
-            result, error = left_node.multiplied_by(right_node)
-        elif node.operator_token.type == TT_DIV:
-            result, error = left_node.divided_by(right_node)
-        elif node.operator_token.type == TT_POW:
-            result, error = left_node.powered_by(right_node)
-        elif node.operator_token.type == TT_DOUBLEEQUALS:
-            result, error = left_node.get_comparison_equals(right_node)
-        elif node.operator_token.type == TT_NOTEQUALS:
-            result, error = left_node.get_comparison_notequals(right_node)
-        elif node.operator_token.type == TT_GREATER:
-            result, error = left_node.get_comparison_greaterthan(right_node)
-        elif node.operator_token.type == TT_GREATEREQUALS:
-            result, error = left_node.get_comparison_greaterequals(right_node)
-        elif node.operator_token.type == TT_LESS:
-            result, error = left_node.get_comparison_lessthan(right_node)
-        elif node.operator_token.type == TT_LESSEQUALS:
-            result, error = left_node.get_comparison_lessequals(right_node)
-        elif node.operator_token.matches(TT_KEYWORD, 'and'):
-            result, error = left_node.anded_by(right_node)
-        elif node.operator_token.matches(TT_KEYWORD, 'or'):
-            result, error = left_node.ored_by(right_node)
-        elif node.operator_token.type == TT_QUESTIONMARK:
-            result, error = left_node.query_by(right_node)
+        if node.traces_branches:
+            left_node, left_origin = self.visit_operand(node.left_node, context)
+            right_node, right_origin = self.visit_operand(node.right_node, context)
+        else:
+            left_node = self.visit(node.left_node, context)
+            right_node = self.visit(node.right_node, context)
+        result, error = node.operation[type(left_node), type(right_node)](left_node, right_node)
 
         if error:
-            return response.failure(error)
-        return response.success(result.set_pos(node.pos_start, node.pos_end).set_context(context))
+            if node.traces_branches:
+                left, right = left_origin, right_origin
+            else:
+                left, right = origin_node(node.left_node), origin_node(node.right_node)
+            raise RuntimeFailure(error.at(left.pos_start, left.pos_end, right.pos_end, context))
+        return result
 
     def visit_UnaryOpNode(self, node, context):
-        response = RuntimeResult()
-        number = response.register(self.visit(node.node, context))
-        if response.should_return():
-            return response
+        if node.traces_branches:
+            number, operand = self.visit_operand(node.node, context)
+        else:
+            number = self.visit(node.node, context)
 
         error = None
 
         if node.operator_token.type == TT_MINUS:
-            number, error = number.multiplied_by(Number(-1))
+            number, error = number.multiplied_by(Number.of(-1))
         elif node.operator_token.matches(TT_KEYWORD, 'not'):
             number, error = number.notted()
 
         if error:
-            return response.failure(error)
-        else:
-            return response.success(number.set_pos(node.pos_start, node.pos_end).set_context(context))
-
-    def visit_IfNode(self, node, context):
-        response = RuntimeResult()
-
+            if not node.traces_branches:
+                operand = origin_node(node.node)
+            raise RuntimeFailure(error.at(operand.pos_start, operand.pos_end, operand.pos_end, context))
+        return number
+
+    def visit_IfNode(self, node, context, tail=False):
+        branch = self.select_branch(node, context)
+        if branch is None:
+            return Number.null
+
+        expression, should_return_null = branch
+        if should_return_null:
+            self.visit(expression, context)
+            return Number.null
+        return self.visit_tail(expression, context) if tail else self.visit(expression, context)
+
+    def select_branch(self, node, context):
         for condition, expression, should_return_null in node.cases:
-            condition_value = response.register(self.visit(condition, context))
-            if response.should_return():
-                return response
-
-            if condition_value.is_true():
-                expression_value = response.register(self.visit(expression, context))
-                if response.should_return():
-                    return response
-                return response.success(Number.null if should_return_null else expression_value)
-
-        if node.else_case:
-            expression, should_return_null = node.else_case
-            else_value = response.register(self.visit(expression, context))
-            if response.should_return():
-                return response
-            return response.success(Number.null if should_return_null else else_value)
-
-        return response.success(Number.null)
+            if self.visit(condition, context).is_true():
+                return expression, should_return_null
+        return node.else_case
+
+    # Visits an operand of a node with traces_branches set, along with the node an error about its value points at.
+    # An if hands on the branch that ran, the null of a statement branch or a missing else stays with the if.
+    def visit_operand(self, node, context):
+        node_type = type(node)
+        if node_type is IfNode:
+            branch = self.select_branch(node, context)
+            if branch is None:
+                return Number.null, node
+            expression, should_return_null = branch
+            if should_return_null:
+                self.visit(expression, context)
+                return Number.null, node
+            return self.visit_operand(expression, context)
+        if node_type is VariableAssignNode:
+            value, origin = self.visit_operand(node.value_node, context)
+            return self.assign(node, value, context), origin
+        return self.visit(node, context), node
 
     def visit_ForNode(self, node, context):
-        response = RuntimeResult()
         elements = []
 
-        start_value = response.register(self.visit(node.start_value_node, context))
-        if response.should_return():
-            return response
-
-        end_value = response.register(self.visit(node.end_value_node, context))
-        if response.should_return():
-            return response
-
+        start_value = self.visit(node.start_value_node, context)
+        end_value = self.visit(node.end_value_node, context)
         if node.step_value_node:
-            step_value = response.register(self.visit(node.step_value_node, context))
-            if response.should_return():
-                return response
+            step_value = self.visit(node.step_value_node, context)
         else:
-            step_value = Number(1)
+            step_value = Number.of(1)
 
         i = start_value.value
 
@@ -148,126 +167,141 @@ class Interpreter:
         else:
             condition = lambda: i > end_value.value
 
-        while condition():
-            context.symbol_table.set(node.variable_name_token.value, Number(i))
-            i += step_value.value
-
-            value = response.register(self.visit(node.body_node, context))
-            if response.should_return() and response.loop_should_continue == False and response.loop_should_break == False:
-                return response
-
-            if response.loop_should_continue:
-                continue
-
-            if response.loop_should_break:
-                break
-
-            elements.append(value)
-
-        return response.success(
+        hot_loop = node.hot_loop
+        context.loop_depth += 1
+        try:
+            while condition():
+                if hot_loop is not None:
+                    if hot_loop.countdown:
+                        hot_loop.countdown -= 1
+                    else:
+                        state = hot_loop.run_for(context, i, end_value.value, step_value.value, elements)
+                        if state is not None:
+                            finished, i = state
+                            if finished:
+                                break
+                            # Compiled code handed the loop back at the start of this iteration, which runs here again
+
+                if node.slot is None:
+                    context.symbol_table.set(node.variable_name_token.value, Number.of(i))
+                else:
+                    context.symbol_table.values[node.slot] = Number.of(i)
+                i += step_value.value
+
+                try:
+                    value = self.visit(node.body_node, context)
+                except ContinueSignal:
+                    continue
+                except BreakSignal:
+                    break
+
+                elements.append(value)
+        finally:
+            context.loop_depth -= 1
+
+        return (
             Number.null if node.should_return_null else
-            List(elements).set_pos(node.pos_start, node.pos_end).set_context(context)
+            List(elements)
         )
 
     def visit_WhileNode(self, node, context):
-        response = RuntimeResult()
         elements = []
 
-        while True:
-            condition = response.register(self.visit(node.condition_node, context))
-            if response.should_return():
-                return response
-
-            if not condition.is_true():
-                break
-
-            value = response.register(self.visit(node.body_node, context))
-            if response.should_return() and response.loop_should_continue == False and response.loop_should_break == False:
-                return response
-
-            if response.loop_should_continue:
-                continue
-
-            if response.loop_should_break:
-                break
-
-        return response.success(
+        # A break or continue in the condition belongs to an enclosing loop, only the body's are caught here
+        hot_loop = node.hot_loop
+        context.loop_depth += 1
+        try:
+            while True:
+                if hot_loop is not None:
+                    if hot_loop.countdown:
+                        hot_loop.countdown -= 1
+                    elif hot_loop.run_while(context):
+                        break
+                if not self.visit(node.condition_node, context).is_true():
+                    break
+                try:
+                    self.visit(node.body_node, context)
+                except ContinueSignal:
+                    continue
+                except BreakSignal:
+                    break
+        finally:
+            context.loop_depth -= 1
+
+        return (
             Number.null if node.should_return_null else
-            List(elements).set_pos(node.pos_start, node.pos_end).set_context(context)
+            List(elements)
         )
 
     def visit_FunctionDefinitionNode(self, node, context):
-        response = RuntimeResult()
-
         function_name = node.variable_name_token.value if node.variable_name_token else None
         body_node = node.body_node
         arguments = [argument.value for argument in node.argument_name_tokens]
-        function_value = Function(function_name, body_node, arguments, node.should_auto_return).set_context(context).set_pos(node.pos_start, node.pos_end)
+        function_value = Function(function_name, body_node, arguments, node.should_auto_return, node.frame_slots, node.memo_size)
 
-        if node.variable_name_token:
+        if node.slot is not None:
+            context.symbol_table.values[node.slot] = function_value
+        elif node.variable_name_token:
             context.symbol_table.set(function_name, function_value)
 
-        return response.success(function_value)
+        return function_value
 
-    def visit_CallNode(self, node, context):
-        response = RuntimeResult()
+    def visit_CallNode(self, node, context, tail=False):
+        value_to_call = None
         try:
-            arguments = []
-
-            value_to_call = response.register(self.visit(node.function_node, context))
-            if response.should_return():
-                return response
-            value_to_call = value_to_call.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
-
-            for argument_node in node.argument_nodes:
-                argument = response.register(self.visit(argument_node, context))
-                if response.should_return():
-                    return response
-                arguments.append(argument)
-
-            return_value = response.register(value_to_call.execute(arguments))
-            if response.should_return():
-                return response
-            return_value = return_value.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
-            return response.success(return_value)
+            function_node = node.function_node
+            if type(function_node) is VariableAccessNode:
+                value_to_call = self.visit_VariableAccessNode(function_node, context)
+            else:
+                value_to_call = self.visit(function_node, context)
+            arguments = [self.visit(argument_node, context) for argument_node in node.argument_nodes]
+
+            # Functions defined here run without going through a RuntimeResult, break and continue leave them as signals
+            if type(value_to_call) is Function:
+                if tail:
+                    return TailCall(value_to_call, arguments, node.pos_start)
+                return value_to_call.call(arguments, context, node.pos_start)
+            return unwrap(value_to_call.execute(arguments, context, node.pos_start, node.pos_end))
         except RecursionError:
-            value_to_call = response.register(self.visit(node.function_node, context))
-            return response.failure(RTError(
-                value_to_call.pos_start,
-                value_to_call.pos_end,
+            # Inside a function, the call of that function is the one that went too deep, a builtin it calls only took the last frame
+            if type(value_to_call) is not Function and context.parent is not None:
+                raise
+            function_node = origin_node(node.function_node)
+            raise RuntimeFailure(RTError(
+                function_node.pos_start,
+                function_node.pos_end,
                 'Max recursion depth exceeded',
                 context
             ))
 
     def visit_StringNode(self, node, context):
-        return RuntimeResult().success(String(node.token.value).set_pos(node.pos_start, node.pos_end).set_context(context))
+        value = node.constant
+        if value is None:
+            return String(node.token.value)
+        return value
 
     def visit_ListNode(self, node, context):
-        response = RuntimeResult()
-        elements = []
-
-        for element_node in node.element_nodes:
-            element = response.register(self.visit(element_node, context))
-            if response.should_return():
-                return response
-            elements.append(element)
-
-        return response.success(List(elements).set_pos(node.pos_start, node.pos_end).set_context(context))
+        elements = [self.visit(element_node, context) for element_node in node.element_nodes]
+        return List(elements)
 
     def visit_ReturnNode(self, node, context):
-        response = RuntimeResult()
-
         if node.node_to_return:
-            value = response.register(self.visit(node.node_to_return, context))
-            if response.should_return():
-                return response
+            # Inside a loop the call is not the last thing the function does, a break or continue in it still lands in the loop.
+            # At the top level there is no function to hand the call back to.
+            if context.loop_depth or context.parent is None:
+                value = self.visit(node.node_to_return, context)
+            else:
+                value = self.visit_tail(node.node_to_return, context)
         else:
             value = Number.null
 
-        return response.success_return(value)
+        raise ReturnSignal(value)
 
     def visit_ContinueNode(self, node, context):
-        return RuntimeResult().success_continue()
+        raise ContinueSignal
 
     def visit_BreakNode(self, node, context):
-        return RuntimeResult().success_break()
+        raise BreakSignal
+
+
+Function.interpreter = Interpreter()
@@ -1,227 +1,207 @@
-from fresh.constants import *
+import re
+from itertools import accumulate
+from operator import sub
+
 from fresh.errors import *
 from fresh.tokens import *
-from fresh.position import Position
+from fresh.position import Position, SourceFile
+from fresh.tokenstream import TokenStream, TOKEN_CODES
+
+# Every match is a token with the spaces, tabs and comment before it, offsets follow from the lengths of the
+# matches. Only a comment at the very end is a match of its own. The last alternative takes any other
+# character, so nothing but trailing whitespace is ever skipped.
+TOKEN_REGEX = re.compile(r'''
+    [ \t]*+(?://[^\n;]*+)?
+    (?:
+        [A-Za-z][A-Za-z0-9_]*+
+        | //[^\n;]*+
+        | ->|==|!=|<=|>=|[-+*/^()\[\]?,=<>\n;]
+        | [0-9]++(?:\.[0-9]*+)?
+        | "(?:[^"\\]++|\\.)*+"|'(?:[^'\\]++|\\.)*+'
+        | [^ \t]
+    )
+''', re.VERBOSE | re.DOTALL)
+
+ESCAPE_REGEX = re.compile(r'\\(.)', re.DOTALL)
+
+OPERATORS = {operator: TOKEN_CODES[token_type] for operator, token_type in {
+    '+': TT_PLUS,
+    '-': TT_MINUS,
+    '*': TT_MUL,
+    '/': TT_DIV,
+    '^': TT_POW,
+    '(': TT_LPAREN,
+    ')': TT_RPAREN,
+    '[': TT_LSQUAREBRACKET,
+    ']': TT_RSQUAREBRACKET,
+    '?': TT_QUESTIONMARK,
+    ',': TT_COMMA,
+    '=': TT_EQUALS,
+    '<': TT_LESS,
+    '>': TT_GREATER,
+    '->': TT_ARROW,
+    '==': TT_DOUBLEEQUALS,
+    '!=': TT_NOTEQUALS,
+    '<=': TT_LESSEQUALS,
+    '>=': TT_GREATEREQUALS,
+}.items()}
+
+ESCAPE_CHARACTERS = {
+    'n': '\n',
+    't': '\t',
+    '\\': '\\',
+    '"': '"',
+    '\'': '\''
+}
+
+# Type codes of the tokens that are always the same text and carry no value, newlines included
+SIMPLE_CODES = dict(OPERATORS)
+SIMPLE_CODES['\n'] = SIMPLE_CODES[';'] = TOKEN_CODES[TT_NEWLINE]
+NAME_START = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz')
+DIGIT_START = frozenset('0123456789')
+
+KEYWORD_SET = frozenset(KEYWORDS)
+
+INT_CODE = TOKEN_CODES[TT_INT]
+FLOAT_CODE = TOKEN_CODES[TT_FLOAT]
+STRING_CODE = TOKEN_CODES[TT_STRING]
+KEYWORD_CODE = TOKEN_CODES[TT_KEYWORD]
+IDENTIFIER_CODE = TOKEN_CODES[TT_IDENTIFIER]
+EOF_CODE = TOKEN_CODES[TT_EOF]
+
+# Matches the offset and value id columns are filled from at a time
+COLUMN_BLOCK = 16384
+
+
+# The type code of each distinct match, worked out the first time the match shows up, along with its
+# value id and the width of its token. A match that is no token raises KeyError, and as matches are
+# looked up in order, the first one to do so is the earliest error in the text.
+class TokenKinds(dict):
+    def __init__(self, intern):
+        super().__init__()
+        self.intern = intern
+        self.value_ids = {}
+        self.widths = {}
+        self.notequals = []
+
+    def __missing__(self, match):
+        value = match.lstrip(' \t')
+        if value[:2] == '//':
+            # The newline or semicolon ending a comment
+            value = value[-1]
+        first = value[0]
+        value_id = 0
+        if value in SIMPLE_CODES:
+            code = SIMPLE_CODES[value]
+            if value == '!=':
+                self.notequals.append(match)
+        elif first in NAME_START:
+            code = KEYWORD_CODE if value in KEYWORD_SET else IDENTIFIER_CODE
+            value_id = self.intern(value)
+        elif first in DIGIT_START:
+            code = FLOAT_CODE if '.' in value else INT_CODE
+            value_id = self.intern(float(value) if '.' in value else int(value))
+        elif (first == '"' or first == "'") and len(value) > 1:
+            string = make_string(value)
+            if string is None:
+                raise KeyError(match)
+            code = STRING_CODE
+            value_id = self.intern(string)
+        else:
+            raise KeyError(match)
+
+        self.value_ids[match] = value_id
+        self.widths[match] = len(value)
+        self[match] = code
+        return code
+
+
+def make_string(value):
+    # None for an invalid escape, make_error then finds it again
+    body = value[1:-1]
+    if '\\' not in body:
+        return body
+
+    # The escaped characters are every other part
+    parts = ESCAPE_REGEX.split(body)
+    escapes = parts[1::2]
+    if not ESCAPE_CHARACTERS.keys() >= set(escapes):
+        return None
+    parts[1::2] = map(ESCAPE_CHARACTERS.__getitem__, escapes)
+    return ''.join(parts)
 
 
 class Lexer:
     def __init__(self, filename, text, debug):
         self.filename = filename
         self.text = text
-        self.pos = Position(-1, 0, -1, filename, text)
-        self.current_char = None
+        self.source = SourceFile(filename, text)
         self.debug = debug
-        self.advance()
-
-    def advance(self):
-        self.pos.advance(self.current_char)
-        self.current_char = self.text[self.pos.index] if self.pos.index < len(self.text) else None
 
     def make_tokens(self):
-        tokens = []
-
-        while self.current_char is not None:
-            if self.current_char in ' \t':
-                self.advance()
-            elif self.current_char in ';\n':
-                tokens.append(Token(TT_NEWLINE, pos_start=self.pos))
-                self.advance()
-            elif self.current_char in DIGITS:
-                tokens.append(self.make_number())
-            elif self.current_char in LETTERS:
-                tokens.append(self.make_identifier())
-            elif self.current_char in '"':
-                token, error = self.make_string('"')
-                if error:
-                    return [], error
-                tokens.append(token)
-            elif self.current_char in "'":
-                token, error = self.make_string("'")
-                if error:
-                    return [], error
-                tokens.append(token)
-            elif self.current_char == '+':
-                tokens.append(Token(TT_PLUS, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == '-':
-                tokens.append(self.make_minus_or_arrow())
-            elif self.current_char == '*':
-                tokens.append(Token(TT_MUL, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == '/':
-                token = self.make_comment_or_div()
-                if token is not None:
-                    tokens.append(token)
-            elif self.current_char == '^':
-                tokens.append(Token(TT_POW, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == '(':
-                tokens.append(Token(TT_LPAREN, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == ')':
-                tokens.append(Token(TT_RPAREN, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == '[':
-                tokens.append(Token(TT_LSQUAREBRACKET, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == ']':
-                tokens.append(Token(TT_RSQUAREBRACKET, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == '?':
-                tokens.append(Token(TT_QUESTIONMARK, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == ',':
-                tokens.append(Token(TT_COMMA, pos_start=self.pos))
-                self.advance()
-            elif self.current_char == '!':
-                token, error = self.make_not_equals()
-                if error:
-                    return [], error
-                tokens.append(token)
-            elif self.current_char == '=':
-                tokens.append(self.make_equals())
-            elif self.current_char == '<':
-                tokens.append(self.make_less_than())
-            elif self.current_char == '>':
-                tokens.append(self.make_greater_than())
-            else:
-                pos_start = self.pos.copy()
-                char = self.current_char
-                self.advance()
-                return [], IllegalCharacterError(pos_start, self.pos, "'" + char + "'")
-
-        tokens.append(Token(TT_EOF, pos_start=self.pos))
+        tokens = TokenStream(self.source)
+        matches = TOKEN_REGEX.findall(self.text)
+        if matches and matches[-1].lstrip(' \t')[:2] == '//' and matches[-1][-1] not in '\n;':
+            # A comment at the very end, with no newline after it
+            matches.pop()
+
+        # Every column is filled in bulk, only the distinct matches are looked at one by one
+        kinds = TokenKinds(tokens.intern)
+        try:
+            types = bytes(map(kinds.__getitem__, matches))
+        except KeyError as missing:
+            match = missing.args[0]
+            index = matches.index(match)
+            return [], self.make_error(sum(map(len, matches[:index])) + len(match) - len(match.lstrip(' \t')))
+
+        # Tokens only record their offsets, lines and columns are worked out when needed. Each block of
+        # matches reuses the memory of the numbers worked out for the one before.
+        widths, value_ids = kinds.widths.__getitem__, kinds.value_ids.__getitem__
+        offset = 0
+        for first in range(0, len(matches), COLUMN_BLOCK):
+            block = matches[first:first + COLUMN_BLOCK]
+            ends = list(accumulate(map(len, block), initial=offset))[1:]
+            offset = ends[-1]
+            tokens.starts.fromlist(list(map(sub, ends, map(widths, block))))
+            tokens.ends.fromlist(ends)
+            tokens.value_ids.fromlist(list(map(value_ids, block)))
+        tokens.types.frombytes(types)
+        for match in kinds.notequals:
+            # '!=' has always been reported as a single character wide
+            index = -1
+            for _ in range(matches.count(match)):
+                index = matches.index(match, index + 1)
+                tokens.ends[index] -= 1
+
+        end = len(self.text)
+        tokens.append(EOF_CODE, None, end, end + 1)
         if self.debug:
             print(tokens)
         return tokens, None
 
-    def make_number(self):
-        number_str = ''
-        dot_count = 0
-        pos_start = self.pos.copy()
-
-        while self.current_char is not None and self.current_char in DIGITS + '.':
-            if self.current_char == '.':
-                if dot_count == 1:
-                    break
-                dot_count += 1
-            number_str += self.current_char
-            self.advance()
-
-        if dot_count == 0:
-            return Token(TT_INT, int(number_str), pos_start, self.pos)
-        else:
-            return Token(TT_FLOAT, float(number_str), pos_start, self.pos)
-
-    def make_identifier(self):
-        id_str = ''
-        pos_start = self.pos.copy()
-
-        while self.current_char is not None and self.current_char in LETTERS_DIGITS + '_':
-            id_str += self.current_char
-            self.advance()
-
-        token_type = TT_KEYWORD if id_str in KEYWORDS else TT_IDENTIFIER
-        return Token(token_type, id_str, pos_start, self.pos)
-
-    def make_not_equals(self):
-        pos_start = self.pos.copy()
-        self.advance()
-
-        if self.current_char == '=':
-            self.advance()
-            return Token(TT_NOTEQUALS, pos_start=pos_start), None
-
-        self.advance()
-        return None, ExpectedCharError(pos_start, self.pos, "(after '!')", '=')
-
-    def make_equals(self):
-        token_type = TT_EQUALS
-        pos_start = self.pos.copy()
-        self.advance()
-
-        if self.current_char == '=':
-            self.advance()
-            token_type = TT_DOUBLEEQUALS
-
-        return Token(token_type, pos_start=pos_start, pos_end=self.pos)
-
-    def make_less_than(self):
-        token_type = TT_LESS
-        pos_start = self.pos.copy()
-        self.advance()
-
-        if self.current_char == '=':
-            self.advance()
-            token_type = TT_LESSEQUALS
-
-        return Token(token_type, pos_start=pos_start, pos_end=self.pos)
-
-    def make_greater_than(self):
-        token_type = TT_GREATER
-        pos_start = self.pos.copy()
-        self.advance()
-
-        if self.current_char == '=':
-            self.advance()
-            token_type = TT_GREATEREQUALS
-
-        return Token(token_type, pos_start=pos_start, pos_end=self.pos)
-
-    def make_minus_or_arrow(self):
-        token_type = TT_MINUS
-        pos_start = self.pos.copy()
-        self.advance()
-
-        if self.current_char == '>':
-            self.advance()
-            token_type = TT_ARROW
-
-        return Token(token_type, pos_start=pos_start, pos_end=self.pos)
-
-    def make_string(self, chartype):
-        string = ''
-        chartype = chartype
-        pos_start = self.pos.copy()
-        escape_character = False
-        self.advance()
-
-        escape_characters = {
-            'n': '\n',
-            't': '\t',
-            '\\': '\\',
-            '"': '"',
-            '\'': '\''
-        }
-
-        while self.current_char != chartype and self.current_char is not None or escape_character:
-            if escape_character:
-                try:
-                    string += escape_characters[self.current_char]
-                    escape_character = False
-                except KeyError:
-                    return None, InvalidSyntaxError(pos_start, self.pos, "Invalid escape character type: '" + self.current_char + "'")
-            else:
-                if self.current_char == '\\':
-                    escape_character = True
-                else:
-                    string += self.current_char
-            self.advance()
-
-        if self.current_char == None:
-            return None, InvalidSyntaxError(pos_start, self.pos, "Unterminated string")
-
-        self.advance()
-        return Token(TT_STRING, string, pos_start, self.pos), None
-
-    def make_comment_or_div(self):
-        pos_start = self.pos.copy()
-        token_type = TT_DIV
-        self.advance()
-
-        if self.current_char == '/':
-            while self.current_char is not None and self.current_char not in '\n;':
-                self.advance()
-            return None
-
-        return Token(TT_DIV, pos_start=pos_start, pos_end=self.pos)
+    def make_error(self, start):
+        # Errors are rare, so they are diagnosed by looking back at the offending character
+        source = self.source
+        char = self.text[start]
+        pos_start = Position(start, source)
+
+        if char == '!':
+            return ExpectedCharError(pos_start, Position(start + 2, source), "(after '!')", '=')
+
+        if char in '"\'':
+            index = start + 1
+            while index < len(self.text) and self.text[index] != char:
+                if self.text[index] == '\\':
+                    index += 1
+                    if index < len(self.text) and self.text[index] not in ESCAPE_CHARACTERS:
+                        return self.invalid_escape_error(start, index)
+                index += 1
+            return InvalidSyntaxError(pos_start, Position(len(self.text), source), "Unterminated string")
+
+        return IllegalCharacterError(pos_start, Position(start + 1, source), "'" + char + "'")
+
+    def invalid_escape_error(self, start, index):
+        return InvalidSyntaxError(
+            Position(start, self.source), Position(index, self.source),
+            "Invalid escape character type: '" + self.text[index] + "'"
+        )
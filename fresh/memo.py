@@ -0,0 +1,59 @@
+from collections import OrderedDict
+
+# Entries each memoized function keeps unless run is given another size
+DEFAULT_MEMO_SIZE = 1024
+
+# Builtins whose result only depends on their arguments and that change nothing
+PURE_BUILTINS = frozenset(('len', 'str', 'int', 'float', 'is_number', 'is_string', 'is_list', 'is_function', 'is_digit'))
+
+
+# Remembers the results of a function by its arguments, dropping the least recently used once it is full
+class Memo:
+    __slots__ = ('size', 'entries', 'hits', 'misses', 'version')
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # See MemoVersion in fresh.symboltable
+        self.version = None
+
+    # Entries stored before a name they depend on was bound again are dropped
+    def refresh(self, version):
+        if self.version != version:
+            self.entries.clear()
+            self.version = version
+
+    @staticmethod
+    def key(args):
+        # Only numbers and strings make a key, lists can change and functions are only equal to themselves
+        key = []
+        for arg in args:
+            value = getattr(arg, 'value', None)
+            value_type = type(value)
+            if value_type is int or value_type is str:
+                key.append(value)
+            elif value_type is float:
+                # 1 and 1.0 are the same key to Python but not the same value to Fresh, and neither are 0.0 and -0.0
+                key.append((float, value.hex()))
+            else:
+                return None
+        return tuple(key)
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def store(self, key, value):
+        # A list result could be changed by whoever got it, so only numbers and strings are kept
+        if type(getattr(value, 'value', None)) not in (int, float, str):
+            return
+        self.entries[key] = value
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
@@ -1,77 +1,134 @@
-class NumberNode:
+from fresh.operations import lookup_operator_table
+from fresh.position import Position
+
+
+class Node:
+    # Nodes keep an offset span into their SourceFile, the positions are only built once something asks for them
+    __slots__ = ('source', 'start', 'end', 'pos_start', 'pos_end')
+
+    def set_span(self, pos_start, pos_end):
+        self.source = pos_start.source
+        self.start = pos_start.index
+        self.end = pos_end.index
+
+    def __getattr__(self, name):
+        if name == 'pos_start' or name == 'pos_end':
+            self.pos_start = Position(self.start, self.source)
+            self.pos_end = Position(self.end, self.source, True)
+            return getattr(self, name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+
+class NumberNode(Node):
+    __slots__ = ('token', 'constant')
+
     def __init__(self, token):
         self.token = token
-        self.pos_start = self.token.pos_start
-        self.pos_end = self.token.pos_end
+        # Preallocated value for the literal, set by the optimizer
+        self.constant = None
+        self.source = token.source
+        self.start = token.start
+        self.end = token.end
 
     def __repr__(self):
         return f'{self.token}'
 
 
-class StringNode:
+class StringNode(Node):
+    __slots__ = ('token', 'constant')
+
     def __init__(self, token):
         self.token = token
-        self.pos_start = self.token.pos_start
-        self.pos_end = self.token.pos_end
+        # Preallocated value for the literal, set by the optimizer
+        self.constant = None
+        self.source = token.source
+        self.start = token.start
+        self.end = token.end
 
     def __repr__(self):
         return f'{self.token}'
 
 
-class BinOpNode:
+class BinOpNode(Node):
+    __slots__ = ('left_node', 'operator_token', 'right_node', 'traces_branches', 'operation')
+
     def __init__(self, left_node, operator_token, right_node):
         self.left_node = left_node
         self.operator_token = operator_token
         self.right_node = right_node
-        self.pos_start = self.left_node.pos_start
-        self.pos_end = self.right_node.pos_end
+        # Handlers of the operator by operand classes, see fresh.operations.OperatorTable
+        self.operation = lookup_operator_table(operator_token)
+        self.traces_branches = traces_branches(left_node) or traces_branches(right_node)
+        self.source = left_node.source
+        self.start = left_node.start
+        self.end = right_node.end
 
     def __repr__(self):
         return f'({self.left_node}, {self.operator_token}, {self.right_node})'
 
 
-class UnaryOpNode:
+class UnaryOpNode(Node):
+    __slots__ = ('operator_token', 'node', 'traces_branches')
+
     def __init__(self, operator_token, right_node):
         self.operator_token = operator_token
         self.node = right_node
+        self.traces_branches = traces_branches(right_node)
 
-        self.pos_start = self.operator_token.pos_start
-        self.pos_end = self.node.pos_end
+        self.source = operator_token.source
+        self.start = operator_token.start
+        self.end = right_node.end
 
     def __repr__(self):
         return f'({self.operator_token}, {self.node})'
 
 
-class VariableAccessNode:
+class VariableAccessNode(Node):
+    __slots__ = ('variable_name_token', 'slot', 'cache')
+
     def __init__(self, variable_name_token):
         self.variable_name_token = variable_name_token
-        self.pos_start = self.variable_name_token.pos_start
-        self.pos_end = self.variable_name_token.pos_end
+        # Index into the frame of the enclosing function, set by the resolver for its local variables
+        self.slot = None
+        # Global table the name was last found in and the name's shadow version then, see fresh.symboltable
+        self.cache = None
+        self.source = variable_name_token.source
+        self.start = variable_name_token.start
+        self.end = variable_name_token.end
 
     def __repr__(self):
         return f'{self.variable_name_token}'
 
 
-class VariableAssignNode:
+class VariableAssignNode(Node):
+    __slots__ = ('token', 'value_node', 'slot')
+
     def __init__(self, token, value_node):
         self.token = token
         self.value_node = value_node
-        self.pos_start = self.token.pos_start
-        self.pos_end = self.value_node.pos_end
+        self.slot = None
+        self.source = token.source
+        self.start = token.start
+        self.end = value_node.end
 
     def __repr__(self):
         return f'({self.token}, {self.value_node})'
 
 
-class IfNode:
+class IfNode(Node):
+    __slots__ = ('cases', 'else_case')
+
     def __init__(self, cases, else_case):
         self.cases = cases
         self.else_case = else_case
-        self.pos_start = self.cases[0][0].pos_start
-        self.pos_end = (self.else_case or self.cases[len(self.cases) - 1])[0].pos_end
+        self.source = cases[0][0].source
+        self.start = cases[0][0].start
+        self.end = (else_case or cases[len(cases) - 1])[0].end
 
 
-class ForNode:
+class ForNode(Node):
+    __slots__ = ('variable_name_token', 'start_value_node', 'end_value_node', 'step_value_node', 'body_node', 'should_return_null', 'slot', 'hot_loop')
+
     def __init__(self, variable_name_token, start_value_node, end_value_node, step_value_node, body_node, should_return_null):
         self.variable_name_token = variable_name_token
         self.start_value_node = start_value_node
@@ -79,73 +136,145 @@ class ForNode:
         self.step_value_node = step_value_node
         self.body_node = body_node
         self.should_return_null = should_return_null
+        self.slot = None
+        # Compiles the loop once it gets hot, set by fresh.hotloops for loops it can compile
+        self.hot_loop = None
+
+        self.source = variable_name_token.source
+        self.start = variable_name_token.start
+        self.end = body_node.end
 
-        self.pos_start = self.variable_name_token.pos_start
-        self.pos_end = self.body_node.pos_end
 
+class WhileNode(Node):
+    __slots__ = ('condition_node', 'body_node', 'should_return_null', 'hot_loop')
 
-class WhileNode:
     def __init__(self, condition_node, body_node, should_return_null):
         self.condition_node = condition_node
         self.body_node = body_node
         self.should_return_null = should_return_null
+        # Compiles the loop once it gets hot, set by fresh.hotloops for loops it can compile
+        self.hot_loop = None
 
-        self.pos_start = self.condition_node.pos_start
-        self.pos_end = self.body_node.pos_end
+        self.source = condition_node.source
+        self.start = condition_node.start
+        self.end = body_node.end
 
 
-class FunctionDefinitionNode:
+class FunctionDefinitionNode(Node):
+    __slots__ = ('variable_name_token', 'argument_name_tokens', 'body_node', 'should_auto_return', 'slot', 'frame_slots', 'memo_size')
+
     def __init__(self, variable_name_token, argument_name_tokens, body_node, should_auto_return):
         self.variable_name_token = variable_name_token
         self.argument_name_tokens = argument_name_tokens
         self.body_node = body_node
         self.should_auto_return = should_auto_return
-
-        if self.variable_name_token:
-            self.pos_start = self.variable_name_token.pos_start
-        elif len(self.argument_name_tokens) > 0:
-            self.pos_start = self.argument_name_tokens[0].pos_start
+        self.slot = None
+        # Slot of every local variable of the function, its calls get a Frame laid out like this
+        self.frame_slots = None
+        # Results the function remembers, set by the purity analysis for functions that only depend on their arguments
+        self.memo_size = 0
+
+        if variable_name_token:
+            self.start = variable_name_token.start
+        elif len(argument_name_tokens) > 0:
+            self.start = argument_name_tokens[0].start
         else:
-            self.pos_start = self.body_node.pos_start
+            self.start = body_node.start
 
-        self.pos_end = self.body_node.pos_end
+        self.source = body_node.source
+        self.end = body_node.end
 
 
-class CallNode:
+class CallNode(Node):
+    __slots__ = ('function_node', 'argument_nodes')
+
     def __init__(self, function_node, argument_nodes):
         self.function_node = function_node
         self.argument_nodes = argument_nodes
 
-        self.pos_start = self.function_node.pos_start
+        self.source = function_node.source
+        self.start = function_node.start
 
         if len(argument_nodes) > 0:
-            self.pos_end = self.argument_nodes[len(argument_nodes) - 1].pos_end
+            self.end = argument_nodes[len(argument_nodes) - 1].end
         else:
-            self.pos_end = self.function_node.pos_end
+            self.end = function_node.end
+
 
+class ListNode(Node):
+    __slots__ = ('element_nodes',)
 
-class ListNode:
     def __init__(self, element_nodes, pos_start, pos_end):
         self.element_nodes = element_nodes
-
-        self.pos_start = pos_start
-        self.pos_end = pos_end
+        self.set_span(pos_start, pos_end)
 
     def __repr__(self):
         return f'[{", ".join(str(node) for node in self.element_nodes)}]'
 
-class ReturnNode:
+
+class ReturnNode(Node):
+    __slots__ = ('node_to_return',)
+
     def __init__(self, node_to_return, pos_start, pos_end):
         self.node_to_return = node_to_return
-        self.pos_start = pos_start
-        self.pos_end = pos_end
+        self.set_span(pos_start, pos_end)
+
+
+class ContinueNode(Node):
+    __slots__ = ()
 
-class ContinueNode:
     def __init__(self, pos_start, pos_end):
-        self.pos_start = pos_start
-        self.pos_end = pos_end
+        self.set_span(pos_start, pos_end)
+
+
+class BreakNode(Node):
+    __slots__ = ()
 
-class BreakNode:
     def __init__(self, pos_start, pos_end):
-        self.pos_start = pos_start
-        self.pos_end = pos_end
\ No newline at end of file
+        self.set_span(pos_start, pos_end)
+
+
+def origin_node(node):
+    # The node errors about a value point at, an assignment hands on the value of the expression it assigned
+    while type(node) is VariableAssignNode:
+        node = node.value_node
+    return node
+
+
+def traces_branches(node):
+    # Errors about the value of an if point at the branch that produced it, which is only known once it ran.
+    # The optimizer only ever replaces an if by one of its branches, so this stays safe to decide while parsing.
+    return type(origin_node(node)) is IfNode
+
+
+# The nodes directly under node, for passes that only need to reach every node
+def children(node):
+    node_type = type(node)
+    if node_type is BinOpNode:
+        return node.left_node, node.right_node
+    if node_type is UnaryOpNode:
+        return node.node,
+    if node_type is VariableAssignNode:
+        return node.value_node,
+    if node_type is IfNode:
+        nodes = []
+        for condition, expression, should_return_null in node.cases:
+            nodes.append(condition)
+            nodes.append(expression)
+        if node.else_case:
+            nodes.append(node.else_case[0])
+        return nodes
+    if node_type is ForNode:
+        return tuple(child for child in (node.start_value_node, node.end_value_node, node.step_value_node, node.body_node) if child)
+    if node_type is WhileNode:
+        return node.condition_node, node.body_node
+    if node_type is ListNode:
+        return node.element_nodes
+    body_node = getattr(node, 'body_node', None)
+    if body_node is not None:
+        return body_node,
+    function_node = getattr(node, 'function_node', None)
+    if function_node is not None:
+        return (function_node, *node.argument_nodes)
+    node_to_return = getattr(node, 'node_to_return', None)
+    return (node_to_return,) if node_to_return else ()
@@ -0,0 +1,46 @@
+from fresh.tokens import *
+from fresh.values import NUMBER_OPERATIONS
+
+# The Value method behind each operator, for backends that emit the call themselves
+BINARY_METHOD_NAMES = {
+    TT_PLUS: 'added_to',
+    TT_MINUS: 'subtracted_by',
+    TT_MUL: 'multiplied_by',
+    TT_DIV: 'divided_by',
+    TT_POW: 'powered_by',
+    TT_DOUBLEEQUALS: 'get_comparison_equals',
+    TT_NOTEQUALS: 'get_comparison_notequals',
+    TT_GREATER: 'get_comparison_greaterthan',
+    TT_GREATEREQUALS: 'get_comparison_greaterequals',
+    TT_LESS: 'get_comparison_lessthan',
+    TT_LESSEQUALS: 'get_comparison_lessequals',
+    TT_QUESTIONMARK: 'query_by',
+    'and': 'anded_by',
+    'or': 'ored_by',
+}
+
+
+def lookup_binary_method_name(operator_token):
+    return BINARY_METHOD_NAMES[operator_token.value if operator_token.type == TT_KEYWORD else operator_token.type]
+
+
+# The handler behind one operator by the classes of both operands, so running it is one lookup and a call. A pair of
+# classes gets its entry the first time it shows up: for two numbers a handler that checks nothing, otherwise the
+# method of the left class.
+class OperatorTable(dict):
+    def __init__(self, method_name):
+        super().__init__()
+        self.method_name = method_name
+
+    def __missing__(self, value_types):
+        left_type, right_type = value_types
+        handler = NUMBER_OPERATIONS.get((self.method_name, left_type, right_type)) or getattr(left_type, self.method_name)
+        self[value_types] = handler
+        return handler
+
+
+OPERATOR_TABLES = {key: OperatorTable(method_name) for key, method_name in BINARY_METHOD_NAMES.items()}
+
+
+def lookup_operator_table(operator_token):
+    return OPERATOR_TABLES[operator_token.value if operator_token.type == TT_KEYWORD else operator_token.type]
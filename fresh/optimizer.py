@@ -0,0 +1,170 @@
+import math
+
+from fresh.nodes import NumberNode, StringNode
+from fresh.operations import lookup_operator_table
+from fresh.tokens import *
+from fresh.values import Number, String
+
+# Folded values past these sizes are left for the program to compute, so folding stays cheap and literals stay small
+MAX_FOLDED_INT_BITS = 4096
+MAX_FOLDED_STRING_LENGTH = 4096
+
+
+# Rewrites the tree once after parsing, every rewrite leaves a node that evaluates to the same value with the same position
+class Optimizer:
+    def optimize_program(self, node):
+        try:
+            return self.optimize(node)
+        except RecursionError:
+            # Too deep to walk, the rewrites made so far are complete on their own so the tree is still fine to run
+            return node
+
+    def optimize(self, node):
+        method_name = f'optimize_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_optimize_method)
+        return method(node)
+
+    def no_optimize_method(self, node):
+        raise Exception(f'No optimize_{type(node).__name__} method defined')
+
+    def optimize_NumberNode(self, node):
+        # Values are immutable, the interpreter hands out this one every time the literal runs
+        node.constant = Number.of(node.token.value)
+        return node
+
+    def optimize_StringNode(self, node):
+        node.constant = String(node.token.value)
+        return node
+
+    def optimize_VariableAccessNode(self, node):
+        return node
+
+    def optimize_VariableAssignNode(self, node):
+        node.value_node = self.optimize(node.value_node)
+        return node
+
+    def optimize_BinOpNode(self, node):
+        node.left_node = self.optimize(node.left_node)
+        node.right_node = self.optimize(node.right_node)
+        left, right = constant_value(node.left_node), constant_value(node.right_node)
+        if left is None or right is None or too_costly(node.operator_token, left.value, right.value):
+            return node
+
+        try:
+            result, error = lookup_operator_table(node.operator_token)[type(left), type(right)](left, right)
+        except (ArithmeticError, TypeError, ValueError):
+            # Python itself fails on some of these, that has to keep happening when the program runs
+            return node
+        if error:
+            return node
+        return self.literal(node, result) or node
+
+    def optimize_UnaryOpNode(self, node):
+        node.node = self.optimize(node.node)
+        operand = constant_value(node.node)
+        if operand is None:
+            return node
+
+        if node.operator_token.type == TT_MINUS:
+            result, error = operand.multiplied_by(Number.of(-1))
+        elif node.operator_token.matches(TT_KEYWORD, 'not'):
+            result, error = operand.notted()
+        else:
+            result, error = operand, None
+        if error:
+            return node
+        return self.literal(node, result) or node
+
+    def optimize_IfNode(self, node):
+        cases = []
+        else_case = node.else_case
+
+        for condition, expression, should_return_null in node.cases:
+            condition = self.optimize(condition)
+            condition_value = constant_value(condition)
+            if condition_value is None:
+                cases.append((condition, self.optimize(expression), should_return_null))
+            elif condition_value.is_true():
+                # Nothing after a case that always runs is ever reached
+                else_case = (expression, should_return_null)
+                break
+
+        if else_case:
+            else_case = (self.optimize(else_case[0]), else_case[1])
+            if not cases and not else_case[1]:
+                # The if has nothing left to decide and its value is the branch's own
+                return else_case[0]
+
+        node.cases = cases
+        node.else_case = else_case
+        return node
+
+    def optimize_ForNode(self, node):
+        node.start_value_node = self.optimize(node.start_value_node)
+        node.end_value_node = self.optimize(node.end_value_node)
+        if node.step_value_node:
+            node.step_value_node = self.optimize(node.step_value_node)
+        node.body_node = self.optimize(node.body_node)
+        return node
+
+    def optimize_WhileNode(self, node):
+        node.condition_node = self.optimize(node.condition_node)
+        node.body_node = self.optimize(node.body_node)
+        return node
+
+    def optimize_FunctionDefinitionNode(self, node):
+        node.body_node = self.optimize(node.body_node)
+        return node
+
+    def optimize_CallNode(self, node):
+        node.function_node = self.optimize(node.function_node)
+        node.argument_nodes = [self.optimize(argument_node) for argument_node in node.argument_nodes]
+        return node
+
+    def optimize_ListNode(self, node):
+        node.element_nodes = [self.optimize(element_node) for element_node in node.element_nodes]
+        return node
+
+    def optimize_ReturnNode(self, node):
+        if node.node_to_return:
+            node.node_to_return = self.optimize(node.node_to_return)
+        return node
+
+    def optimize_ContinueNode(self, node):
+        return node
+
+    def optimize_BreakNode(self, node):
+        return node
+
+    def literal(self, node, value):
+        # The literal takes the span of the expression it replaces, so errors further up point at the same place
+        if isinstance(value, Number):
+            number = value.value
+            if type(number) is int and number.bit_length() <= MAX_FOLDED_INT_BITS:
+                token_type = TT_INT
+            elif type(number) is float and math.isfinite(number):
+                token_type = TT_FLOAT
+            else:
+                return None
+            return self.optimize(NumberNode(Token(token_type, number, node.start, node.end, node.source)))
+
+        if isinstance(value, String) and len(value.value) <= MAX_FOLDED_STRING_LENGTH:
+            return self.optimize(StringNode(Token(TT_STRING, value.value, node.start, node.end, node.source)))
+        return None
+
+
+def constant_value(node):
+    if type(node) is NumberNode:
+        return Number.of(node.token.value)
+    if type(node) is StringNode:
+        return String(node.token.value)
+    return None
+
+
+def too_costly(operator_token, left, right):
+    # Only the operators whose result can grow much faster than their operands are checked before running them
+    if operator_token.type == TT_POW and type(left) is int and type(right) is int and abs(left) > 1:
+        return right * left.bit_length() > MAX_FOLDED_INT_BITS
+    if operator_token.type == TT_MUL and type(left) is str and type(right) is int:
+        return len(left) * right > MAX_FOLDED_STRING_LENGTH
+    return False
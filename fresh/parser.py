@@ -1,720 +1,454 @@
-from fresh.errors import InvalidSyntaxError, ERROR_STRING_2, ERROR_STRING_1
+from fresh.errors import InvalidSyntaxError, ParseFailure, ERROR_STRING_2, ERROR_STRING_1
 from fresh.tokens import *
 from fresh.nodes import NumberNode, BinOpNode, UnaryOpNode, VariableAccessNode, VariableAssignNode, IfNode, ForNode, WhileNode, FunctionDefinitionNode, CallNode, \
     StringNode, ListNode, ReturnNode, ContinueNode, BreakNode
 from fresh.parseresult import ParseResult
+from fresh.position import Position
+from fresh.tokenstream import TOKEN_TYPES
+
+# FIRST sets from grammar.txt, used to decide what to parse from the current token alone
+EXPRESSION_START_TYPES = frozenset((TT_INT, TT_FLOAT, TT_STRING, TT_IDENTIFIER, TT_LPAREN, TT_LSQUAREBRACKET, TT_PLUS, TT_MINUS))
+EXPRESSION_START_KEYWORDS = frozenset(('set', 'not', 'if', 'for', 'while', 'func'))
+STATEMENT_START_KEYWORDS = EXPRESSION_START_KEYWORDS | {'return', 'continue', 'break'}
+
+# Binding power of every binary operator, lowest first
+PRECEDENCE_LOGICAL = 1
+PRECEDENCE_COMPARISON = 2
+PRECEDENCE_ARITHMATIC = 3
+PRECEDENCE_TERM = 4
+PRECEDENCE_POWER = 5
+
+BINARY_PRECEDENCES = {
+    TT_DOUBLEEQUALS: PRECEDENCE_COMPARISON,
+    TT_NOTEQUALS: PRECEDENCE_COMPARISON,
+    TT_LESS: PRECEDENCE_COMPARISON,
+    TT_LESSEQUALS: PRECEDENCE_COMPARISON,
+    TT_GREATER: PRECEDENCE_COMPARISON,
+    TT_GREATEREQUALS: PRECEDENCE_COMPARISON,
+    TT_PLUS: PRECEDENCE_ARITHMATIC,
+    TT_MINUS: PRECEDENCE_ARITHMATIC,
+    TT_MUL: PRECEDENCE_TERM,
+    TT_DIV: PRECEDENCE_TERM,
+    TT_QUESTIONMARK: PRECEDENCE_TERM,
+    TT_POW: PRECEDENCE_POWER,
+}
+KEYWORD_PRECEDENCES = {
+    'and': PRECEDENCE_LOGICAL,
+    'or': PRECEDENCE_LOGICAL,
+}
 
 
 class Parser:
     def __init__(self, tokens):
-        self.current_token = None
         self.tokens = tokens
+        self.token_types = tokens.types
+        self.token_value_ids = tokens.value_ids
+        self.token_values = tokens.values
+        self.token_count = len(tokens)
         self.token_index = -1
+        self.current_index = 0
+        self.current_type = None
+        self.current_value = None
         self.advance()
 
     def advance(self):
         self.token_index += 1
         self.update_current_token()
-        return self.current_token
-
-    def reverse(self, amount=1):
-        self.token_index -= amount
-        self.update_current_token()
-        return self.current_token
+        return self.current_type
 
     def update_current_token(self):
-        if 0 <= self.token_index < len(self.tokens):
-            self.current_token = self.tokens[self.token_index]
+        index = self.token_index
+        if 0 <= index < self.token_count:
+            self.current_index = index
+            self.current_type = TOKEN_TYPES[self.token_types[index]]
+            self.current_value = self.token_values[self.token_value_ids[index]]
 
-    def parse(self):
-        res = self.statements()
-        if not res.error and self.current_token.type != TT_EOF:
-            return res.failure(InvalidSyntaxError(
-                self.current_token.pos_start, self.current_token.pos_end,
-                "b5 " + ERROR_STRING_2
-            ))
-        return res
+    @property
+    def current_token(self):
+        return self.tokens[self.current_index]
 
-    def statements(self):
-        response = ParseResult()
-        statements = []
-        pos_start = self.current_token.pos_start.copy()
-
-        while self.current_token.type == TT_NEWLINE:
-            response.register_advancement()
-            self.advance()
+    def current_pos_start(self):
+        return Position(self.tokens.starts[self.current_index], self.tokens.source)
 
-        statement = response.register(self.statement())
-        if response.error:
-            return response
-        statements.append(statement)
+    def current_pos_end(self):
+        return Position(self.tokens.ends[self.current_index], self.tokens.source, True)
 
-        more_statements = True
+    def current_matches(self, type_, value):
+        return self.current_type == type_ and self.current_value == value
 
-        while True:
-            newline_count = 0
-            while self.current_token.type == TT_NEWLINE:
-                response.register_advancement()
-                self.advance()
-                newline_count += 1
-            if newline_count == 0:
-                more_statements = False
+    def starts_expression(self):
+        if self.current_type == TT_KEYWORD:
+            return self.current_value in EXPRESSION_START_KEYWORDS
+        return self.current_type in EXPRESSION_START_TYPES
 
-            if not more_statements:
-                break
+    def starts_statement(self):
+        if self.current_type == TT_KEYWORD:
+            return self.current_value in STATEMENT_START_KEYWORDS
+        return self.current_type in EXPRESSION_START_TYPES
 
-            statement = response.try_register(self.statement())
-            if not statement:
-                self.reverse(response.to_reverse_count)
-                more_statements = False
-                continue
-            statements.append(statement)
+    def fail(self, details):
+        token = self.current_token
+        raise ParseFailure(InvalidSyntaxError(token.pos_start, token.pos_end, details))
 
-        return response.success(ListNode(statements, pos_start, self.current_token.pos_end.copy()))
+    def expect_keyword(self, keyword):
+        if not self.current_matches(TT_KEYWORD, keyword):
+            self.fail(f"Expected '{keyword}'")
+        self.advance()
 
-    def statement(self):
+    def parse(self):
         response = ParseResult()
-        pos_start = self.current_token.pos_start.copy()
+        try:
+            node = self.statements()
+            if self.current_type != TT_EOF:
+                self.fail("b5 " + ERROR_STRING_2)
+        except ParseFailure as failure:
+            return response.failure(failure.error)
+        return response.success(node)
+
+    def statements(self):
+        statements = []
+        pos_start = self.current_pos_start()
 
-        if self.current_token.matches(TT_KEYWORD, 'return'):
-            response.register_advancement()
+        while self.current_type == TT_NEWLINE:
             self.advance()
 
-            expression = response.try_register(self.expression())
-            if not expression:
-                self.reverse(response.to_reverse_count)
-            return response.success(ReturnNode(expression, pos_start, self.current_token.pos_end.copy()))
+        statements.append(self.statement())
 
-        if self.current_token.matches(TT_KEYWORD, 'continue'):
-            response.register_advancement()
-            self.advance()
-            return response.success(ContinueNode(pos_start, self.current_token.pos_end.copy()))
+        while self.current_type == TT_NEWLINE:
+            while self.current_type == TT_NEWLINE:
+                self.advance()
 
-        if self.current_token.matches(TT_KEYWORD, 'break'):
-            response.register_advancement()
-            self.advance()
-            return response.success(BreakNode(pos_start, self.current_token.pos_end.copy()))
+            if not self.starts_statement():
+                break
+            statements.append(self.statement())
+
+        return ListNode(statements, pos_start, self.current_pos_end())
+
+    def statement(self):
+        if self.current_type == TT_KEYWORD:
+            if self.current_value == 'return':
+                pos_start = self.current_pos_start()
+                self.advance()
+                expression = self.expression() if self.starts_expression() else None
+                return ReturnNode(expression, pos_start, self.current_pos_end())
 
-        expression = response.register(self.expression())
+            if self.current_value == 'continue':
+                pos_start = self.current_pos_start()
+                self.advance()
+                return ContinueNode(pos_start, self.current_pos_end())
 
-        if response.error:
-            return response
+            if self.current_value == 'break':
+                pos_start = self.current_pos_start()
+                self.advance()
+                return BreakNode(pos_start, self.current_pos_end())
 
-        return response.success(expression)
+        return self.expression()
 
     def if_expression(self):
-        response = ParseResult()
-        all_cases = response.register(self.if_expression_cases('if'))
-        if response.error:
-            return response
-        cases, else_case = all_cases
-        return response.success(IfNode(cases, else_case))
+        cases, else_case = self.if_expression_cases('if')
+        return IfNode(cases, else_case)
 
     def if_expression_b(self):
         return self.if_expression_cases('elif')
 
     def if_expression_c(self):
-        response = ParseResult()
         else_case = None
 
-        if self.current_token.matches(TT_KEYWORD, 'else'):
-            response.register_advancement()
+        if self.current_matches(TT_KEYWORD, 'else'):
             self.advance()
 
-            if self.current_token.type == TT_NEWLINE:
-                response.register_advancement()
+            if self.current_type == TT_NEWLINE:
                 self.advance()
-
-                statements = response.register(self.statements())
-                if response.error:
-                    return response
+                statements = self.statements()
                 else_case = (statements, True)
-
-                if self.current_token.matches(TT_KEYWORD, 'end'):
-                    response.register_advancement()
-                    self.advance()
-                else:
-                    return response.failure(InvalidSyntaxError(
-                        self.current_token.pos_start, self.current_token.pos_end,
-                        "Expected 'end'"
-                    ))
+                self.expect_keyword('end')
             else:
-                expression = response.register(self.statement())
-                if response.error:
-                    return response
+                expression = self.statement()
                 else_case = (expression, False)
 
-        return response.success(else_case)
+        return else_case
 
     def if_expression_b_or_c(self):
-        response = ParseResult()
-        cases, else_case = [], None
-
-        if self.current_token.matches(TT_KEYWORD, 'elif'):
-            all_cases = response.register(self.if_expression_b())
-            if response.error:
-                return response
-            cases, else_case = all_cases
-        else:
-            else_case = response.register(self.if_expression_c())
-            if response.error:
-                return response
-
-        return response.success((cases, else_case))
+        if self.current_matches(TT_KEYWORD, 'elif'):
+            return self.if_expression_b()
+        return [], self.if_expression_c()
 
     def if_expression_cases(self, case_keyword):
-        response = ParseResult()
         cases = []
         else_case = None
 
-        if not self.current_token.matches(TT_KEYWORD, case_keyword):
-            return response.failure(InvalidSyntaxError(
-                self.current_token.pos_start, self.current_token.pos_end,
-                "Expected 'if'"
-            ))
-
-        response.register_advancement()
+        if not self.current_matches(TT_KEYWORD, case_keyword):
+            self.fail("Expected 'if'")
         self.advance()
 
-        condition = response.register(self.expression())
-        if response.error:
-            return response
+        condition = self.expression()
+        self.expect_keyword('then')
 
-        if not self.current_token.matches(TT_KEYWORD, 'then'):
-            return response.failure(InvalidSyntaxError(
-                self.current_token.pos_start, self.current_token.pos_end,
-                "Expected 'then'"
-            ))
-
-        response.register_advancement()
-        self.advance()
-
-        if self.current_token.type == TT_NEWLINE:
-            response.register_advancement()
+        if self.current_type == TT_NEWLINE:
             self.advance()
-
-            statements = response.register(self.statements())
-            if response.error:
-                return response
+            statements = self.statements()
             cases.append((condition, statements, True))
 
-            if self.current_token.matches(TT_KEYWORD, 'end'):
-                response.register_advancement()
+            if self.current_matches(TT_KEYWORD, 'end'):
                 self.advance()
             else:
-                all_cases = response.register(self.if_expression_b_or_c())
-                if response.error:
-                    return response
-                new_cases, else_case = all_cases
+                new_cases, else_case = self.if_expression_b_or_c()
                 cases.extend(new_cases)
         else:
-            expression = response.register(self.statement())
-            if response.error:
-                return response
+            expression = self.statement()
             cases.append((condition, expression, False))
 
-            all_cases = response.register(self.if_expression_b_or_c())
-            if response.error:
-                return response
-            new_cases, else_case = all_cases
+            new_cases, else_case = self.if_expression_b_or_c()
             cases.extend(new_cases)
 
-        return response.success((cases, else_case))
+        return cases, else_case
 
     def for_expression(self):
-        response = ParseResult()
-
-        if not self.current_token.matches(TT_KEYWORD, 'for'):
-            return response.failure(InvalidSyntaxError(
-                self.current_token.pos_start, self.current_token.pos_end,
-                "Expected 'for'"
-            ))
-
-        response.register_advancement()
-        self.advance()
-
-        if self.current_token.type != TT_IDENTIFIER:
-            return response.failure(InvalidSyntaxError(
-                self.current_token.pos_start, self.current_token.pos_end,
-                "Expected IDENTIFIER"
-            ))
+        self.expect_keyword('for')
 
+        if self.current_type != TT_IDENTIFIER:
+            self.fail("Expected IDENTIFIER")
         variable_name = self.current_token
-        response.register_advancement()
         self.advance()
 
-        if self.current_token.type != TT_EQUALS:
-            return response.failure(InvalidSyntaxError(
-                self.current_token.pos_start, self.current_token.pos_end,
-                "Expected '='"
-            ))
-
-        response.register_advancement()
+        if self.current_type != TT_EQUALS:
+            self.fail("Expected '='")
         self.advance()
 
-        initial_value = response.register(self.expression())
-        if response.error:
-            return response
-
-        if not self.current_token.matches(TT_KEYWORD, 'to'):
-            return response.failure(InvalidSyntaxError(
-                self.current_token.pos_start, self.current_token.pos_end,
-                "Expected 'to'"
-            ))
+        initial_value = self.expression()
+        self.expect_keyword('to')
+        end_value = self.expression()
 
-        response.register_advancement()
-        self.advance()
-
-        end_value = response.register(self.expression())
-        if response.error:
-            return response
-
-        if self.current_token.matches(TT_KEYWORD, 'step'):
-            response.register_advancement()
+        if self.current_matches(TT_KEYWORD, 'step'):
             self.advance()
-
-            step_value = response.register(self.expression())
-            if response.error:
-                return response
+            step_value = self.expression()
         else:
             step_value = None
 
-        if not self.current_token.matches(TT_KEYWORD, 'then'):
-            return response.failure(InvalidSyntaxError(
-                self.current_token.pos_start, self.current_token.pos_end,
-                "Expected 'then'"
-            ))
+        self.expect_keyword('then')
 
-        response.register_advancement()
-        self.advance()
-
-        if self.current_token.type == TT_NEWLINE:
-            response.register_advancement()
+        if self.current_type == TT_NEWLINE:
             self.advance()
+            body = self.statements()
+            self.expect_keyword('end')
+            return ForNode(variable_name, initial_value, end_value, step_value, body, True)
 
-            body = response.register(self.statements())
-            if response.error:
-                return response
-
-            if not self.current_token.matches(TT_KEYWORD, 'end'):
-                return response.failure(InvalidSyntaxError(
-                    self.current_token.pos_start, self.current_token.pos_end,
-                    "Expected 'end'"
-                ))
-
-            response.register_advancement()
-            self.advance()
-
-            return response.success(ForNode(variable_name, initial_value, end_value, step_value, body, True))
-
-        body = response.register(self.statement())
-        if response.error:
-            return response
-
-        return response.success(ForNode(variable_name, initial_value, end_value, step_value, body, False))
+        body = self.statement()
+        return ForNode(variable_name, initial_value, end_value, step_value, body, False)
 
     def while_expression(self):
-        response = ParseResult()
-
-        if not self.current_token.matches(TT_KEYWORD, 'while'):
-            return response.failure(InvalidSyntaxError(
-                self.current_token.pos_start, self.current_token.pos_end,
-                "Expected 'while'"
-            ))
-
-        response.register_advancement()
-        self.advance()
-
-        condition = response.register(self.expression())
-        if response.error:
-            return response
-
-        if not self.current_token.matches(TT_KEYWORD, 'then'):
-            return response.failure(InvalidSyntaxError(
-                self.current_token.pos_start, self.current_token.pos_end,
-                "Expected 'then'"
-            ))
-
-        response.register_advancement()
-        self.advance()
-
-        if self.current_token.type == TT_NEWLINE:
-            response.register_advancement()
-            self.advance()
-
-            body = response.register(self.statements())
-            if response.error:
-                return response
-
-            if not self.current_token.matches(TT_KEYWORD, 'end'):
-                return response.failure(InvalidSyntaxError(
-                    self.current_token.pos_start, self.current_token.pos_end,
-                    "Expected 'end'"
-                ))
-
-            response.register_advancement()
-            self.advance()
-
-            return response.success(WhileNode(condition, body, True))
-
-        body = response.register(self.statement())
-        if response.error:
-            return response
-
-        return response.success(WhileNode(condition, body, False))
-
-    def call(self):
-        response = ParseResult()
-        atom = response.register(self.atom())
-        if response.error:
-            return response
+        self.expect_keyword('while')
+        condition = self.expression()
+        self.expect_keyword('then')
 
-        if self.current_token.type == TT_LPAREN:
-            response.register_advancement()
+        if self.current_type == TT_NEWLINE:
             self.advance()
+            body = self.statements()
+            self.expect_keyword('end')
+            return WhileNode(condition, body, True)
 
-            arguments = []
-            if self.current_token.type == TT_RPAREN:
-                response.register_advancement()
-                self.advance()
-            else:
-                arguments.append(response.register(self.expression()))
-                if response.error:
-                    return response.failure(InvalidSyntaxError(
-                        self.current_token.pos_start, self.current_token.pos_end,
-                        "b6 " + ERROR_STRING_2
-                    ))
-
-                while self.current_token.type == TT_COMMA:
-                    response.register_advancement()
-                    self.advance()
-
-                    arguments.append(response.register(self.expression()))
-                    if response.error:
-                        return response
-
-                if self.current_token.type != TT_RPAREN:
-                    return response.failure(InvalidSyntaxError(
-                        self.current_token.pos_start, self.current_token.pos_end,
-                        "Expected ',' or ')'"
-                    ))
-
-                response.register_advancement()
-                self.advance()
-            return response.success(CallNode(atom, arguments))
-        return response.success(atom)
+        body = self.statement()
+        return WhileNode(condition, body, False)
 
     def atom(self):
-        response = ParseResult()
-        token = self.current_token
+        token_type = self.current_type
 
-        if token.type in (TT_INT, TT_FLOAT):
-            response.register_advancement()
+        if token_type in (TT_INT, TT_FLOAT):
+            token = self.current_token
             self.advance()
-            return response.success(NumberNode(token))
+            return NumberNode(token)
 
-        if token.type == TT_STRING:
-            response.register_advancement()
+        if token_type == TT_STRING:
+            token = self.current_token
             self.advance()
-            return response.success(StringNode(token))
+            return StringNode(token)
 
-        elif token.type == TT_IDENTIFIER:
-            response.register_advancement()
+        elif token_type == TT_IDENTIFIER:
+            token = self.current_token
             self.advance()
-            return response.success(VariableAccessNode(token))
+            return VariableAccessNode(token)
 
-        elif token.type == TT_LPAREN:
-            response.register_advancement()
+        elif token_type == TT_LPAREN:
             self.advance()
-            expression = response.register(self.expression())
-            if response.error:
-                return response
-            if self.current_token.type == TT_RPAREN:
-                response.register_advancement()
-                self.advance()
-                return response.success(expression)
-            else:
-                return response.failure(InvalidSyntaxError(
-                    self.current_token.pos_start, self.current_token.pos_end,
-                    "Expected ')'"
-                ))
-        elif token.matches(TT_KEYWORD, 'if'):
-            if_expression = response.register(self.if_expression())
-            if response.error:
-                return response
-            return response.success(if_expression)
-
-        elif token.matches(TT_KEYWORD, 'for'):
-            for_expression = response.register(self.for_expression())
-            if response.error:
-                return response
-            return response.success(for_expression)
-
-        elif token.matches(TT_KEYWORD, 'while'):
-            while_expression = response.register(self.while_expression())
-            if response.error:
-                return response
-            return response.success(while_expression)
-
-        elif token.matches(TT_KEYWORD, 'func'):
-            function_definition = response.register(self.function_definition())
-            if response.error:
-                return response
-            return response.success(function_definition)
-
-        elif token.type == TT_LSQUAREBRACKET:
-            list_expression = response.register(self.list_expression())
-            if response.error:
-                return response
-            return response.success(list_expression)
-
-        return response.failure(InvalidSyntaxError(token.pos_start, token.pos_end, "b3 " + ERROR_STRING_2))
-
-    def power(self):
-        return self.binary_operation(self.call, (TT_POW,), self.factor)
-
-    def factor(self):
-        response = ParseResult()
-        token = self.current_token
-
-        if token.type in (TT_PLUS, TT_MINUS):
-            response.register_advancement()
+            expression = self.expression()
+            if self.current_type != TT_RPAREN:
+                self.fail("Expected ')'")
             self.advance()
-            factor = response.register(self.factor())
-            if response.error:
-                return response
-            return response.success(UnaryOpNode(token, factor))
+            return expression
 
-        return self.power()
+        elif token_type == TT_KEYWORD:
+            if self.current_value == 'if':
+                return self.if_expression()
+            if self.current_value == 'for':
+                return self.for_expression()
+            if self.current_value == 'while':
+                return self.while_expression()
+            if self.current_value == 'func':
+                return self.function_definition()
 
-    def term(self):
-        return self.binary_operation(self.factor, (TT_MUL, TT_DIV, TT_QUESTIONMARK))
+        elif token_type == TT_LSQUAREBRACKET:
+            return self.list_expression()
 
-    def arithmatic_expression(self):
-        return self.binary_operation(self.term, (TT_PLUS, TT_MINUS))
+        self.fail("b3 " + ERROR_STRING_2)
 
-    def comparison_expression(self):
-        response = ParseResult()
-
-        if self.current_token.matches(TT_KEYWORD, 'not'):
-            operator_token = self.current_token
-            response.register_advancement()
+    def expression(self):
+        if self.current_matches(TT_KEYWORD, 'set'):
             self.advance()
 
-            node = response.register(self.comparison_expression())
-            if response.error:
-                return response
-            return response.success(UnaryOpNode(operator_token, node))
+            if self.current_type != TT_IDENTIFIER:
+                self.fail("Expected identifier")
+            identifier = self.current_token
+            self.advance()
 
-        node = response.register(
-            self.binary_operation(self.arithmatic_expression, (TT_DOUBLEEQUALS, TT_LESS, TT_LESSEQUALS, TT_GREATER, TT_GREATEREQUALS, TT_NOTEQUALS)))
+            if self.current_type != TT_EQUALS:
+                self.fail("Expected '='")
+            self.advance()
 
-        if response.error:
-            return response.failure(
-                InvalidSyntaxError(self.current_token.pos_start, self.current_token.pos_end, "b4 " + ERROR_STRING_2))
+            return VariableAssignNode(identifier, self.expression())
 
-        return response.success(node)
+        start_index = self.token_index
+        try:
+            return self.operation(PRECEDENCE_LOGICAL)
+        except ParseFailure:
+            # Only replace the error when nothing of the expression could be read
+            if self.token_index != start_index:
+                raise
+            self.fail(ERROR_STRING_1)
 
-    def expression(self):
-        response = ParseResult()
-
-        if self.current_token.matches(TT_KEYWORD, 'set'):
-            response.register_advancement()
+    def comparison_expression(self):
+        start_index = self.token_index
+        try:
+            return self.operation(PRECEDENCE_COMPARISON)
+        except ParseFailure:
+            if self.token_index != start_index:
+                raise
+            self.fail("b4 " + ERROR_STRING_2)
+
+    def operation(self, min_precedence):
+        token_type = self.current_type
+
+        if token_type == TT_PLUS or token_type == TT_MINUS:
+            token = self.current_token
             self.advance()
-
-            if self.current_token.type != TT_IDENTIFIER:
-                return response.failure(InvalidSyntaxError(
-                    self.current_token.pos_start, self.current_token.pos_end,
-                    "Expected identifier"
-                ))
-            identifier = self.current_token
-            response.register_advancement()
+            left = UnaryOpNode(token, self.operation(PRECEDENCE_POWER))
+        elif token_type == TT_KEYWORD and self.current_value == 'not' and min_precedence <= PRECEDENCE_COMPARISON:
+            token = self.current_token
             self.advance()
+            left = UnaryOpNode(token, self.comparison_expression())
+        else:
+            left = self.atom()
+            if self.current_type == TT_LPAREN:
+                left = self.call(left)
 
-            if self.current_token.type != TT_EQUALS:
-                return response.failure(InvalidSyntaxError(
-                    self.current_token.pos_start, self.current_token.pos_end,
-                    "Expected '='"
-                ))
+        while True:
+            token_type = self.current_type
+            if token_type == TT_KEYWORD:
+                precedence = KEYWORD_PRECEDENCES.get(self.current_value)
+            else:
+                precedence = BINARY_PRECEDENCES.get(token_type)
+            if precedence is None or precedence < min_precedence:
+                return left
 
-            response.register_advancement()
+            token = self.current_token
             self.advance()
-            expression = response.register(self.expression())
-            if response.error:
-                return response
-            return response.success(VariableAssignNode(identifier, expression))
-
-        node = response.register(self.binary_operation(self.comparison_expression, ((TT_KEYWORD, "and"), (TT_KEYWORD, "or"))))
-        if response.error:
-            return response.failure(InvalidSyntaxError(
-                self.current_token.pos_start, self.current_token.pos_end,
-                ERROR_STRING_1
-            ))
-
-        return response.success(node)
+            if precedence == PRECEDENCE_LOGICAL:
+                right = self.comparison_expression()
+            elif precedence == PRECEDENCE_POWER:
+                # '^' is right associative and its right side may carry a sign
+                right = self.operation(PRECEDENCE_POWER)
+            else:
+                right = self.operation(precedence + 1)
+            left = BinOpNode(left, token, right)
 
-    def binary_operation(self, function_a, operator_tokens, function_b=None):
-        if function_b is None:
-            function_b = function_a
-        response = ParseResult()
-        left_factor = response.register(function_a())
-        if response.error:
-            return response
+    def call(self, atom):
+        self.advance()
 
-        while self.current_token.type in operator_tokens or (self.current_token.type, self.current_token.value) in operator_tokens:
-            token = self.current_token
-            response.register_advancement()
+        arguments = []
+        if self.current_type == TT_RPAREN:
             self.advance()
-            right_factor = response.register(function_b())
-            if response.error:
-                return response
-            left_factor = BinOpNode(left_factor, token, right_factor)
-
-        return response.success(left_factor)
+        else:
+            arguments.append(self.expression())
 
-    def function_definition(self):
-        response = ParseResult()
+            while self.current_type == TT_COMMA:
+                self.advance()
+                arguments.append(self.expression())
 
-        if not self.current_token.matches(TT_KEYWORD, 'func'):
-            return response.failure(InvalidSyntaxError(
-                self.current_token.pos_start, self.current_token.pos_end,
-                "Expected 'func'"
-            ))
+            if self.current_type != TT_RPAREN:
+                self.fail("Expected ',' or ')'")
+            self.advance()
+        return CallNode(atom, arguments)
 
-        response.register_advancement()
-        self.advance()
+    def function_definition(self):
+        self.expect_keyword('func')
 
-        if self.current_token.type == TT_IDENTIFIER:
+        if self.current_type == TT_IDENTIFIER:
             variable_name_token = self.current_token
-            response.register_advancement()
             self.advance()
-            if self.current_token.type != TT_LPAREN:
-                return response.failure(InvalidSyntaxError(
-                    self.current_token.pos_start, self.current_token.pos_end,
-                    "Expected '('"
-                ))
+            if self.current_type != TT_LPAREN:
+                self.fail("Expected '('")
         else:
             variable_name_token = None
-            if self.current_token.type != TT_LPAREN:
-                return response.failure(InvalidSyntaxError(
-                    self.current_token.pos_start, self.current_token.pos_end,
-                    "Expected identifier or '('"
-                ))
+            if self.current_type != TT_LPAREN:
+                self.fail("Expected identifier or '('")
 
-        response.register_advancement()
         self.advance()
         argument_node_tokens = []
 
-        if self.current_token.type == TT_IDENTIFIER:
+        if self.current_type == TT_IDENTIFIER:
             argument_node_tokens.append(self.current_token)
-            response.register_advancement()
             self.advance()
 
-            while self.current_token.type == TT_COMMA:
-                response.register_advancement()
+            while self.current_type == TT_COMMA:
                 self.advance()
 
-                if self.current_token.type != TT_IDENTIFIER:
-                    return response.failure(InvalidSyntaxError(
-                        self.current_token.pos_start, self.current_token.pos_end,
-                        "Expected identifier"
-                    ))
+                if self.current_type != TT_IDENTIFIER:
+                    self.fail("Expected identifier")
 
                 argument_node_tokens.append(self.current_token)
-                response.register_advancement()
                 self.advance()
 
-            if self.current_token.type != TT_RPAREN:
-                return response.failure(InvalidSyntaxError(
-                    self.current_token.pos_start, self.current_token.pos_end,
-                    "Expected ',' or ')'"
-                ))
+            if self.current_type != TT_RPAREN:
+                self.fail("Expected ',' or ')'")
         else:
-            if self.current_token.type != TT_RPAREN:
-                return response.failure(InvalidSyntaxError(
-                    self.current_token.pos_start, self.current_token.pos_end,
-                    "Expected identifier or ')'"
-                ))
+            if self.current_type != TT_RPAREN:
+                self.fail("Expected identifier or ')'")
 
-        response.register_advancement()
         self.advance()
 
-        if self.current_token.type == TT_ARROW:
-
-            response.register_advancement()
+        if self.current_type == TT_ARROW:
             self.advance()
+            body_node = self.expression()
+            return FunctionDefinitionNode(variable_name_token, argument_node_tokens, body_node, True)
 
-            body_node = response.register(self.expression())
-            if response.error:
-                return response
-
-            return response.success(FunctionDefinitionNode(variable_name_token, argument_node_tokens, body_node, True))
-
-        if self.current_token.type != TT_NEWLINE:
-            return response.failure(InvalidSyntaxError(
-                self.current_token.pos_start, self.current_token.pos_end,
-                "Expected '->' or NEWLINE"
-            ))
-
-        response.register_advancement()
+        if self.current_type != TT_NEWLINE:
+            self.fail("Expected '->' or NEWLINE")
         self.advance()
 
-        body_node = response.register(self.statements())
-        if response.error:
-            return response
+        body_node = self.statements()
+        self.expect_keyword('end')
 
-        if not self.current_token.matches(TT_KEYWORD, 'end'):
-            return response.failure(InvalidSyntaxError(
-                self.current_token.pos_start, self.current_token.pos_end,
-                "Expected 'end'"
-            ))
-
-        response.register_advancement()
-        self.advance()
-
-        return response.success(FunctionDefinitionNode(variable_name_token, argument_node_tokens, body_node, False))
+        return FunctionDefinitionNode(variable_name_token, argument_node_tokens, body_node, False)
 
     def list_expression(self):
-        response = ParseResult()
         element_nodes = []
-        pos_start = self.current_token.pos_start.copy()
+        pos_start = self.current_pos_start()
 
-        if self.current_token.type != TT_LSQUAREBRACKET:
-            return response.failure(InvalidSyntaxError(
-                self.current_token.pos_start, self.current_token.pos_end,
-                "Expected '['"
-            ))
-
-        response.register_advancement()
+        if self.current_type != TT_LSQUAREBRACKET:
+            self.fail("Expected '['")
         self.advance()
 
-        if self.current_token.type == TT_RSQUAREBRACKET:
-            response.register_advancement()
+        if self.current_type == TT_RSQUAREBRACKET:
             self.advance()
-            return response.success(ListNode(element_nodes, pos_start, self.current_token.pos_end.copy()))
-        else:
-            element_nodes.append(response.register(self.expression()))
-            if response.error:
-                return response.failure(InvalidSyntaxError(
-                    self.current_token.pos_start, self.current_token.pos_end,
-                    "b7 " + ERROR_STRING_2
-                ))
-
-            while self.current_token.type == TT_COMMA:
-                response.register_advancement()
-                self.advance()
-
-                element_nodes.append(response.register(self.expression()))
-                if response.error:
-                    return response
+            return ListNode(element_nodes, pos_start, self.current_pos_end())
 
-            if self.current_token.type != TT_RSQUAREBRACKET:
-                return response.failure(InvalidSyntaxError(
-                    self.current_token.pos_start, self.current_token.pos_end,
-                    "Expected ',' or ']'"
-                ))
+        element_nodes.append(self.expression())
 
-            response.register_advancement()
+        while self.current_type == TT_COMMA:
             self.advance()
+            element_nodes.append(self.expression())
+
+        if self.current_type != TT_RSQUAREBRACKET:
+            self.fail("Expected ',' or ']'")
+        self.advance()
 
-        return response.success(ListNode(element_nodes, pos_start, self.current_token.pos_end.copy()))
+        return ListNode(element_nodes, pos_start, self.current_pos_end())
@@ -1,19 +1,58 @@
-class Position:
-    def __init__(self, index, line, column, filename, filetext):
+from bisect import bisect_left, bisect_right
+
+
+class SourceFile:
+    __slots__ = ('filename', 'text', 'line_starts')
+
+    def __init__(self, filename, text):
         self.filename = filename
-        self.filetext = filetext
+        self.text = text
+        self.line_starts = None
+
+    def build_line_starts(self):
+        line_starts = [0]
+        text = self.text
+        index = text.find('\n')
+        while index >= 0:
+            line_starts.append(index + 1)
+            index = text.find('\n', index + 1)
+        self.line_starts = line_starts
+        return line_starts
+
+    def line_column(self, index, is_end=False):
+        line_starts = self.line_starts or self.build_line_starts()
+        # An end position sitting right after a newline belongs to the line the newline ends
+        if is_end:
+            line = bisect_left(line_starts, index) - 1
+        else:
+            line = bisect_right(line_starts, index) - 1
+        line = max(line, 0)
+        return line, index - line_starts[line]
+
+
+class Position:
+    __slots__ = ('index', 'source', 'is_end')
+
+    def __init__(self, index, source, is_end=False):
         self.index = index
-        self.line = line
-        self.column = column
+        self.source = source
+        self.is_end = is_end
+
+    @property
+    def filename(self):
+        return self.source.filename
+
+    @property
+    def filetext(self):
+        return self.source.text
 
-    def advance(self, current_char=None):
-        self.index += 1
-        self.column += 1
-        if current_char == '\n':
-            self.line += 1
-            self.column = 0
+    @property
+    def line(self):
+        return self.source.line_column(self.index, self.is_end)[0]
 
-        return self
+    @property
+    def column(self):
+        return self.source.line_column(self.index, self.is_end)[1]
 
     def copy(self):
-        return Position(self.index, self.line, self.column, self.filename, self.filetext)
\ No newline at end of file
+        return Position(self.index, self.source, self.is_end)
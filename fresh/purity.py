@@ -0,0 +1,169 @@
+from collections import Counter
+
+from fresh.memo import PURE_BUILTINS
+from fresh.nodes import VariableAccessNode, VariableAssignNode, ForNode, FunctionDefinitionNode, children
+
+
+class FunctionState:
+    def __init__(self, name):
+        self.name = name
+        self.pure = True
+        self.loop_depth = 0
+
+
+# How often each name is bound anywhere in the program, by set, func, an argument or a for variable
+def count_bindings(node):
+    bindings = Counter()
+    nodes = [node]
+    while nodes:
+        node = nodes.pop()
+        node_type = type(node)
+        if node_type is VariableAssignNode:
+            bindings[node.token.value] += 1
+        elif node_type is ForNode:
+            bindings[node.variable_name_token.value] += 1
+        elif node_type is FunctionDefinitionNode:
+            if node.variable_name_token:
+                bindings[node.variable_name_token.value] += 1
+            for argument in node.argument_name_tokens:
+                bindings[argument.value] += 1
+        nodes.extend(children(node))
+    return bindings
+
+
+# Marks the functions whose result only depends on their arguments, so calls to them can be remembered.
+# Scoping is dynamic, so a name the function has not set for certain could come from whoever called it. Every visit
+# takes the names set for certain so far and returns them as they are after the node. A set only ever writes to the
+# function's own table, only builtins like append change anything beyond it. A call by name is only taken to reach a
+# builtin or the function itself when the program binds that name nowhere else, any caller could have rebound it.
+class PurityAnalyzer:
+    def __init__(self, memo_size):
+        self.memo_size = memo_size
+        # The function being analyzed, None at the top level where nothing is remembered
+        self.function = None
+        self.bindings = Counter()
+
+    def analyze_program(self, node):
+        self.bindings = count_bindings(node)
+        try:
+            self.analyze(node, frozenset())
+        except RecursionError:
+            # Functions whose analysis did not finish keep a memo size of 0
+            pass
+        return node
+
+    def analyze(self, node, assigned):
+        method_name = f'analyze_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_analyze_method)
+        return method(node, assigned)
+
+    def no_analyze_method(self, node, assigned):
+        raise Exception(f'No analyze_{type(node).__name__} method defined')
+
+    def impure(self):
+        if self.function:
+            self.function.pure = False
+
+    def reaches_known_function(self, name):
+        if name == self.function.name:
+            # Its own definition is the one binding the name may have
+            return self.bindings[name] == 1
+        return name in PURE_BUILTINS and not self.bindings[name]
+
+    def analyze_NumberNode(self, node, assigned):
+        return assigned
+
+    def analyze_StringNode(self, node, assigned):
+        return assigned
+
+    def analyze_VariableAccessNode(self, node, assigned):
+        name = node.variable_name_token.value
+        if self.function and name not in assigned and not self.reaches_known_function(name):
+            self.impure()
+        return assigned
+
+    def analyze_VariableAssignNode(self, node, assigned):
+        return self.analyze(node.value_node, assigned) | {node.token.value}
+
+    def analyze_BinOpNode(self, node, assigned):
+        return self.analyze(node.right_node, self.analyze(node.left_node, assigned))
+
+    def analyze_UnaryOpNode(self, node, assigned):
+        return self.analyze(node.node, assigned)
+
+    def analyze_IfNode(self, node, assigned):
+        # A condition only runs when the ones before it failed, a name is set after the if only when every way through sets it
+        outcomes = []
+        for condition, expression, should_return_null in node.cases:
+            assigned = self.analyze(condition, assigned)
+            outcomes.append(self.analyze(expression, assigned))
+        outcomes.append(self.analyze(node.else_case[0], assigned) if node.else_case else assigned)
+        return frozenset.intersection(*outcomes)
+
+    def analyze_ForNode(self, node, assigned):
+        assigned = self.analyze(node.start_value_node, assigned)
+        assigned = self.analyze(node.end_value_node, assigned)
+        if node.step_value_node:
+            assigned = self.analyze(node.step_value_node, assigned)
+        # The body may never run, so nothing it sets counts after the loop
+        self.analyze_loop_body(node.body_node, assigned | {node.variable_name_token.value})
+        return assigned
+
+    def analyze_WhileNode(self, node, assigned):
+        # A break in the condition leaves an outer loop, like in the interpreter
+        assigned = self.analyze(node.condition_node, assigned)
+        self.analyze_loop_body(node.body_node, assigned)
+        return assigned
+
+    def analyze_loop_body(self, body_node, assigned):
+        if self.function:
+            self.function.loop_depth += 1
+        self.analyze(body_node, assigned)
+        if self.function:
+            self.function.loop_depth -= 1
+
+    def analyze_FunctionDefinitionNode(self, node, assigned):
+        name = node.variable_name_token.value if node.variable_name_token else None
+        outer_function = self.function
+        self.function = FunctionState(name)
+        self.analyze(node.body_node, frozenset(argument.value for argument in node.argument_name_tokens))
+        if self.function.pure:
+            node.memo_size = self.memo_size
+        self.function = outer_function
+        return assigned | {name} if name else assigned
+
+    def analyze_CallNode(self, node, assigned):
+        function_node = node.function_node
+        if self.function:
+            # Only builtins that change nothing and the function itself can be called, anything else may have effects
+            if type(function_node) is not VariableAccessNode:
+                self.impure()
+            else:
+                name = function_node.variable_name_token.value
+                if name in assigned or not self.reaches_known_function(name):
+                    self.impure()
+        assigned = self.analyze(function_node, assigned)
+        for argument_node in node.argument_nodes:
+            assigned = self.analyze(argument_node, assigned)
+        return assigned
+
+    def analyze_ListNode(self, node, assigned):
+        for element_node in node.element_nodes:
+            assigned = self.analyze(element_node, assigned)
+        return assigned
+
+    def analyze_ReturnNode(self, node, assigned):
+        if node.node_to_return:
+            return self.analyze(node.node_to_return, assigned)
+        return assigned
+
+    def analyze_ContinueNode(self, node, assigned):
+        # Outside a loop of its own the function would continue a loop of its caller
+        if self.function and not self.function.loop_depth:
+            self.impure()
+        return assigned
+
+    def analyze_BreakNode(self, node, assigned):
+        if self.function and not self.function.loop_depth:
+            self.impure()
+        return assigned
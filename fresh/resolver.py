@@ -0,0 +1,115 @@
+class Scope:
+    def __init__(self, slots):
+        self.slots = slots
+        # Reads are only numbered once the whole body is seen, a name can be assigned after it is first read
+        self.accesses = []
+
+
+# Numbers the variables every function assigns, so its calls keep them in a list instead of a dict.
+# Scoping is dynamic, a function sees the variables of whoever called it, so there is no deeper static
+# coordinate than the function's own frame. Every other name is still looked up by name through the callers.
+class Resolver:
+    def __init__(self):
+        # The top level stays in the global symbol table
+        self.scope = None
+
+    def resolve_program(self, node):
+        try:
+            self.resolve(node)
+        except RecursionError:
+            # Anything left unnumbered is looked up by name, which frames also answer
+            pass
+        return node
+
+    def resolve(self, node):
+        method_name = f'resolve_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_resolve_method)
+        method(node)
+
+    def no_resolve_method(self, node):
+        raise Exception(f'No resolve_{type(node).__name__} method defined')
+
+    def declare(self, name):
+        if self.scope is None:
+            return None
+        slots = self.scope.slots
+        index = slots.get(name)
+        if index is None:
+            index = slots[name] = len(slots)
+        return index
+
+    def resolve_NumberNode(self, node):
+        pass
+
+    def resolve_StringNode(self, node):
+        pass
+
+    def resolve_VariableAccessNode(self, node):
+        if self.scope is not None:
+            self.scope.accesses.append(node)
+
+    def resolve_VariableAssignNode(self, node):
+        self.resolve(node.value_node)
+        node.slot = self.declare(node.token.value)
+
+    def resolve_BinOpNode(self, node):
+        self.resolve(node.left_node)
+        self.resolve(node.right_node)
+
+    def resolve_UnaryOpNode(self, node):
+        self.resolve(node.node)
+
+    def resolve_IfNode(self, node):
+        for condition, expression, should_return_null in node.cases:
+            self.resolve(condition)
+            self.resolve(expression)
+        if node.else_case:
+            self.resolve(node.else_case[0])
+
+    def resolve_ForNode(self, node):
+        self.resolve(node.start_value_node)
+        self.resolve(node.end_value_node)
+        if node.step_value_node:
+            self.resolve(node.step_value_node)
+        node.slot = self.declare(node.variable_name_token.value)
+        self.resolve(node.body_node)
+
+    def resolve_WhileNode(self, node):
+        self.resolve(node.condition_node)
+        self.resolve(node.body_node)
+
+    def resolve_FunctionDefinitionNode(self, node):
+        if node.variable_name_token:
+            node.slot = self.declare(node.variable_name_token.value)
+
+        outer_scope = self.scope
+        # The arguments take the first slots, in order
+        self.scope = Scope({})
+        for argument_name_token in node.argument_name_tokens:
+            self.declare(argument_name_token.value)
+        node.frame_slots = self.scope.slots
+
+        self.resolve(node.body_node)
+        slots = self.scope.slots
+        for access_node in self.scope.accesses:
+            access_node.slot = slots.get(access_node.variable_name_token.value)
+        self.scope = outer_scope
+
+    def resolve_CallNode(self, node):
+        self.resolve(node.function_node)
+        for argument_node in node.argument_nodes:
+            self.resolve(argument_node)
+
+    def resolve_ListNode(self, node):
+        for element_node in node.element_nodes:
+            self.resolve(element_node)
+
+    def resolve_ReturnNode(self, node):
+        if node.node_to_return:
+            self.resolve(node.node_to_return)
+
+    def resolve_ContinueNode(self, node):
+        pass
+
+    def resolve_BreakNode(self, node):
+        pass
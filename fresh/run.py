@@ -1,9 +1,19 @@
+from fresh.astcache import ASTCache
+from fresh.closurecompiler import ClosureCompiler
 from fresh.context import Context
+from fresh.hotloops import LoopSpecializer
 from fresh.interpreter import Interpreter
 from fresh.lexer import Lexer
+from fresh.memo import DEFAULT_MEMO_SIZE
+from fresh.optimizer import Optimizer
 from fresh.parser import Parser
-from fresh.symboltable import SymbolTable
+from fresh.position import SourceFile
+from fresh.purity import PurityAnalyzer
+from fresh.resolver import Resolver
+from fresh.symboltable import SymbolTable, reset_shadow_versions
+from fresh.transpile import Transpiler, CodeCache, run_code
 from fresh.values import Number, BuiltInFunction
+from fresh.vm import VirtualMachine
 
 global_symbol_table = SymbolTable()
 global_symbol_table.set('null', Number.null)
@@ -28,23 +38,73 @@ global_symbol_table.set('str', BuiltInFunction.str)
 global_symbol_table.set('int', BuiltInFunction.int)
 global_symbol_table.set('float', BuiltInFunction.float)
 global_symbol_table.set('wait', BuiltInFunction.wait)
+global_symbol_table.set('memoize', BuiltInFunction.memoize)
+global_symbol_table.set('memo_stats', BuiltInFunction.memo_stats)
 
-def run(filename, text, debug=False):
-    lexer = Lexer(filename, text, debug)
-    tokens, error = lexer.make_tokens()
-    if error:
-        return None, error
+ENGINES = ('interpreter', 'closures', 'vm', 'python')
 
-    # Generate Abstract Syntax Tree
 
-    parser = Parser(tokens)
-    ast = parser.parse()
-    if ast.error:
-        return None, ast.error
-
-    interpreter = Interpreter()
+def run(filename, text, debug=False, cache_directory=None, engine='interpreter', optimize=True, resolve=True,
+        memo_size=DEFAULT_MEMO_SIZE, specialize=True):
     context = Context('<program>')
     context.symbol_table = global_symbol_table
-    result = interpreter.visit(ast.node, context)
+    reset_shadow_versions()
+
+    # The caches are skipped when debugging so the tokens still get printed
+    caching = cache_directory and not debug
+    # Cached code is always generated from the optimized tree
+    code_cache = CodeCache(cache_directory, memo_size) if caching and engine == 'python' and optimize else None
+    if code_cache:
+        compiled = code_cache.load(filename, text)
+        if compiled:
+            code, spans = compiled
+            return run_code(code, spans, SourceFile(filename, text), context)
+
+    ast_cache = ASTCache(cache_directory) if caching else None
+    node = ast_cache.load(filename, text) if ast_cache else None
+
+    if node is None:
+        lexer = Lexer(filename, text, debug)
+        tokens, error = lexer.make_tokens()
+        if error:
+            return None, error
+
+        # Generate Abstract Syntax Tree
+
+        parser = Parser(tokens)
+        ast = parser.parse()
+        if ast.error:
+            return None, ast.error
+        node = ast.node
+
+        if ast_cache:
+            ast_cache.store(filename, text, node)
+
+    # The parse cache keeps the tree as parsed, the optimizer rewrites it in place
+    if optimize:
+        node = Optimizer().optimize_program(node)
+    # Pure functions remember their results, a memo size of 0 leaves every function as it is
+    if memo_size:
+        node = PurityAnalyzer(memo_size).analyze_program(node)
+    # Only the interpreter keeps function variables in resolved frames
+    if resolve and engine == 'interpreter':
+        node = Resolver().resolve_program(node)
+    # Hot loops are compiled from the interpreter, after the resolver so they write the same slots
+    if specialize and engine == 'interpreter':
+        node = LoopSpecializer().specialize_program(node)
+
+    if engine == 'python':
+        compiled = Transpiler().compile(node)
+        if compiled:
+            code, spans = compiled
+            if code_cache:
+                code_cache.store(filename, text, code, spans)
+            return run_code(code, spans, node.source, context)
+        engine = 'closures'
+
+    if engine == 'closures':
+        return ClosureCompiler().run(node, context)
+    if engine == 'vm':
+        return VirtualMachine().run(node, context)
 
-    return result.value, result.error
+    return Interpreter().run(node, context)
@@ -1,4 +1,6 @@
 class RuntimeResult:
+    __slots__ = ('value', 'error', 'function_return_value', 'loop_should_continue', 'loop_should_break')
+
     def __init__(self):
         self.value = None
         self.error = None
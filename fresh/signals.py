@@ -0,0 +1,41 @@
+from fresh.errors import RuntimeFailure
+
+# Raised to unwind the Python stack when a Fresh return, break or continue runs
+
+
+class ReturnSignal(Exception):
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+
+class BreakSignal(Exception):
+    pass
+
+
+class ContinueSignal(Exception):
+    pass
+
+
+# Not raised but returned: a function whose last act is calling another hands the call back to Function.call to make,
+# so a chain of tail calls takes no Python stack
+class TailCall:
+    __slots__ = ('function', 'arguments', 'pos_start')
+
+    def __init__(self, function, arguments, pos_start):
+        self.function = function
+        self.arguments = arguments
+        self.pos_start = pos_start
+
+
+def unwrap(response):
+    # Turns the RuntimeResult of a value that was not compiled here back into a value or a signal
+    if response.error:
+        raise RuntimeFailure(response.error)
+    if response.function_return_value:
+        raise ReturnSignal(response.function_return_value)
+    if response.loop_should_continue:
+        raise ContinueSignal
+    if response.loop_should_break:
+        raise BreakSignal
+    return response.value
@@ -1,20 +1,182 @@
+from itertools import count
+
 from fresh.errors import RTError
+from fresh.memo import PURE_BUILTINS
+
+# Version of every name that tables below the global one have bound. A lookup that found a name in the global table is
+# remembered with the name's version, and while the version stands no table between a caller and the global one can hold it.
+shadow_versions = {}
+# Version of the names a called function keeps in slots, those are set without going through a table so they are never remembered
+LOCAL_NAME = -1
+# Versions are never given out twice, so one remembered before a reset cannot match one given out after it
+versions = count(1)
+
+
+# Names a remembered result may depend on, the pure builtins and the memoized functions, which call themselves by name
+memo_names = set(PURE_BUILTINS)
+
+
+# Remembered results only hold while the names they depend on are bound as they were when the result was stored. The
+# global table outlives a run, so binding one of them there again moves the version and memos of an older one are
+# dropped. A table below the global one that binds one hides the global binding from whatever it calls, so memos are
+# not used again until the next run.
+class MemoVersion:
+    current = 0
+    shadowed = False
+
+
+def watch(name):
+    memo_names.add(name)
+    if name in shadow_versions:
+        MemoVersion.shadowed = True
+
+
+def shadow(name):
+    if shadow_versions.get(name) != LOCAL_NAME:
+        shadow_versions[name] = next(versions)
+    if name in memo_names:
+        MemoVersion.shadowed = True
+
+
+def pin_local(name):
+    shadow_versions[name] = LOCAL_NAME
+    if name in memo_names:
+        MemoVersion.shadowed = True
+
+
+# Counts the resets, a function pins the names of its slots on its first call after each one
+class PinGeneration:
+    current = 0
+
+
+# Each run starts with no name shadowed or pinned, so versions and pins do not pile up from one program to the next.
+# Nothing runs in between, so no table but the global one holds a name.
+def reset_shadow_versions():
+    shadow_versions.clear()
+    PinGeneration.current += 1
+    MemoVersion.shadowed = False
+
+
+# How often lookups were answered by a remembered global binding and how often they walked the tables
+class LookupCacheStats:
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def hit_rate(cls):
+        lookups = cls.hits + cls.misses
+        return cls.hits / lookups if lookups else 0.0
 
 
 class SymbolTable:
+    # Plain tables have no resolved slots, see Frame
+    __slots__ = ('symbols', 'parent')
+
+    slots = None
+
     def __init__(self, parent=None):
         self.symbols = {}
         self.parent = parent
 
     def get(self, name):
-        value = self.symbols.get(name, None)
-        if value is None and self.parent:
-            value = self.parent.get(name)
+        # Walks the chain in a loop, deep call stacks would otherwise run out of Python stack here
+        table = self
+        while table:
+            if table.slots is None:
+                value = table.symbols.get(name, None)
+            else:
+                index = table.slots.get(name)
+                if index is not None:
+                    value = table.values[index]
+                else:
+                    value = table.symbols.get(name, None) if table.symbols else None
+            if value is not None:
+                return value
+            table = table.parent
+        return None
 
-        return value
+    # Like get, also giving the table the value was found in
+    def lookup(self, name):
+        table = self
+        while table:
+            if table.slots is None:
+                value = table.symbols.get(name, None)
+            else:
+                index = table.slots.get(name)
+                if index is not None:
+                    value = table.values[index]
+                else:
+                    value = table.symbols.get(name, None) if table.symbols else None
+            if value is not None:
+                return value, table
+            table = table.parent
+        return None, None
 
     def set(self, name, value):
-        self.symbols[name] = value
+        symbols = self.symbols
+        if self.parent is not None:
+            if name not in symbols:
+                shadow(name)
+        elif name in memo_names and name in symbols:
+            MemoVersion.current += 1
+        symbols[name] = value
 
     def remove(self, name):
+        if self.parent is not None:
+            shadow(name)
+        elif name in memo_names:
+            MemoVersion.current += 1
         del self.symbols[name]
+
+    def clear(self):
+        self.symbols.clear()
+
+    def bindings(self):
+        return list(self.symbols.items())
+
+
+# The table of a function call whose variables the resolver numbered, they live in a list instead of a dict
+class Frame:
+    __slots__ = ('slots', 'values', 'symbols', 'parent')
+
+    def __init__(self, slots, parent=None):
+        self.slots = slots
+        self.values = [None] * len(slots)
+        # Only names the resolver never saw end up here, so it is made on first use
+        self.symbols = None
+        self.parent = parent
+
+    # Calls nest frames and plain tables in any order, the walk handles both
+    get = SymbolTable.get
+    lookup = SymbolTable.lookup
+
+    # A frame is never the global table, so a name it gains shadows the global binding
+    def set(self, name, value):
+        index = self.slots.get(name)
+        if index is not None:
+            self.values[index] = value
+        elif self.symbols is None:
+            shadow(name)
+            self.symbols = {name: value}
+        else:
+            if name not in self.symbols:
+                shadow(name)
+            self.symbols[name] = value
+
+    def remove(self, name):
+        index = self.slots.get(name)
+        if index is not None:
+            self.values[index] = None
+        else:
+            shadow(name)
+            del self.symbols[name]
+
+    def clear(self):
+        self.values = [None] * len(self.slots)
+        self.symbols = None
+
+    def bindings(self):
+        bindings = [(name, self.values[index]) for name, index in self.slots.items() if self.values[index] is not None]
+        if self.symbols:
+            bindings.extend(self.symbols.items())
+        return bindings
@@ -1,3 +1,5 @@
+from fresh.position import Position
+
 TT_INT = 'INT'
 TT_FLOAT = 'FLOAT'
 TT_PLUS = 'PLUS'
@@ -70,17 +72,22 @@ ERROR_KEYWORDS = [
 
 
 class Token:
-    def __init__(self, type_, value=None, pos_start=None, pos_end=None):
+    __slots__ = ('type', 'value', 'start', 'end', 'source')
+
+    def __init__(self, type_, value=None, start=0, end=None, source=None):
         self.type = type_
         self.value = value
+        self.start = start
+        self.end = start + 1 if end is None else end
+        self.source = source
 
-        if pos_start:
-            self.pos_start = pos_start.copy()
-            self.pos_end = pos_start.copy()
-            self.pos_end.advance()
+    @property
+    def pos_start(self):
+        return Position(self.start, self.source)
 
-        if pos_end:
-            self.pos_end = pos_end.copy()
+    @property
+    def pos_end(self):
+        return Position(self.end, self.source, True)
 
     def __repr__(self):
         if self.value or self.value == 0:
@@ -0,0 +1,60 @@
+from array import array
+
+from fresh.tokens import *
+
+TOKEN_TYPES = [
+    TT_INT, TT_FLOAT, TT_PLUS, TT_MINUS, TT_MUL, TT_DIV, TT_POW, TT_LPAREN, TT_RPAREN, TT_KEYWORD, TT_IDENTIFIER,
+    TT_EQUALS, TT_DOUBLEEQUALS, TT_NOTEQUALS, TT_LESS, TT_LESSEQUALS, TT_GREATER, TT_GREATEREQUALS, TT_COMMA,
+    TT_ARROW, TT_STRING, TT_LSQUAREBRACKET, TT_RSQUAREBRACKET, TT_QUESTIONMARK, TT_NEWLINE, TT_EOF
+]
+TOKEN_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+
+
+# Tokens are stored column-wise, a Token object is only built when something holds on to one
+class TokenStream:
+    def __init__(self, source):
+        self.source = source
+        self.types = array('b')
+        self.value_ids = array('i')
+        self.starts = array('i')
+        self.ends = array('i')
+        # Value id 0 is reserved for tokens without a value
+        self.values = [None]
+        self.value_lookup = {}
+
+    def append(self, type_code, value, start, end):
+        self.types.append(type_code)
+        self.value_ids.append(self.intern(value) if value is not None else 0)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def intern(self, value):
+        # Floats get their own keys so 1 and 1.0 never share an id
+        key = (TT_FLOAT, value) if type(value) is float else value
+        value_id = self.value_lookup.get(key)
+        if value_id is None:
+            value_id = self.value_lookup[key] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+    def type(self, index):
+        return TOKEN_TYPES[self.types[index]]
+
+    def value(self, index):
+        return self.values[self.value_ids[index]]
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, index):
+        return Token(
+            TOKEN_TYPES[self.types[index]], self.values[self.value_ids[index]],
+            self.starts[index], self.ends[index], self.source
+        )
+
+    def __iter__(self):
+        for index in range(len(self.types)):
+            yield self[index]
+
+    def __repr__(self):
+        return f'[{", ".join(repr(token) for token in self)}]'
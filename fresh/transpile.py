@@ -0,0 +1,462 @@
+import hashlib
+from importlib.util import MAGIC_NUMBER
+
+from fresh.astcache import ASTCache, fresh_version
+from fresh.errors import RTError, RuntimeFailure
+from fresh.nodes import VariableAssignNode, IfNode, CallNode, origin_node
+from fresh.operations import lookup_binary_method_name
+from fresh.position import Position
+from fresh.signals import BreakSignal, ContinueSignal, TailCall, unwrap
+from fresh.tokens import *
+from fresh.values import Number, Int, Float, Function, String, List
+
+# Bump whenever the generated code changes, older cached code objects are then ignored
+TRANSPILE_FORMAT = 7
+CODE_CACHE_SUFFIX = '.frpy'
+
+
+class TranspiledFunction(Function):
+    __slots__ = ('body',)
+
+    def __init__(self, name, body_node, arguments, should_auto_return, body, memo_size=0):
+        super().__init__(name, body_node, arguments, should_auto_return, memo_size=memo_size)
+        self.body = body
+
+    # Function.call makes the calls, including the tail calls the body hands back
+    def run(self, execute_context):
+        return self.body(execute_context)
+
+
+# Helpers the generated code calls for everything that is not worth spelling out inline
+
+
+def fail(error):
+    raise RuntimeFailure(error)
+
+
+def call(value_to_call, arguments, context, pos_start, pos_end, function_pos_start, function_pos_end):
+    try:
+        if type(value_to_call) is TranspiledFunction:
+            return value_to_call.call(arguments, context, pos_start)
+        response = value_to_call.execute(arguments, context, pos_start, pos_end)
+    except RecursionError:
+        # Reported at the call of the function that went too deep, like in the interpreter
+        if type(value_to_call) is not TranspiledFunction and context.parent is not None:
+            raise
+        raise RuntimeFailure(RTError(function_pos_start, function_pos_end, 'Max recursion depth exceeded', context))
+    return unwrap(response)
+
+
+def tail_call(value_to_call, arguments, context, pos_start, pos_end, function_pos_start, function_pos_end):
+    if type(value_to_call) is TranspiledFunction:
+        return TailCall(value_to_call, arguments, pos_start)
+    return call(value_to_call, arguments, context, pos_start, pos_end, function_pos_start, function_pos_end)
+
+
+def make_function(name, arguments, should_auto_return, body, memo_size, context):
+    function_value = TranspiledFunction(name, None, list(arguments), should_auto_return, body, memo_size)
+    if name:
+        context.symbol_table.set(name, function_value)
+    return function_value
+
+
+RUNTIME = {
+    'Number': Number,
+    'Int': Int,
+    'Float': Float,
+    'String': String,
+    'List': List,
+    'RTError': RTError,
+    'BreakSignal': BreakSignal,
+    'ContinueSignal': ContinueSignal,
+    'fail': fail,
+    'call': call,
+    'tail_call': tail_call,
+    'make_function': make_function,
+}
+
+
+class Writer:
+    def __init__(self, name, in_loop):
+        self.name = name
+        self.lines = []
+        self.indentation = 1
+        self.temporaries = 0
+        # Whether a Python break or continue emitted here reaches the Fresh loop it belongs to
+        self.in_loop = in_loop
+        # Fresh loops around the code being written, conditions included, a call inside one is never a tail call
+        self.loop_depth = 0
+
+    def line(self, text):
+        self.lines.append('    ' * self.indentation + text)
+
+    def temporary(self):
+        self.temporaries += 1
+        return f't{self.temporaries}'
+
+
+# Generates one Python module per program: a function for the top level and one for every Fresh function
+class Transpiler:
+    def __init__(self):
+        self.functions = []
+        self.spans = []
+        self.span_indexes = {}
+        # Literals become module level values, they are immutable so every run of the expression shares one
+        self.constants = []
+        self.constant_indexes = {}
+        self.writer = None
+
+    def transpile(self, node):
+        self.writer = Writer('program', False)
+        result = self.expression(node)
+        self.writer.line(f'return {result}')
+        self.functions.append(self.writer)
+
+        source = list(self.constants)
+        for writer in self.functions:
+            source.append(f'def {writer.name}(context):')
+            source.extend(writer.lines)
+            source.append('')
+        return '\n'.join(source), self.spans
+
+    def compile(self, node):
+        try:
+            source, spans = self.transpile(node)
+            return compile(source, f'<fresh {node.source.filename}>', 'exec'), spans
+        except (SyntaxError, RecursionError):
+            # CPython limits how deeply blocks and expressions may nest, such programs need another engine
+            return None
+
+    def span(self, node):
+        span = (node.start, node.end)
+        index = self.span_indexes.get(span)
+        if index is None:
+            index = self.span_indexes[span] = len(self.spans)
+            self.spans.append(span)
+        return f'S[{index}]', f'E[{index}]'
+
+    def constant(self, value_type, value):
+        # Keyed by type as well so 1 and 1.0 stay apart
+        key = (value_type.__name__, type(value), value)
+        index = self.constant_indexes.get(key)
+        if index is None:
+            index = self.constant_indexes[key] = len(self.constants)
+            self.constants.append(f'K{index} = {value_type.__name__}({value!r})')
+        return f'K{index}'
+
+    def checked(self, operation, pos_start, pos_end, other_pos_end):
+        self.writer.line(operation)
+        self.writer.line('if error:')
+        self.writer.line(f'    fail(error.at({pos_start}, {pos_end}, {other_pos_end}, context))')
+
+    def expression(self, node):
+        method_name = f'transpile_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_transpile_method)
+        return method(node)
+
+    # Like Interpreter.visit_tail, the code hands a call to another Fresh function back instead of making it
+    def tail_expression(self, node):
+        node_type = type(node)
+        if node_type is CallNode:
+            return self.transpile_CallNode(node, True)
+        if node_type is IfNode:
+            return self.transpile_IfNode(node, True)
+        return self.expression(node)
+
+    def no_transpile_method(self, node):
+        raise Exception(f'No transpile_{type(node).__name__} method defined')
+
+    def transpile_NumberNode(self, node):
+        return self.constant(Int if type(node.token.value) is int else Float, node.token.value)
+
+    def transpile_StringNode(self, node):
+        return self.constant(String, node.token.value)
+
+    def transpile_VariableAccessNode(self, node):
+        write = self.writer.line
+        variable_name = node.variable_name_token.value
+        pos_start, pos_end = self.span(node)
+        result = self.writer.temporary()
+        write(f'{result} = context.symbol_table.get({variable_name!r})')
+        write(f'if not {result}:')
+        write(f"    fail(RTError({pos_start}, {pos_end}, {variable_name + ' is not defined.'!r}, context))")
+        return result
+
+    def transpile_VariableAssignNode(self, node):
+        return self.assign(node, self.expression(node.value_node))
+
+    def assign(self, node, value):
+        write = self.writer.line
+        # The value may be a shared literal, so the copy goes to a temporary of its own
+        result = self.writer.temporary()
+        write(f'{result} = {value}')
+        write(f'if isinstance({result}, List):')
+        write(f'    {result} = {result}.copy_as_true_new()')
+        write(f'context.symbol_table.set({node.token.value!r}, {result})')
+        return result
+
+    def transpile_BinOpNode(self, node):
+        if node.traces_branches:
+            left, pos_start, pos_end = self.operand(node.left_node)
+            right, _, other_pos_end = self.operand(node.right_node)
+        else:
+            left = self.expression(node.left_node)
+            right = self.expression(node.right_node)
+            pos_start, pos_end = self.span(origin_node(node.left_node))
+            other_pos_end = self.span(origin_node(node.right_node))[1]
+        result = self.writer.temporary()
+        self.checked(f'{result}, error = {left}.{lookup_binary_method_name(node.operator_token)}({right})', pos_start, pos_end, other_pos_end)
+        return result
+
+    def transpile_UnaryOpNode(self, node):
+        if node.traces_branches:
+            operand, pos_start, pos_end = self.operand(node.node)
+        else:
+            operand = self.expression(node.node)
+            pos_start, pos_end = self.span(origin_node(node.node))
+        # A plus leaves the value as it is
+        if node.operator_token.type == TT_MINUS:
+            result = self.writer.temporary()
+            self.checked(f'{result}, error = {operand}.multiplied_by(Number.of(-1))', pos_start, pos_end, pos_end)
+            return result
+        if node.operator_token.matches(TT_KEYWORD, 'not'):
+            result = self.writer.temporary()
+            self.checked(f'{result}, error = {operand}.notted()', pos_start, pos_end, pos_end)
+            return result
+        return operand
+
+    # Like Interpreter.visit_operand, returns the value along with the span an error about it points at.
+    # After an if that span is only known at runtime, so it is kept in temporaries the branches set.
+    def operand(self, node):
+        node_type = type(node)
+        if node_type is IfNode:
+            origin = self.writer.temporary(), self.writer.temporary()
+            return (self.transpile_IfNode(node, origin=origin),) + origin
+        if node_type is VariableAssignNode:
+            value, pos_start, pos_end = self.operand(node.value_node)
+            return self.assign(node, value), pos_start, pos_end
+        return (self.expression(node),) + self.span(node)
+
+    def transpile_IfNode(self, node, tail=False, origin=None):
+        writer = self.writer
+        result = writer.temporary()
+        indentation = writer.indentation
+
+        for condition, expression, should_return_null in node.cases:
+            condition_value = self.expression(condition)
+            writer.line(f'if {condition_value}.is_true():')
+            writer.indentation += 1
+            self.branch(node, result, expression, should_return_null, tail, origin)
+            writer.indentation -= 1
+            writer.line('else:')
+            writer.indentation += 1
+
+        if node.else_case:
+            expression, should_return_null = node.else_case
+            self.branch(node, result, expression, should_return_null, tail, origin)
+        else:
+            writer.line(f'{result} = Number.null')
+            if origin:
+                self.set_origin(origin, self.span(node))
+
+        writer.indentation = indentation
+        return result
+
+    def branch(self, node, result, expression, should_return_null, tail, origin):
+        if origin and not should_return_null:
+            value, pos_start, pos_end = self.operand(expression)
+            self.writer.line(f'{result} = {value}')
+            self.set_origin(origin, (pos_start, pos_end))
+            return
+
+        value = self.tail_expression(expression) if tail and not should_return_null else self.expression(expression)
+        self.writer.line(f'{result} = Number.null' if should_return_null else f'{result} = {value}')
+        if origin:
+            self.set_origin(origin, self.span(node))
+
+    def set_origin(self, origin, span):
+        self.writer.line(f'{origin[0]}, {origin[1]} = {span[0]}, {span[1]}')
+
+    def transpile_ForNode(self, node):
+        writer = self.writer
+        write = writer.line
+        writer.loop_depth += 1
+        start_value = self.expression(node.start_value_node)
+        end_value = self.expression(node.end_value_node)
+        step_value = self.expression(node.step_value_node) if node.step_value_node else None
+        elements, i, end, step, ascending, value = (writer.temporary() for _ in range(6))
+
+        write(f'{elements} = []')
+        # Operands are unwrapped in the same order as the tree-walker so bad ones fail the same way
+        write(f'{i} = {start_value}.value')
+        write(f'{step} = {step_value}.value' if step_value else f'{step} = 1')
+        write(f'{ascending} = {step} >= 0')
+        write(f'{end} = {end_value}.value')
+        write(f'while ({i} < {end}) if {ascending} else ({i} > {end}):')
+        writer.indentation += 1
+        write(f'context.symbol_table.set({node.variable_name_token.value!r}, Number.of({i}))')
+        write(f'{i} += {step}')
+        body = self.loop_body(node.body_node)
+        write(f'{elements}.append({body})')
+        writer.indentation -= 1
+
+        if node.should_return_null:
+            write(f'{value} = Number.null')
+        else:
+            write(f'{value} = List({elements})')
+        writer.loop_depth -= 1
+        return value
+
+    def transpile_WhileNode(self, node):
+        writer = self.writer
+        write = writer.line
+        value = writer.temporary()
+        writer.loop_depth += 1
+
+        write('while True:')
+        writer.indentation += 1
+        # A break in the condition belongs to an outer loop, but a Python break here would end this one
+        in_loop, writer.in_loop = writer.in_loop, False
+        condition = self.expression(node.condition_node)
+        writer.in_loop = in_loop
+        write(f'if not {condition}.is_true():')
+        write('    break')
+        self.loop_body(node.body_node)
+        writer.indentation -= 1
+
+        # The tree-walker never collects the body values of a while loop either
+        if node.should_return_null:
+            write(f'{value} = Number.null')
+        else:
+            write(f'{value} = List([])')
+        writer.loop_depth -= 1
+        return value
+
+    def loop_body(self, body_node):
+        writer = self.writer
+        write = writer.line
+        in_loop, writer.in_loop = writer.in_loop, True
+
+        # break and continue can also come out of functions called in the body
+        write('try:')
+        writer.indentation += 1
+        body = self.expression(body_node)
+        writer.indentation -= 1
+        write('except BreakSignal:')
+        write('    break')
+        write('except ContinueSignal:')
+        write('    continue')
+
+        writer.in_loop = in_loop
+        return body
+
+    def transpile_FunctionDefinitionNode(self, node):
+        function_name = node.variable_name_token.value if node.variable_name_token else None
+        arguments = tuple(argument.value for argument in node.argument_name_tokens)
+
+        outer_writer = self.writer
+        self.writer = Writer(f'function_{len(self.functions)}_{function_name or "anonymous"}', False)
+        if node.should_auto_return:
+            self.writer.line(f'return {self.tail_expression(node.body_node)}')
+        else:
+            self.expression(node.body_node)
+            self.writer.line('return Number.null')
+        self.functions.append(self.writer)
+        body_function = self.writer.name
+        self.writer = outer_writer
+
+        result = self.writer.temporary()
+        self.writer.line(f'{result} = make_function({function_name!r}, {arguments!r}, {node.should_auto_return!r}, {body_function}, {node.memo_size!r}, context)')
+        return result
+
+    def transpile_CallNode(self, node, tail=False):
+        write = self.writer.line
+        value_to_call = self.expression(node.function_node)
+        arguments = [self.expression(argument_node) for argument_node in node.argument_nodes]
+        pos_start, pos_end = self.span(node)
+
+        # The callee position is only needed to report Max recursion depth exceeded
+        function_pos_start, function_pos_end = self.span(origin_node(node.function_node))
+        result = self.writer.temporary()
+        helper = 'tail_call' if tail else 'call'
+        write(f'{result} = {helper}({value_to_call}, [{", ".join(arguments)}], context, {pos_start}, {pos_end}, {function_pos_start}, {function_pos_end})')
+        return result
+
+    def transpile_ListNode(self, node):
+        elements = [self.expression(element_node) for element_node in node.element_nodes]
+        result = self.writer.temporary()
+        self.writer.line(f'{result} = List([{", ".join(elements)}])')
+        return result
+
+    def transpile_ReturnNode(self, node):
+        # A return at the top level of the program ends it without a value, like in the interpreter
+        in_function = self.writer.name != 'program'
+        if not node.node_to_return:
+            value = 'Number.null'
+        elif in_function and not self.writer.loop_depth:
+            value = self.tail_expression(node.node_to_return)
+        else:
+            value = self.expression(node.node_to_return)
+        self.writer.line(f'return {value}' if in_function else 'return None')
+        return 'Number.null'
+
+    def transpile_ContinueNode(self, node):
+        self.writer.line('continue' if self.writer.in_loop else 'raise ContinueSignal')
+        return 'Number.null'
+
+    def transpile_BreakNode(self, node):
+        self.writer.line('break' if self.writer.in_loop else 'raise BreakSignal')
+        return 'Number.null'
+
+
+# Generated code refers to positions by span index, they are only built once something uses them
+class PositionTable(dict):
+    def __init__(self, spans, source, is_end):
+        super().__init__()
+        self.offsets = [span[is_end] for span in spans]
+        self.source = source
+        self.is_end = is_end
+
+    def __missing__(self, index):
+        position = self[index] = Position(self.offsets[index], self.source, self.is_end)
+        return position
+
+
+def run_code(code, spans, source, context):
+    namespace = dict(RUNTIME)
+    namespace['S'] = PositionTable(spans, source, False)
+    namespace['E'] = PositionTable(spans, source, True)
+    exec(code, namespace)
+
+    try:
+        return namespace['program'](context), None
+    except RuntimeFailure as failure:
+        return None, failure.error
+    except (BreakSignal, ContinueSignal):
+        return None, None
+
+
+# Stores the compiled module next to the parse cache, so a cached program starts without lexing or parsing
+class CodeCache(ASTCache):
+    suffix = CODE_CACHE_SUFFIX
+
+    def __init__(self, directory, memo_size):
+        super().__init__(directory)
+        self.memo_size = memo_size
+
+    def source_key(self, text):
+        # Code objects only load on the Python version that wrote them, and the memo size is part of the code
+        return TRANSPILE_FORMAT, fresh_version(), MAGIC_NUMBER, self.memo_size, hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def load(self, filename, text):
+        try:
+            payload = self.read(filename, text)
+            if payload is None:
+                return None
+            code, spans = payload
+            return code, spans
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+    def store(self, filename, text, code, spans):
+        self.write(filename, text, code, spans)
@@ -1,34 +1,33 @@
+from array import array
 import os
 import random
 import time
 
 from fresh.context import Context
-from fresh.errors import RTError as RTError
+from fresh.errors import RTError as RTError, RuntimeFailure, OperationError
+from fresh.memo import Memo, DEFAULT_MEMO_SIZE
 from fresh.runtimeresult import RuntimeResult
-from fresh.symboltable import SymbolTable
-
-
+from fresh.signals import ReturnSignal, BreakSignal, ContinueSignal, TailCall
+from fresh.symboltable import SymbolTable, Frame, PinGeneration, MemoVersion, pin_local, watch
+
+# Ints in this range are only built once, Number.of hands out the shared value from then on.
+# Every cached value stays alive and is walked by the garbage collector, so the range stays small.
+SMALL_INT_MIN = -256
+SMALL_INT_MAX = 1024
+# Contexts a function keeps from finished calls, enough for the depth most recursion runs at
+MAX_FREE_CONTEXTS = 64
+# Concatenations up to this many characters are joined right away, a list of pieces costs more than copying them
+SHORT_STRING_MAX = 256
+
+
+# Values are immutable and know nothing of where they came from, so they are shared instead of copied.
+# Operations that fail return an OperationError that the engine places at the operands it evaluated.
+# Values are the objects a program makes the most of, so they and the rest of the runtime classes keep their attributes in __slots__.
 class Value:
-    def __init__(self):
-        self.set_pos()
-        self.set_context()
-
-    def set_pos(self, pos_start=None, pos_end=None):
-        self.pos_start = pos_start
-        self.pos_end = pos_end
-        return self
-
-    def set_context(self, context=None):
-        self.context = context
-        return self
+    __slots__ = ()
 
     def illegal_operation(self, other=None):
-        if not other: other = self
-        return RTError(
-            self.pos_start, other.pos_end,
-            'Illegal operation',
-            self.context
-        )
+        return OperationError('Illegal operation')
 
     def added_to(self, other):
         return None, self.illegal_operation(other)
@@ -79,205 +78,379 @@ class Value:
         return None, self.illegal_operation(other)
 
 
+# Ints and floats are the Int and Float subclasses, which handle each other without checks. A plain Number only
+# holds what Python arithmetic can give beyond those, like the complex result of a negative number to a fractional power.
 class Number(Value):
+    __slots__ = ('value',)
+
     null = None
     true = True
     false = False
+    small_ints = {}
 
     def __init__(self, value):
-        super().__init__()
         self.value = value
 
+    @staticmethod
+    def of(value):
+        # Values are immutable so one Number per small int is enough, floats and big ints are built every time.
+        # Arithmetic builds its results directly, sums and products leave the range too often for the lookup to pay off.
+        value_type = type(value)
+        if value_type is int:
+            if SMALL_INT_MIN <= value <= SMALL_INT_MAX:
+                number = Number.small_ints.get(value)
+                if number is None:
+                    number = Number.small_ints[value] = Int(value)
+                return number
+            return Int(value)
+        if value_type is float:
+            return Float(value)
+        return Number(value)
+
     def added_to(self, other):
         if isinstance(other, Number):
-            return Number(self.value + other.value).set_context(self.context), None
+            return Number.of(self.value + other.value), None
         else:
             return None, self.illegal_operation(other)
 
     def subtracted_by(self, other):
         if isinstance(other, Number):
-            return Number(self.value - other.value).set_context(self.context), None
+            return Number.of(self.value - other.value), None
         else:
             return None, self.illegal_operation(other)
 
     def multiplied_by(self, other):
         if isinstance(other, Number):
-            return Number(self.value * other.value).set_context(self.context), None
+            return Number.of(self.value * other.value), None
         else:
             return None, self.illegal_operation(other)
 
     def divided_by(self, other):
         if isinstance(other, Number):
             if other.value == 0:
-                return None, RTError(
-                    self.pos_start, self.pos_end,
-                    'Division by zero',
-                    self.context
-                )
-            return Number(self.value / other.value).set_context(self.context), None
+                return None, OperationError('Division by zero', False)
+            return Number.of(self.value / other.value), None
         else:
             return None, self.illegal_operation(other)
 
     def powered_by(self, other):
         if isinstance(other, Number):
-            return Number(self.value ** other.value).set_context(self.context), None
+            return Number.of(self.value ** other.value), None
         else:
             return None, self.illegal_operation(other)
 
     def get_comparison_equals(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value == other.value)).set_context(self.context), None
+            return (Number.true if self.value == other.value else Number.false), None
         else:
             return Number.false, None
 
     def get_comparison_lessthan(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value < other.value)).set_context(self.context), None
+            return (Number.true if self.value < other.value else Number.false), None
         else:
             return None, self.illegal_operation(other)
 
     def get_comparison_greaterthan(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value > other.value)).set_context(self.context), None
+            return (Number.true if self.value > other.value else Number.false), None
         else:
             return None, self.illegal_operation(other)
 
     def get_comparison_notequals(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value != other.value)).set_context(self.context), None
+            return (Number.true if self.value != other.value else Number.false), None
         else:
             return Number.true, None
 
     def get_comparison_lessequals(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value <= other.value)).set_context(self.context), None
+            return (Number.true if self.value <= other.value else Number.false), None
         else:
             return None, self.illegal_operation(other)
 
     def get_comparison_greaterequals(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value >= other.value)).set_context(self.context), None
+            return (Number.true if self.value >= other.value else Number.false), None
         else:
             return None, self.illegal_operation(other)
 
     def anded_by(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value and other.value)).set_context(self.context), None
+            return Number.of(int(self.value and other.value)), None
         else:
             return None, self.illegal_operation(other)
 
     def ored_by(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value or other.value)).set_context(self.context), None
+            return Number.of(int(self.value or other.value)), None
         else:
             return None, self.illegal_operation(other)
 
     def notted(self):
-        return Number(int(not self.value)).set_context(self.context), None
+        return (Number.false if self.value else Number.true), None
 
     def is_true(self):
         return self.value != 0
 
-    def copy(self):
-        copy = Number(self.value)
-        copy.set_pos(self.pos_start, self.pos_end)
-        copy.set_context(self.context)
-        return copy
-
     def __repr__(self):
         return str(self.value)
 
 
-Number.null = Number(0)
-Number.false = Number(0)
-Number.true = Number(1)
+# An int with an int stays an int and anything with a float is a float, the result class follows from the operand classes.
+# Every other operand goes to the checks in Number.
+class Int(Number):
+    __slots__ = ()
+
+    def added_to(self, other):
+        other_type = type(other)
+        if other_type is Int:
+            return Int(self.value + other.value), None
+        if other_type is Float:
+            return Float(self.value + other.value), None
+        return Number.added_to(self, other)
+
+    def subtracted_by(self, other):
+        other_type = type(other)
+        if other_type is Int:
+            return Int(self.value - other.value), None
+        if other_type is Float:
+            return Float(self.value - other.value), None
+        return Number.subtracted_by(self, other)
+
+    def multiplied_by(self, other):
+        other_type = type(other)
+        if other_type is Int:
+            return Int(self.value * other.value), None
+        if other_type is Float:
+            return Float(self.value * other.value), None
+        return Number.multiplied_by(self, other)
+
+    def divided_by(self, other):
+        other_type = type(other)
+        if other_type is Int or other_type is Float:
+            if other.value == 0:
+                return None, OperationError('Division by zero', False)
+            return Float(self.value / other.value), None
+        return Number.divided_by(self, other)
+
+
+class Float(Number):
+    __slots__ = ()
+
+    def added_to(self, other):
+        other_type = type(other)
+        if other_type is Float or other_type is Int:
+            return Float(self.value + other.value), None
+        return Number.added_to(self, other)
+
+    def subtracted_by(self, other):
+        other_type = type(other)
+        if other_type is Float or other_type is Int:
+            return Float(self.value - other.value), None
+        return Number.subtracted_by(self, other)
+
+    def multiplied_by(self, other):
+        other_type = type(other)
+        if other_type is Float or other_type is Int:
+            return Float(self.value * other.value), None
+        return Number.multiplied_by(self, other)
+
+    def divided_by(self, other):
+        other_type = type(other)
+        if other_type is Float or other_type is Int:
+            if other.value == 0:
+                return None, OperationError('Division by zero', False)
+            return Float(self.value / other.value), None
+        return Number.divided_by(self, other)
+
+
+# Handlers for two operands whose classes the operator tables have already matched, so they check nothing.
+# An int with an int stays an int and anything with a float is a float, like in Int and Float.
+def int_added_to(left, right):
+    return Int(left.value + right.value), None
+
+
+def float_added_to(left, right):
+    return Float(left.value + right.value), None
+
+
+def int_subtracted_by(left, right):
+    return Int(left.value - right.value), None
+
+
+def float_subtracted_by(left, right):
+    return Float(left.value - right.value), None
+
+
+def int_multiplied_by(left, right):
+    return Int(left.value * right.value), None
+
+
+def float_multiplied_by(left, right):
+    return Float(left.value * right.value), None
+
+
+def number_divided_by(left, right):
+    if right.value == 0:
+        return None, OperationError('Division by zero', False)
+    return Float(left.value / right.value), None
+
+
+def number_equals(left, right):
+    return (Number.true if left.value == right.value else Number.false), None
+
+
+def number_notequals(left, right):
+    return (Number.true if left.value != right.value else Number.false), None
 
 
+def number_lessthan(left, right):
+    return (Number.true if left.value < right.value else Number.false), None
+
+
+def number_greaterthan(left, right):
+    return (Number.true if left.value > right.value else Number.false), None
+
+
+def number_lessequals(left, right):
+    return (Number.true if left.value <= right.value else Number.false), None
+
+
+def number_greaterequals(left, right):
+    return (Number.true if left.value >= right.value else Number.false), None
+
+
+# The handler for each operator method on each pair of Int and Float, see fresh.operations.OperatorTable
+NUMBER_OPERATIONS = {}
+for left_type in (Int, Float):
+    for right_type in (Int, Float):
+        ints = left_type is Int and right_type is Int
+        NUMBER_OPERATIONS.update({
+            ('added_to', left_type, right_type): int_added_to if ints else float_added_to,
+            ('subtracted_by', left_type, right_type): int_subtracted_by if ints else float_subtracted_by,
+            ('multiplied_by', left_type, right_type): int_multiplied_by if ints else float_multiplied_by,
+            ('divided_by', left_type, right_type): number_divided_by,
+            ('get_comparison_equals', left_type, right_type): number_equals,
+            ('get_comparison_notequals', left_type, right_type): number_notequals,
+            ('get_comparison_lessthan', left_type, right_type): number_lessthan,
+            ('get_comparison_greaterthan', left_type, right_type): number_greaterthan,
+            ('get_comparison_lessequals', left_type, right_type): number_lessequals,
+            ('get_comparison_greaterequals', left_type, right_type): number_greaterequals,
+        })
+del left_type, right_type, ints
+
+Number.null = Number.of(0)
+Number.false = Number.of(0)
+Number.true = Number.of(1)
+
+
+# + keeps the pieces of a string in a list and joins them the first time the text is read, so building a string is linear.
+# Like list stores, the strings over a pieces list only grow it past their own ends.
 class String(Value):
+    __slots__ = ('text', 'pieces', 'count')
+
     def __init__(self, value):
-        super().__init__()
-        self.value = value
+        self.text = value
+        self.pieces = None
+        self.count = 0
+
+    @property
+    def value(self):
+        if self.text is None:
+            self.text = ''.join(self.pieces[:self.count] if self.count != len(self.pieces) else self.pieces)
+            self.pieces = None
+        return self.text
 
     def added_to(self, other):
         if isinstance(other, String):
-            return String(self.value + other.value).set_context(self.context), None
+            other_text = other.value
+            pieces = self.pieces
+            if pieces is None:
+                text = self.text
+                if len(text) + len(other_text) <= SHORT_STRING_MAX:
+                    return String(text + other_text), None
+                pieces = [text]
+            elif self.count != len(pieces):
+                pieces = pieces[:self.count]
+            pieces.append(other_text)
+            new_string = String(None)
+            new_string.pieces = pieces
+            new_string.count = len(pieces)
+            return new_string, None
         else:
             return None, Value.illegal_operation(self, other)
 
     # Remove specific part of string
     def subtracted_by(self, other):
         if isinstance(other, String):
-            return String(str(self.value).replace(other.value, "")).set_context(self.context), None
+            return String(str(self.value).replace(other.value, "")), None
         else:
             return None, Value.illegal_operation(self, other)
 
     def multiplied_by(self, other):
         if isinstance(other, Number):
-            return String(self.value * other.value).set_context(self.context), None
+            return String(self.value * other.value), None
         else:
             return None, Value.illegal_operation(self, other)
 
     def get_comparison_equals(self, other):
         if isinstance(other, String):
-            return Number(int(self.value == other.value)).set_context(self.context), None
+            return (Number.true if self.value == other.value else Number.false), None
         else:
             return Number.false, None
 
     def get_comparison_notequals(self, other):
         if isinstance(other, String):
-            return Number(int(self.value != other.value)).set_context(self.context), None
+            return (Number.true if self.value != other.value else Number.false), None
         else:
             return Number.true, None
 
     def anded_by(self, other):
         if isinstance(other, String):
-            return Number(int(self.value and other.value)).set_context(self.context), None
+            return Number.of(int(self.value and other.value)), None
         else:
             return None, self.illegal_operation(other)
 
     def ored_by(self, other):
         if isinstance(other, String):
-            return Number(int(self.value or other.value)).set_context(self.context), None
+            return Number.of(int(self.value or other.value)), None
         else:
             return None, self.illegal_operation(other)
 
     def is_true(self):
         return len(self.value) > 0
 
-    def copy(self):
-        copy = String(self.value)
-        copy.set_pos(self.pos_start, self.pos_end)
-        copy.set_context(self.context)
-        return copy
-
     def __repr__(self):
         return f'{self.value}'
 
 
 class BaseFunction(Value):
+    __slots__ = ('name',)
+
+    # A function is the same value wherever it is called from, the caller's context and the span of the call are passed in
     def __init__(self, name):
-        super().__init__()
         self.name = name or "<anonymous>"
 
-    def generate_new_context(self):
-        new_context = Context(self.name, self.context, self.pos_start)
-        new_context.symbol_table = SymbolTable(new_context.parent.symbol_table)
+    def generate_new_context(self, context, pos_start):
+        new_context = Context(self.name, context, pos_start)
+        new_context.symbol_table = SymbolTable(context.symbol_table)
         return new_context
 
-    def check_args(self, arg_names, args):
+    def check_args(self, arg_names, args, context, pos_start, pos_end):
         response = RuntimeResult()
         args_len = len(args)
         if args_len > len(arg_names):
             return response.failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 f"{self.name} expected at most {len(arg_names)} arguments, got {args_len}",
-                self.context
+                context
             ))
         if args_len < len(arg_names):
             return response.failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 f"{self.name} expected at least {len(arg_names)} arguments, got {args_len}",
-                self.context
+                context
             ))
         return response.success(None)
 
@@ -287,9 +460,9 @@ class BaseFunction(Value):
             arg_value = args[i]
             context.symbol_table.set(arg_name, arg_value)
 
-    def check_and_populate_args(self, arg_names, args, execute_context):
+    def check_and_populate_args(self, arg_names, args, execute_context, pos_start, pos_end):
         response = RuntimeResult()
-        response.register(self.check_args(arg_names, args))
+        response.register(self.check_args(arg_names, args, execute_context.parent, pos_start, pos_end))
         if response.should_return():
             return response
         self.populate_args(arg_names, args, execute_context)
@@ -300,291 +473,438 @@ class BaseFunction(Value):
 
 
 class Function(BaseFunction):
-    def __init__(self, name, body_node, arguments, should_auto_return):
+    __slots__ = ('body_node', 'arguments', 'arity', 'should_auto_return', 'frame_slots', 'binds_slots', 'free_contexts', 'memo', 'pin_generation')
+
+    # Interpreter that runs every Function body. It keeps no state between calls, so fresh.interpreter sets a single one here
+    interpreter = None
+
+    def __init__(self, name, body_node, arguments, should_auto_return, frame_slots=None, memo_size=0):
         super().__init__(name)
         self.body_node = body_node
         self.arguments = arguments
+        self.arity = len(arguments)
         self.should_auto_return = should_auto_return
+        self.frame_slots = frame_slots
+        # The resolver gives the arguments the first slots in order, unless a name repeats and the last one has to win
+        self.binds_slots = frame_slots is not None and len(set(arguments)) == len(arguments)
+        # Contexts of calls that returned, each with its table cleared, for the next calls to take over
+        self.free_contexts = []
+        # Results by arguments, for functions the purity analysis or memoize marked
+        self.memo = None
+        if memo_size:
+            self.memoize(memo_size)
+        self.pin_generation = None
+
+    # The function calls itself by name, so its results depend on what that name is bound to as well
+    def memoize(self, memo_size):
+        self.memo = Memo(memo_size)
+        if self.name is not None:
+            watch(self.name)
+
+    # The memo and key a call's result is stored under, None when the call is not remembered
+    def memo_entry(self, args):
+        memo = self.memo
+        # With the wrong argument count the function reads its caller's variables instead, so that call is not remembered
+        if memo is None or len(args) != self.arity or MemoVersion.shadowed:
+            return None
+        key = memo.key(args)
+        if key is None:
+            return None
+        memo.refresh(MemoVersion.current)
+        return memo, key
+
+    # Slots are written straight into the frame, lookups of these names can never skip the frames in between
+    def pin_slots(self):
+        if self.frame_slots is not None:
+            for name in self.frame_slots:
+                pin_local(name)
+        self.pin_generation = PinGeneration.current
+
+    def generate_new_context(self, context, pos_start):
+        if self.pin_generation != PinGeneration.current:
+            self.pin_slots()
+        if self.free_contexts:
+            new_context = self.free_contexts.pop()
+            new_context.display_name = self.name
+            new_context.parent = context
+            new_context.parent_entry_position = pos_start
+            new_context.symbol_table.parent = context.symbol_table
+            return new_context
+        if self.frame_slots is None:
+            return super().generate_new_context(context, pos_start)
+        new_context = Context(self.name, context, pos_start)
+        new_context.symbol_table = Frame(self.frame_slots, context.symbol_table)
+        return new_context
 
-    def execute(self, args):
-        response = RuntimeResult()
-        from fresh.interpreter import Interpreter
-        interpreter = Interpreter()
-        execute_context = self.generate_new_context()
-
-        response.register(self.check_and_populate_args(self.arguments, args, execute_context))
-
-        value = response.register(interpreter.visit(self.body_node, execute_context))
-        if response.should_return() and response.function_return_value is None:
-            return response
+    # Only a call that returned gives its context back, one that failed is still needed for the traceback
+    def release_context(self, context):
+        if len(self.free_contexts) < MAX_FREE_CONTEXTS:
+            context.parent = None
+            context.tail_calls = None
+            context.symbol_table.clear()
+            self.free_contexts.append(context)
 
-        return_value = (value if self.should_auto_return else None) or response.function_return_value or Number.null
+    def populate_args(self, arg_names, args, context):
+        if self.binds_slots:
+            context.symbol_table.values[:len(args)] = args
+        else:
+            super().populate_args(arg_names, args, context)
+
+    # The function making a tail call never runs again and nothing else writes to its table, so the call takes over its context
+    # instead of nesting a new one. Its variables stay visible to the callee just as they would be through the parent link.
+    def generate_tail_context(self, context, pos_start):
+        if self.pin_generation != PinGeneration.current:
+            self.pin_slots()
+        context.add_tail_call(context.display_name, pos_start)
+        context.display_name = self.name
+        symbol_table = context.symbol_table
+        if symbol_table.slots is not self.frame_slots:
+            if self.frame_slots is None:
+                new_table = SymbolTable(symbol_table.parent)
+            else:
+                new_table = Frame(self.frame_slots, symbol_table.parent)
+            for name, value in symbol_table.bindings():
+                new_table.set(name, value)
+            context.symbol_table = new_table
+        return context
+
+    def call(self, args, context, pos_start):
+        memo_entry = self.memo_entry(args) if self.memo is not None else None
+        if memo_entry:
+            memo, key = memo_entry
+            value = memo.get(key)
+            if value is None:
+                value = self.call_through(args, context, pos_start)
+                memo.store(key, value)
+            return value
+        return self.call_through(args, context, pos_start)
+
+    # The caller compares its argument count with the arity, a mismatch leaves the arguments unset instead of failing
+    def call_through(self, args, context, pos_start):
+        function = self
+        execute_context = self.generate_new_context(context, pos_start)
+
+        while True:
+            if len(args) == function.arity:
+                if function.binds_slots:
+                    execute_context.symbol_table.values[:function.arity] = args
+                else:
+                    function.populate_args(function.arguments, args, execute_context)
+
+            value = function.run(execute_context)
+            if type(value) is not TailCall:
+                # Whichever function the chain ended in has a table of its own layout by now
+                function.release_context(execute_context)
+                return value
+
+            function, args = value.function, value.arguments
+            execute_context = function.generate_tail_context(execute_context, value.pos_start)
+
+    # Runs the body once, returning its value or the TailCall it ends with
+    def run(self, execute_context):
+        try:
+            if self.should_auto_return:
+                return self.interpreter.visit_tail(self.body_node, execute_context)
+            self.interpreter.visit(self.body_node, execute_context)
+        except ReturnSignal as signal:
+            return signal.value
 
-        return response.success(return_value)
+        return Number.null
 
-    def copy(self):
-        copy = Function(self.name, self.body_node, self.arguments, self.should_auto_return)
-        copy.set_context(self.context)
-        copy.set_pos(self.pos_start, self.pos_end)
-        return copy
+    def execute(self, args, context, pos_start, pos_end):
+        response = RuntimeResult()
+        try:
+            return response.success(self.call(args, context, pos_start))
+        except RuntimeFailure as failure:
+            return response.failure(failure.error)
+        except ContinueSignal:
+            return response.success_continue()
+        except BreakSignal:
+            return response.success_break()
 
 
 class BuiltInFunction(BaseFunction):
+    __slots__ = ()
+
     def __init__(self, name):
         super().__init__(name)
 
-    def execute(self, args):
+    def execute(self, args, context, pos_start, pos_end):
         response = RuntimeResult()
-        execute_context = self.generate_new_context()
+        execute_context = self.generate_new_context(context, pos_start)
 
         method_name = f"execute_{self.name}"
         method = getattr(self, method_name, self.no_visit_method)
-        response.register(self.check_and_populate_args(method.arg_names, args, execute_context))
+        response.register(self.check_and_populate_args(method.arg_names, args, execute_context, pos_start, pos_end))
         if response.should_return():
             return response
 
-        return_value = response.register(method(execute_context))
+        return_value = response.register(method(execute_context, pos_start, pos_end))
         if response.should_return():
             return response
         return response.success(return_value)
 
-    def copy(self):
-        copy = BuiltInFunction(self.name)
-        copy.set_context(self.context)
-        copy.set_pos(self.pos_start, self.pos_end)
-        return copy
-
-    def execute_log(self, execute_context):
+    def execute_log(self, execute_context, pos_start, pos_end):
         print(str(execute_context.symbol_table.get('value')))
         return RuntimeResult().success(Number.null)
 
     execute_log.arg_names = ["value"]
 
-    def execute_str_input(self, execute_context):
+    def execute_str_input(self, execute_context, pos_start, pos_end):
         text = input(execute_context.symbol_table.get('prompt'))
         return RuntimeResult().success(String(text))
 
     execute_str_input.arg_names = ["prompt"]
 
-    def execute_num_input(self, execute_context):
+    def execute_num_input(self, execute_context, pos_start, pos_end):
         text = input(execute_context.symbol_table.get('prompt'))
         try:
             number = int(text)
         except ValueError:
             return RuntimeResult().failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 "Expected number input",
-                self.context
+                execute_context.parent
             ))
-        return RuntimeResult().success(Number(number))
+        return RuntimeResult().success(Number.of(number))
 
     execute_num_input.arg_names = ["prompt"]
 
-    def execute_clear(self, execute_context):
+    def execute_clear(self, execute_context, pos_start, pos_end):
         os.system('cls' if os.name == 'nt' else 'clear')
         return RuntimeResult().success(Number.null)
 
     execute_clear.arg_names = []
 
-    def execute_is_number(self, execute_context):
+    def execute_is_number(self, execute_context, pos_start, pos_end):
         is_number = isinstance(execute_context.symbol_table.get('value'), Number)
         return RuntimeResult().success(Number.true if is_number else Number.false)
 
     execute_is_number.arg_names = ['value']
 
-    def execute_is_string(self, execute_context):
+    def execute_is_string(self, execute_context, pos_start, pos_end):
         is_number = isinstance(execute_context.symbol_table.get('value'), String)
         return RuntimeResult().success(Number.true if is_number else Number.false)
 
     execute_is_string.arg_names = ['value']
 
-    def execute_is_list(self, execute_context):
+    def execute_is_list(self, execute_context, pos_start, pos_end):
         is_number = isinstance(execute_context.symbol_table.get('value'), List)
         return RuntimeResult().success(Number.true if is_number else Number.false)
 
     execute_is_list.arg_names = ['value']
 
-    def execute_is_function(self, execute_context):
+    def execute_is_function(self, execute_context, pos_start, pos_end):
         is_number = isinstance(execute_context.symbol_table.get('value'), BaseFunction)
         return RuntimeResult().success(Number.true if is_number else Number.false)
 
     execute_is_function.arg_names = ['value']
 
-    def execute_append(self, execute_context):
+    def execute_append(self, execute_context, pos_start, pos_end):
         list_ = execute_context.symbol_table.get('list')
         value = execute_context.symbol_table.get('value')
 
         if not isinstance(list_, List):
             return RuntimeResult().failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 "First argument must be a list",
-                self.context
+                execute_context.parent
             ))
-        list_.elements.append(value)
+        list_.append(value)
         return RuntimeResult().success(list_)
 
     execute_append.arg_names = ['list', 'value']
 
-    def execute_pop(self, execute_context):
+    def execute_pop(self, execute_context, pos_start, pos_end):
         list_ = execute_context.symbol_table.get('list')
         index = execute_context.symbol_table.get('index')
 
         if not isinstance(list_, List):
             return RuntimeResult().failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 "First argument must be a list",
-                self.context
+                execute_context.parent
             ))
         if not isinstance(index, Number):
             return RuntimeResult().failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 "Second argument must be a number",
-                self.context
+                execute_context.parent
             ))
         try:
-            value = list_.elements.pop(index.value)
+            value = list_.pop(index.value)
         except IndexError:
             return RuntimeResult().failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 "Index out of bounds",
-                self.context
+                execute_context.parent
             ))
         return RuntimeResult().success(value)
 
     execute_pop.arg_names = ['list', 'index']
 
-    def execute_len(self, execute_context):
+    def execute_len(self, execute_context, pos_start, pos_end):
         list_ = execute_context.symbol_table.get('value')
 
         if isinstance(list_, String):
-            return RuntimeResult().success(Number(len(list_.value)))
+            return RuntimeResult().success(Number.of(len(list_.value)))
         elif isinstance(list_, List):
-            return RuntimeResult().success(Number(len(list_.elements)))
+            return RuntimeResult().success(Number.of(list_.length))
         else:
             return RuntimeResult().failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 "Argument must be type list or string",
-                self.context
+                execute_context.parent
             ))
 
     execute_len.arg_names = ['value']
 
-    def execute_extend(self, execute_context):
+    def execute_extend(self, execute_context, pos_start, pos_end):
         list1_ = execute_context.symbol_table.get('list1')
         list2_ = execute_context.symbol_table.get('list2')
 
         if not isinstance(list1_, List):
             return RuntimeResult().failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 "First argument must be a list",
-                self.context
+                execute_context.parent
             ))
         if not isinstance(list2_, List):
             return RuntimeResult().failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 "Second argument must be a list",
-                self.context
+                execute_context.parent
             ))
-        list1_.elements.extend(list2_.elements)
+        list1_.extend(list2_)
         return RuntimeResult().success(list1_)
 
     execute_extend.arg_names = ['list1', 'list2']
 
-    def execute_random_int(self, execute_context):
+    def execute_random_int(self, execute_context, pos_start, pos_end):
         min_ = execute_context.symbol_table.get('min')
         max_ = execute_context.symbol_table.get('max')
 
         if not isinstance(min_, Number):
             return RuntimeResult().failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 "First argument must be a number",
-                self.context
+                execute_context.parent
             ))
         if not isinstance(max_, Number):
             return RuntimeResult().failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 "Second argument must be a number",
-                self.context
+                execute_context.parent
             ))
-        return RuntimeResult().success(Number(random.randint(min_.value, max_.value)))
+        return RuntimeResult().success(Number.of(random.randint(min_.value, max_.value)))
 
     execute_random_int.arg_names = ['min', 'max']
 
-    def execute_str(self, execute_context):
+    def execute_str(self, execute_context, pos_start, pos_end):
         value = execute_context.symbol_table.get('value')
         if not isinstance(value, Number):
             return RuntimeResult().failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 "Argument must be a number",
-                self.context
+                execute_context.parent
             ))
         return RuntimeResult().success(String(str(value.value)))
 
     execute_str.arg_names = ['value']
 
-    def execute_int(self, execute_context):
+    def execute_int(self, execute_context, pos_start, pos_end):
         value = execute_context.symbol_table.get('value')
         if not isinstance(value, String):
             return RuntimeResult().failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 "Argument must be a string",
-                self.context
+                execute_context.parent
             ))
         try:
-            return RuntimeResult().success(Number(int(value.value)))
+            return RuntimeResult().success(Number.of(int(value.value)))
         except ValueError:
             return RuntimeResult().failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 "Could not convert string to int",
-                self.context
+                execute_context.parent
             ))
 
     execute_int.arg_names = ['value']
 
-    def execute_float(self, execute_context):
+    def execute_float(self, execute_context, pos_start, pos_end):
         value = execute_context.symbol_table.get('value')
         if not isinstance(value, String):
             return RuntimeResult().failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 "Argument must be a string",
-                self.context
+                execute_context.parent
             ))
         try:
-            return RuntimeResult().success(Number(float(value.value)))
+            return RuntimeResult().success(Float(float(value.value)))
         except ValueError:
             return RuntimeResult().failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 "Could not convert string to float",
-                self.context
+                execute_context.parent
             ))
 
     execute_float.arg_names = ['value']
 
-    def execute_is_digit(self, execute_context):
+    def execute_is_digit(self, execute_context, pos_start, pos_end):
         value = execute_context.symbol_table.get('value')
         if not isinstance(value, String):
             return RuntimeResult().failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 "Argument must be a string",
-                self.context
+                execute_context.parent
             ))
         return RuntimeResult().success(Number.true if value.value.isdigit() else Number.false)
 
     execute_is_digit.arg_names = ['value']
 
-    def execute_wait(self, execute_context):
+    def execute_wait(self, execute_context, pos_start, pos_end):
         time_ = execute_context.symbol_table.get('time')
         if not isinstance(time_, Number):
             return RuntimeResult().failure(RTError(
-                self.pos_start, self.pos_end,
+                pos_start, pos_end,
                 "Argument must be a number",
-                self.context
+                execute_context.parent
             ))
         time.sleep(time_.value)
         return RuntimeResult().success(Number.null)
 
     execute_wait.arg_names = ['time']
 
+    def execute_memoize(self, execute_context, pos_start, pos_end):
+        function = execute_context.symbol_table.get('function')
+        if not isinstance(function, Function):
+            return RuntimeResult().failure(RTError(
+                pos_start, pos_end,
+                "Argument must be a function",
+                execute_context.parent
+            ))
+        # The function is changed in place, so its recursive calls by name are remembered too
+        if function.memo is None:
+            function.memoize(DEFAULT_MEMO_SIZE)
+        return RuntimeResult().success(function)
+
+    execute_memoize.arg_names = ['function']
+
+    def execute_memo_stats(self, execute_context, pos_start, pos_end):
+        function = execute_context.symbol_table.get('function')
+        if not isinstance(function, Function):
+            return RuntimeResult().failure(RTError(
+                pos_start, pos_end,
+                "Argument must be a function",
+                execute_context.parent
+            ))
+        memo = function.memo
+        if memo is None:
+            return RuntimeResult().success(List([Number.of(0), Number.of(0)]))
+        return RuntimeResult().success(List([Number.of(memo.hits), Number.of(memo.misses)]))
+
+    execute_memo_stats.arg_names = ['function']
+
 
     def no_visit_method(self, node, context):
         raise Exception(f"No execute_{self.name} method defined")
@@ -611,64 +931,195 @@ BuiltInFunction.int = BuiltInFunction("int")
 BuiltInFunction.float = BuiltInFunction("float")
 BuiltInFunction.is_digit = BuiltInFunction("is_digit")
 BuiltInFunction.wait = BuiltInFunction("wait")
+BuiltInFunction.memoize = BuiltInFunction("memoize")
+BuiltInFunction.memo_stats = BuiltInFunction("memo_stats")
 
+# A list of only ints or only floats keeps them unboxed in an array, 8 bytes each instead of a Number each.
+# Elements are boxed again as they are read, and anything else that joins the list turns it back into a list of values.
+# + and * grow the store in place when the list ends where the store does and hand out a longer list over the same store,
+# so building a list one element at a time is linear. The lists over a store are shared, and change it only past their ends.
 class List(Value):
+    __slots__ = ('store', 'length', 'shared')
+
     def __init__(self, elements):
-        super().__init__()
-        self.elements = elements
+        self.store = pack(elements)
+        self.length = len(self.store)
+        self.shared = False
+
+    # The elements as values, a copy when they are packed, so changes go through append, extend and pop
+    @property
+    def elements(self):
+        store = self.trimmed_store()
+        if type(store) is list:
+            return store
+        box = BOXES[store.typecode]
+        return [box(value) for value in store]
+
+    # The store cut down to this list, a list that is not shared always ends where its store does
+    def trimmed_store(self):
+        if self.length == len(self.store):
+            return self.store
+        return self.store[:self.length]
+
+    def position(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError
+        return index
+
+    def get(self, index):
+        store = self.store
+        element = store[self.position(index)]
+        if type(store) is list:
+            return element
+        return BOXES[store.typecode](element)
+
+    # The list over store if it is still this list's store, which both lists share from then on
+    def grown_to(self, store, length):
+        if store is self.store:
+            self.shared = True
+            return shared_list(store, length)
+        return shared_list(store, length, False)
+
+    def adopt(self, store, length):
+        if store is not self.store:
+            self.store = store
+            self.shared = False
+        self.length = length
+
+    def append(self, value):
+        self.adopt(appended(self.store, self.length, value), self.length + 1)
+
+    def extend(self, other):
+        self.adopt(extended(self.store, self.length, other.store, other.length), self.length + other.length)
+
+    def pop(self, index):
+        value = self.get(index)
+        index = self.position(index)
+        if index != self.length - 1 and self.shared:
+            self.adopt(self.store[:self.length], self.length)
+        # The last element of a shared store stays for the lists that still have it
+        if not self.shared:
+            self.store.pop(index)
+        self.length -= 1
+        return value
 
     def added_to(self, other):
-        new_list = self.copy_as_true_new()
-        new_list.elements.append(other)
-        return new_list, None
-
-    def copy(self):
-        copy = List(self.elements)
-        copy.set_context(self.context)
-        copy.set_pos(self.pos_start, self.pos_end)
-        return copy
+        return self.grown_to(appended(self.store, self.length, other), self.length + 1), None
 
+    # Assignment copies lists, which only share the store until one of them changes it in a way the other would see
     def copy_as_true_new(self):
-        copy = List(self.elements[:])
-        copy.set_context(self.context)
-        copy.set_pos(self.pos_start, self.pos_end)
-        return copy
+        self.shared = True
+        return shared_list(self.store, self.length)
 
     def multiplied_by(self, other):
         if isinstance(other, List):
-            new_list = self.copy_as_true_new()
-            new_list.elements.extend(other.elements)
-            return new_list, None
+            return self.grown_to(extended(self.store, self.length, other.store, other.length), self.length + other.length), None
         else:
             return None, Value.illegal_operation(self, other)
 
     def subtracted_by(self, other):
         if isinstance(other, Number):
-            new_list = self.copy_as_true_new()
             try:
-                new_list.elements.pop(other.value)
-                return new_list, None
+                index = self.position(other.value)
             except IndexError:
-                return None, RTError(
-                    self.pos_start, self.pos_end,
-                    f"Index out of bounds",
-                    self.context
-                )
+                return None, OperationError("Index out of bounds", False)
+            # Without its last element the list is the start of the same store
+            if index == self.length - 1:
+                # Read like the copy would be popped, which a float index fails
+                self.get(other.value)
+                return self.grown_to(self.store, index), None
+            store = self.store[:self.length]
+            store.pop(index)
+            return shared_list(store, self.length - 1, False), None
         else:
             return None, Value.illegal_operation(self, other)
 
     def query_by(self, other):
         if isinstance(other, Number):
             try:
-                return self.elements[other.value], None
+                return self.get(other.value), None
             except IndexError:
-                return None, RTError(
-                    self.pos_start, self.pos_end,
-                    f"Index out of bounds",
-                    self.context
-                )
+                return None, OperationError("Index out of bounds", False)
         else:
             return None, Value.illegal_operation(self, other)
 
     def __repr__(self):
         return f"{self.elements}"
+
+
+ARRAY_TYPECODES = {Int: 'q', Float: 'd'}
+BOXES = {'q': Number.of, 'd': Float}
+
+
+# The array for elements that are all ints or all floats, ints that do not fit in 64 bits keep the list
+def pack(elements):
+    if not elements:
+        return elements
+    typecode = ARRAY_TYPECODES.get(type(elements[0]))
+    if typecode is None:
+        return elements
+    element_type = type(elements[0])
+    for element in elements:
+        if type(element) is not element_type:
+            return elements
+    try:
+        return array(typecode, [element.value for element in elements])
+    except OverflowError:
+        return elements
+
+
+def unpacked(store):
+    if type(store) is list:
+        return store[:]
+    box = BOXES[store.typecode]
+    return [box(value) for value in store]
+
+
+def shared_list(store, length, shared=True):
+    new_list = List.__new__(List)
+    new_list.store = store
+    new_list.length = length
+    new_list.shared = shared
+    return new_list
+
+
+# The first length elements of store with value after them, in store itself when nothing is past length yet
+def appended(store, length, value):
+    if length != len(store):
+        store = store[:length]
+    if type(store) is list:
+        if not store:
+            return pack([value])
+        store.append(value)
+        return store
+    if ARRAY_TYPECODES.get(type(value)) == store.typecode:
+        try:
+            store.append(value.value)
+            return store
+        except OverflowError:
+            pass
+    store = unpacked(store)
+    store.append(value)
+    return store
+
+
+# Like appended, with the first other_length elements of other_store after them
+def extended(store, length, other_store, other_length):
+    other_store = other_store[:other_length]
+    if not other_store:
+        return store
+    if not length:
+        return other_store
+    if length != len(store):
+        store = store[:length]
+    if type(store) is list:
+        store.extend(unpacked(other_store) if type(other_store) is not list else other_store)
+        return store
+    if type(other_store) is not list and other_store.typecode == store.typecode:
+        store.extend(other_store)
+        return store
+    store = unpacked(store)
+    store.extend(unpacked(other_store))
+    return store
@@ -0,0 +1,309 @@
+from fresh.compiler import Compiler, NUMBER, STRING, LOAD_NAME, STORE_NAME, BINARY, NEGATE, NOT, POP, NULL, BUILD_LIST, JUMP, \
+    POP_JUMP_IF_FALSE, FOR_SETUP, FOR_ITER, FOR_APPEND, FOR_END, WHILE_END, MAKE_FUNCTION, CALL, TAIL_CALL, RETURN, UNWIND, END_FUNCTION, END_PROGRAM, \
+    ORIGIN, TRACED_BINARY, UNWIND_BREAK, UNWIND_CONTINUE
+from fresh.context import Context
+from fresh.errors import RTError, RuntimeFailure
+from fresh.runtimeresult import RuntimeResult
+from fresh.signals import BreakSignal, ContinueSignal
+from fresh.symboltable import SymbolTable
+from fresh.values import Number, Function, List
+
+# Fresh calls do not use the Python stack here, so the VM keeps its own limit
+MAX_CALL_DEPTH = 1000
+
+
+class BytecodeFunction(Function):
+    __slots__ = ('code',)
+
+    def __init__(self, name, body_node, arguments, should_auto_return, code, memo_size=0):
+        super().__init__(name, body_node, arguments, should_auto_return, memo_size=memo_size)
+        self.code = code
+
+    def execute(self, args, context, pos_start, pos_end):
+        response = RuntimeResult()
+        memo_entry = self.memo_entry(args)
+        if memo_entry:
+            value = memo_entry[0].get(memo_entry[1])
+            if value is not None:
+                return response.success(value)
+        execute_context = self.generate_new_context(context, pos_start)
+        if len(args) == len(self.arguments):
+            self.populate_args(self.arguments, args, execute_context)
+        try:
+            return response.success(VirtualMachine().execute(Frame(self.code, execute_context, memo_entry)))
+        except RuntimeFailure as failure:
+            return response.failure(failure.error)
+        except ContinueSignal:
+            return response.success_continue()
+        except BreakSignal:
+            return response.success_break()
+
+
+class Frame:
+    __slots__ = ('code', 'context', 'stack', 'pc', 'memo_entry')
+
+    def __init__(self, code, context, memo_entry=None):
+        self.code = code
+        self.context = context
+        self.stack = []
+        self.pc = 0
+        self.memo_entry = memo_entry
+
+
+class VirtualMachine:
+    def run(self, node, context):
+        code = Compiler().compile_program(node)
+        try:
+            return self.execute(Frame(code, context)), None
+        except RuntimeFailure as failure:
+            return None, failure.error
+        except (BreakSignal, ContinueSignal):
+            return None, None
+
+    def execute(self, frame):
+        frames = []
+
+        code = frame.code
+        instructions = code.instructions
+        constants = code.constants
+        names = code.names
+        positions = code.positions
+        context = frame.context
+        stack = frame.stack
+        pc = frame.pc
+
+        while True:
+            opcode, argument, position = instructions[pc]
+            pc += 1
+
+            if opcode == LOAD_NAME:
+                name = names[argument]
+                value = context.symbol_table.get(name)
+                if not value:
+                    pos_start, pos_end = positions[position]
+                    raise RuntimeFailure(RTError(pos_start, pos_end, f'{name} is not defined.', context))
+                stack.append(value)
+
+            elif opcode == NUMBER:
+                stack.append(constants[argument])
+
+            elif opcode == BINARY:
+                right = stack.pop()
+                left = stack.pop()
+                result, error = constants[argument][type(left), type(right)](left, right)
+                if error:
+                    pos_start, pos_end, other_pos_end = positions[position]
+                    raise RuntimeFailure(error.at(pos_start, pos_end, other_pos_end, context))
+                stack.append(result)
+
+            elif opcode == ORIGIN:
+                stack.append(position)
+
+            elif opcode == TRACED_BINARY:
+                right = stack.pop()
+                right_position = stack.pop()
+                left = stack.pop()
+                left_position = stack.pop()
+                result, error = constants[argument][type(left), type(right)](left, right)
+                if error:
+                    pos_start, pos_end = positions[left_position]
+                    raise RuntimeFailure(error.at(pos_start, pos_end, positions[right_position][1], context))
+                stack.append(result)
+
+            elif opcode == POP_JUMP_IF_FALSE:
+                if not stack.pop().is_true():
+                    pc = argument
+
+            elif opcode == JUMP:
+                pc = argument
+
+            elif opcode == POP:
+                del stack[len(stack) - argument:]
+
+            elif opcode == STORE_NAME:
+                value = stack[-1]
+                if isinstance(value, List):
+                    value = stack[-1] = value.copy_as_true_new()
+                context.symbol_table.set(names[argument], value)
+
+            elif opcode == FOR_ITER:
+                state = stack[-1]
+                i = state[0]
+                if (i < state[1]) if state[3] else (i > state[1]):
+                    context.symbol_table.set(names[position], Number.of(i))
+                    state[0] = i + state[2]
+                else:
+                    pc = argument
+
+            elif opcode == FOR_APPEND:
+                value = stack.pop()
+                stack[-1][4].append(value)
+
+            elif opcode == CALL or opcode == TAIL_CALL:
+                arguments = stack[len(stack) - argument:]
+                del stack[len(stack) - argument:]
+                pos_start, pos_end, function_pos_start, function_pos_end = positions[position]
+                value_to_call = stack.pop()
+
+                if type(value_to_call) is BytecodeFunction:
+                    if opcode == TAIL_CALL:
+                        # The callee takes over the frame's context and the frame is dropped, so the call depth stays the same.
+                        # Its result is also the dropped frame's, so that is what gets remembered.
+                        execute_context = value_to_call.generate_tail_context(context, pos_start)
+                        memo_entry = frame.memo_entry
+                    else:
+                        memo_entry = value_to_call.memo_entry(arguments) if value_to_call.memo is not None else None
+                        if memo_entry:
+                            value = memo_entry[0].get(memo_entry[1])
+                            if value is not None:
+                                stack.append(value)
+                                continue
+
+                        if len(frames) >= MAX_CALL_DEPTH:
+                            raise RuntimeFailure(RTError(function_pos_start, function_pos_end, 'Max recursion depth exceeded', context))
+
+                        # Same context as BaseFunction.generate_new_context
+                        execute_context = Context(value_to_call.name, context, pos_start)
+                        execute_context.symbol_table = SymbolTable(context.symbol_table)
+                        frame.pc = pc
+                        frames.append(frame)
+
+                    # Like Function.execute, a wrong argument count leaves the arguments unset instead of failing
+                    if len(arguments) == len(value_to_call.arguments):
+                        value_to_call.populate_args(value_to_call.arguments, arguments, execute_context)
+
+                    frame = Frame(value_to_call.code, execute_context, memo_entry)
+                    code = frame.code
+                    instructions = code.instructions
+                    constants = code.constants
+                    names = code.names
+                    positions = code.positions
+                    context = execute_context
+                    stack = frame.stack
+                    pc = 0
+                    continue
+
+                response = value_to_call.execute(arguments, context, pos_start, pos_end)
+                if response.error:
+                    raise RuntimeFailure(response.error)
+                if response.loop_should_break or response.loop_should_continue:
+                    frame.pc = pc
+                    frame = self.unwind(frame, frames, UNWIND_BREAK if response.loop_should_break else UNWIND_CONTINUE)
+                    code = frame.code
+                    instructions = code.instructions
+                    constants = code.constants
+                    names = code.names
+                    positions = code.positions
+                    context = frame.context
+                    stack = frame.stack
+                    pc = frame.pc
+                    continue
+                stack.append(response.value)
+
+            elif opcode == STRING:
+                stack.append(constants[argument])
+
+            elif opcode == BUILD_LIST:
+                elements = stack[len(stack) - argument:]
+                del stack[len(stack) - argument:]
+                stack.append(List(elements))
+
+            elif opcode == NULL:
+                stack.append(Number.null)
+
+            elif opcode == NEGATE or opcode == NOT:
+                if opcode == NEGATE:
+                    result, error = stack.pop().multiplied_by(Number.of(-1))
+                else:
+                    result, error = stack.pop().notted()
+                if argument:
+                    position = stack.pop()
+                if error:
+                    pos_start, pos_end = positions[position]
+                    raise RuntimeFailure(error.at(pos_start, pos_end, pos_end, context))
+                stack.append(result)
+
+            elif opcode == FOR_SETUP:
+                step_value = stack.pop() if argument else None
+                end_value = stack.pop()
+                start_value = stack.pop()
+                # Operands are unwrapped in the same order as the tree-walker so bad ones fail the same way
+                i = start_value.value
+                step = step_value.value if step_value else 1
+                ascending = step >= 0
+                stack.append([i, end_value.value, step, ascending, []])
+
+            elif opcode == FOR_END:
+                elements = stack.pop()[4]
+                if argument:
+                    stack.append(Number.null)
+                else:
+                    stack.append(List(elements))
+
+            elif opcode == WHILE_END:
+                if argument:
+                    stack.append(Number.null)
+                else:
+                    # The tree-walker never collects the body values of a while loop either
+                    stack.append(List([]))
+
+            elif opcode == MAKE_FUNCTION:
+                template = constants[argument]
+                function_value = BytecodeFunction(
+                    template.name, template.body_node, template.arguments, template.should_auto_return, template.code,
+                    template.memo_size
+                )
+                if template.name:
+                    context.symbol_table.set(template.name, function_value)
+                stack.append(function_value)
+
+            elif opcode == RETURN or opcode == END_FUNCTION:
+                if opcode == RETURN or argument:
+                    value = stack.pop()
+                else:
+                    value = Number.null
+                if frame.memo_entry:
+                    frame.memo_entry[0].store(frame.memo_entry[1], value)
+                if not frames:
+                    # A return at the top level of the program ends it without a value, like in the interpreter
+                    return value if code.is_function else None
+
+                frame = frames.pop()
+                code = frame.code
+                instructions = code.instructions
+                constants = code.constants
+                names = code.names
+                positions = code.positions
+                context = frame.context
+                stack = frame.stack
+                pc = frame.pc
+                stack.append(value)
+
+            elif opcode == UNWIND:
+                if not frames:
+                    raise BreakSignal if argument == UNWIND_BREAK else ContinueSignal
+                frame = self.unwind(frames.pop(), frames, argument)
+                code = frame.code
+                instructions = code.instructions
+                constants = code.constants
+                names = code.names
+                positions = code.positions
+                context = frame.context
+                stack = frame.stack
+                pc = frame.pc
+
+            elif opcode == END_PROGRAM:
+                return stack.pop()
+
+    def unwind(self, frame, frames, kind):
+        # A break or continue that left a function goes to the innermost loop around one of the calls that led there
+        while True:
+            call_index = frame.pc - 1
+            for body_start, body_end, continue_target, break_target, depth in frame.code.loops:
+                if body_start <= call_index < body_end:
+                    del frame.stack[depth:]
+                    frame.pc = break_target if kind == UNWIND_BREAK else continue_target
+                    return frame
+            if not frames:
+                raise BreakSignal if kind == UNWIND_BREAK else ContinueSignal
+            frame = frames.pop()
@@ -1,25 +1,52 @@
-import sys, os
+import argparse, cProfile, pstats, sys, os
+
+from fresh.astcache import DEFAULT_CACHE_DIRECTORY
+from fresh.hotloops import HotLoop
+from fresh.memo import DEFAULT_MEMO_SIZE
+from fresh.run import run, ENGINES
+from fresh.symboltable import LookupCacheStats
+
+argument_parser = argparse.ArgumentParser(description='Run a Fresh program, or start the shell when no file is given.')
+argument_parser.add_argument('filename', nargs='?')
+argument_parser.add_argument('--debug', action='store_true', help='print the tokens of the program')
+argument_parser.add_argument('--no-cache', action='store_true', help='always lex and parse the program')
+argument_parser.add_argument('--no-optimize', action='store_true', help='run the program exactly as parsed, without folding constants or pruning dead branches')
+argument_parser.add_argument('--no-resolve', action='store_true', help='look function variables up by name instead of keeping them in numbered frames (interpreter engine only)')
+argument_parser.add_argument('--no-specialize', action='store_true', help='interpret every loop iteration instead of compiling hot numeric loops to Python (interpreter engine only)')
+argument_parser.add_argument('--engine', choices=ENGINES, default='interpreter', help='how the parsed program is executed (default: interpreter)')
+argument_parser.add_argument('--memo-size', type=int, default=DEFAULT_MEMO_SIZE, help=f'results each pure function remembers, 0 turns automatic memoization off (default: {DEFAULT_MEMO_SIZE})')
+argument_parser.add_argument('--profile', action='store_true', help='print where the time went and how often variable lookups hit their inline cache')
+argument_parser.add_argument('--cache-dir', help=f'where parsed programs are cached (default: {DEFAULT_CACHE_DIRECTORY} next to the program)')
 
-from fresh.run import run
 try:
     # get sys args
-    if len(sys.argv) > 1:
-        filename = sys.argv[1]
-        debug = False
-        if len(sys.argv) > 2:
-            debug = sys.argv[2]
-            if debug == "--debug":
-                debug = True
+    arguments = argument_parser.parse_args()
+    if arguments.filename:
+        filename = arguments.filename
+        cache_directory = None
+        if not arguments.no_cache:
+            cache_directory = arguments.cache_dir or os.path.join(os.path.dirname(os.path.abspath(filename)), DEFAULT_CACHE_DIRECTORY)
         # check if file exists
         if os.path.isfile(filename):
             with open(filename, 'r') as f:
                 text = f.read()
-                result, error = run(filename, text, debug)
+                profile = cProfile.Profile() if arguments.profile else None
+                if profile:
+                    profile.enable()
+                result, error = run(filename, text, arguments.debug, cache_directory, arguments.engine, not arguments.no_optimize, not arguments.no_resolve, arguments.memo_size,
+                                    not arguments.no_specialize)
                 if error:
                     print(error.as_string())
+                if profile:
+                    profile.disable()
+                    pstats.Stats(profile).sort_stats('cumulative').print_stats(20)
+                    # Only the interpreter engine caches lookups
+                    print(f'Variable lookups: {LookupCacheStats.hits} inline cache hits, {LookupCacheStats.misses} misses '
+                          f'({LookupCacheStats.hit_rate():.1%} hit rate)')
+                    print(f'Hot loops: {HotLoop.compiled} compiled, {HotLoop.handed_back} handed back to the interpreter')
         else:
             sys.exit(0)
     else:
         import shell
 except KeyboardInterrupt:
-    sys.exit(0)
\ No newline at end of file
+    sys.exit(0)
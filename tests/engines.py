@@ -0,0 +1,30 @@
+import contextlib
+import io
+import unittest
+
+from fresh.run import run, ENGINES
+
+
+class EngineTestCase(unittest.TestCase):
+    # Runs each program on every engine, each one ends in a list whose last element is compared by its repr
+    def assert_programs_on_every_engine(self, programs):
+        for text, expected in programs.items():
+            for engine in ENGINES:
+                with self.subTest(text=text, engine=engine):
+                    value, error = run('<test>', text, engine=engine)
+                    self.assertIsNone(error, error and error.as_string())
+                    self.assertEqual(repr(value.elements[-1]), expected)
+
+    @staticmethod
+    def run_capturing(text, engine):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            value, error = run('<test>', text, engine=engine)
+        return output.getvalue(), error and error.as_string(), repr(value)
+
+    # Runs each program on every engine, what it logs, the error with its traceback and the value must match the interpreter
+    def assert_engines_agree(self, programs):
+        for text in programs:
+            expected = self.run_capturing(text, 'interpreter')
+            for engine in ENGINES[1:]:
+                with self.subTest(text=text, engine=engine):
+                    self.assertEqual(self.run_capturing(text, engine), expected)
@@ -0,0 +1,37 @@
+import tempfile
+import unittest
+from unittest import mock
+
+from fresh import astcache
+from fresh.lexer import Lexer
+from fresh.parser import Parser
+
+TEXT = 'func f(n) -> n * 2\nf(21)'
+
+
+class ASTCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = astcache.ASTCache(directory.name)
+        self.filename = f'{directory.name}/program.fr'
+        tokens, error = Lexer(self.filename, TEXT, False).make_tokens()
+        self.cache.store(self.filename, TEXT, Parser(tokens).parse().node)
+
+    def test_stored_tree_loads_back(self):
+        self.assertIsNotNone(self.cache.load(self.filename, TEXT))
+
+    def test_changed_source_is_not_loaded(self):
+        self.assertIsNone(self.cache.load(self.filename, TEXT + '\n'))
+
+    def test_cache_of_another_fresh_version_is_not_loaded(self):
+        with mock.patch.object(astcache, 'fresh_version', return_value='another version'):
+            self.assertIsNone(self.cache.load(self.filename, TEXT))
+
+    def test_cache_of_another_python_is_not_loaded(self):
+        with mock.patch.object(astcache.sys, 'version_info', (2, 7, 18)):
+            self.assertIsNone(self.cache.load(self.filename, TEXT))
+
+
+if __name__ == '__main__':
+    unittest.main()
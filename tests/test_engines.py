@@ -0,0 +1,87 @@
+import unittest
+
+from engines import EngineTestCase
+
+LOOPS = [
+    '''set found = []
+for i = 0 to 10 then
+    if i == 2 then continue
+    if i == 6 then break
+    append(found, i)
+end
+set n = 0
+while true then
+    set n = n + 1
+    if n < 3 then continue
+    if n > 5 then break
+    log(n)
+end
+log(found)
+log(for i = 0 to 3 then for j = 0 to 3 then if j == i then break else j)
+''',
+    # A break in a called function leaves the loop of its caller
+    '''func stop(i) -> if i == 3 then break else i
+set seen = []
+for i = 0 to 10 then append(seen, stop(i))
+log(seen)
+''',
+]
+
+# A function sees the variables of whoever called it, not of where it was defined
+DYNAMIC_SCOPING = [
+    '''set x = "global"
+func show() -> x
+func with_local()
+    set x = "local"
+    return show()
+end
+log(show())
+log(with_local())
+log(x)
+''',
+    '''func outer(f) -> f(1)
+func caller(y) -> outer(func (z) -> y + z)
+log(caller(10))
+''',
+]
+
+TAIL_CALLS = [
+    '''func count(n, total) -> if n == 0 then total else count(n - 1, total + n)
+log(count(5000, 0))
+func even(n) -> if n == 0 then 1 else odd(n - 1)
+func odd(n) -> if n == 0 then 0 else even(n - 1)
+log(even(3001))
+func sum_list(list, i, total)
+    if i == len(list) then return total
+    return sum_list(list, i + 1, total + list ? i)
+end
+log(sum_list([1, 2, 3, 4], 0, 0))
+''',
+    'func down(n) -> if n == 0 then 1 / 0 else down(n - 1)\ndown(5)',
+]
+
+RUNTIME_ERRORS = [
+    'func inverse(x) -> 1 / x\nfunc run(n) -> inverse(n) + 1\nlog(run(2))\nrun(0)',
+    'set a = [1, 2]\nlog("before")\na - "x"',
+    'func f(n) -> n + missing\nlog(f(1))',
+    'set a = [1, 2, 3]\nlog(a ? 1)\na ? 7',
+    'log(len("abc", 2))',
+]
+
+
+class EngineAgreementTest(EngineTestCase):
+    def test_loops(self):
+        self.assert_engines_agree(LOOPS)
+
+    def test_dynamic_scoping(self):
+        self.assert_engines_agree(DYNAMIC_SCOPING)
+
+    def test_tail_calls(self):
+        self.assert_engines_agree(TAIL_CALLS)
+
+    def test_runtime_errors(self):
+        self.assert_engines_agree(RUNTIME_ERRORS)
+
+
+if __name__ == '__main__':
+    unittest.main()
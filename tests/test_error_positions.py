@@ -0,0 +1,78 @@
+import sys
+import unittest
+
+from fresh.run import run, ENGINES
+
+# Each program fails, the traceback and the marked source must be the same on every engine
+RUNTIME_ERRORS = {
+    'func inverse(x) -> 1 / x\nfunc run(n) -> inverse(n) + 1\nrun(0)': '''Traceback (most recent call last):
+    File <test>, line 3:1, in <program>
+    File <test>, line 2:16, in run
+    File <test>, line 1:20, in inverse
+RuntimeError: Division by zero
+Error occurred here:
+func inverse(x) -> 1 / x
+                   ^''',
+    'func f(n) -> n + missing\nset y = f(1)': '''Traceback (most recent call last):
+    File <test>, line 2:9, in <program>
+    File <test>, line 1:18, in f
+RuntimeError: missing is not defined.
+Error occurred here:
+func f(n) -> n + missing
+                 ^^^^^^^''',
+    'set a = [1, 2]\nset b = 1 + (a - "x")': '''Traceback (most recent call last):
+    File <test>, line 2:14, in <program>
+RuntimeError: Illegal operation
+Error occurred here:
+
+set b = 1 + (a - "x")
+             ^^^^^^^''',
+    'func get(list, i) -> list ? i\n[get([1], 0), get([1], 3)]': '''Traceback (most recent call last):
+    File <test>, line 2:15, in <program>
+    File <test>, line 1:22, in get
+RuntimeError: Index out of bounds
+Error occurred here:
+func get(list, i) -> list ? i
+                     ^^^^''',
+}
+
+# How deep each engine gets differs, so only the end of the error is compared. It marks the call that went too deep,
+# wherever Python happened to run out of stack, so the test moves the limit to have it run out in every frame of a call.
+RECURSION_ERRORS = {
+    'func f(n) -> (len(l) - f(n + 1))\nset l = [1]\nf(0)': 'func f(n) -> (len(l) - f(n + 1))\n                       ^',
+    'func g(n) -> str(n) + g(n + 1)\ng(0)': 'func g(n) -> str(n) + g(n + 1)\n                      ^',
+    'func h(n)\n    set x = h(len([n]) + n)\n    return x\nend\nh(0)': '\n    set x = h(len([n]) + n)\n            ^',
+}
+
+# Enough limits for Python to run out of stack inside a builtin call as well as in the recursive one, on every engine
+RECURSION_LIMIT_STEPS = 16
+
+
+class ErrorPositionTest(unittest.TestCase):
+    def error(self, text, engine):
+        value, error = run('<test>', text, engine=engine)
+        self.assertIsNotNone(error)
+        return error.as_string()
+
+    def test_runtime_errors_point_at_the_failing_node(self):
+        for text, expected in RUNTIME_ERRORS.items():
+            for engine in ENGINES:
+                with self.subTest(text=text, engine=engine):
+                    self.assertEqual(self.error(text, engine), expected)
+
+    def test_max_recursion_depth_points_at_the_recursive_call(self):
+        limit = sys.getrecursionlimit()
+        self.addCleanup(sys.setrecursionlimit, limit)
+        for text, expected in RECURSION_ERRORS.items():
+            for engine in ENGINES:
+                for extra in range(RECURSION_LIMIT_STEPS):
+                    with self.subTest(text=text, engine=engine, extra=extra):
+                        sys.setrecursionlimit(limit + extra)
+                        error = self.error(text, engine)
+                        sys.setrecursionlimit(limit)
+                        self.assertIn('RuntimeError: Max recursion depth exceeded\nError occurred here:\n', error)
+                        self.assertTrue(error.endswith(expected), error[-200:])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+
+from fresh.hotloops import HotLoop, HOT_LOOP_THRESHOLD
+from fresh.run import run
+
+ITERATIONS = HOT_LOOP_THRESHOLD * 4
+
+# Each program is run with and without hot loop compilation, values and errors have to match
+PROGRAMS = [
+    f'''set total = 0
+for i = 0 to {ITERATIONS} then set total = total + i * 2 - i / 4
+[total, i]
+''',
+    f'''set total = 0.5
+for i = {ITERATIONS} to 0 step -1.5 then
+    set total = total + i ^ 2
+    if total > 1000 and i > 3 then set total = total / 3 elif not total then set total = 1 else set total = -total
+end
+[total, i]
+''',
+    f'''set xs = [1, 2.5, 3, 4]
+set t = 0
+set j = 0
+set collected = for i = 0 to {ITERATIONS} then set j = if j == 3 then 0 else j + 1
+for i = 0 to {ITERATIONS} then
+    set t = t + xs ? j * 2 - xs ? (3 - j)
+    set j = j + 1
+    if j == 4 then set j = 0
+end
+[t, j, i, len(collected)]
+''',
+    f'''set n = 0
+set a = 1
+while n < {ITERATIONS} then
+    set n = n + 1
+    set a = a * 3
+    if a > 1000 then set a = a - 1000
+end
+[n, a]
+''',
+    # A loop the interpreter has to take back when the list holds something else than a number
+    f'''set xs = [1, 2, 3, 4]
+for i = 0 to {ITERATIONS} then append(xs, 1)
+append(xs, "x")
+set t = 0
+for i = 0 to len(xs) then set t = t + xs ? i
+t
+''',
+    f'''set t = 0
+for i = {ITERATIONS} to 0 step -1 then set t = t + 1 / (i - {HOT_LOOP_THRESHOLD * 2})
+t
+''',
+    # Locals in resolved frames, a temporary set before it is read and an argument read from the caller's frame
+    f'''func f(n)
+    set total = 0
+    set square = -1
+    for i = 0 to n then
+        set square = i * i
+        set total = total + square - limit
+    end
+    return [total, square]
+end
+set limit = 3
+[f({ITERATIONS}), f(0), f({ITERATIONS} + 1)]
+''',
+]
+
+
+class HotLoopTest(unittest.TestCase):
+    def outcome(self, text, specialize):
+        value, error = run('<test>', text, specialize=specialize)
+        if error:
+            return error.as_string()
+        return repr(value.elements[-1])
+
+    def test_compiled_loops_match_interpreter(self):
+        for text in PROGRAMS:
+            with self.subTest(text=text):
+                compiled = HotLoop.compiled
+                self.assertEqual(self.outcome(text, True), self.outcome(text, False))
+                self.assertGreater(HotLoop.compiled, compiled)
+
+    def test_unsupported_loop_stays_interpreted(self):
+        text = f'set s = ""\nfor i = 0 to {ITERATIONS} then set s = s + "a"\nlen(s)'
+        compiled = HotLoop.compiled
+        self.assertEqual(self.outcome(text, True), str(ITERATIONS))
+        self.assertEqual(HotLoop.compiled, compiled)
+
+
+if __name__ == '__main__':
+    unittest.main()
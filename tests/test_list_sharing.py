@@ -0,0 +1,68 @@
+import unittest
+
+from fresh.values import List, Number, String
+
+from engines import EngineTestCase
+
+# Lists built from each other by + - and * must not see what is later done to the others
+PROGRAMS = {
+    '''set a = [1, 2]
+set b = a + 3
+set c = a + 4
+[a, b, c]''': '[[1, 2], [1, 2, 3], [1, 2, 4]]',
+    '''set a = [1, 2, 3]
+set b = a - -1
+append(b, "x")
+[a, b]''': '[[1, 2, 3], [1, 2, x]]',
+    '''set a = [1, 2, 3]
+set b = a * [4]
+pop(a, 0)
+append(a, 5)
+[a, b]''': '[[2, 3, 5], [1, 2, 3, 4]]',
+    '''func build(list, i) -> if i == 0 then list else build(list + i, i - 1)
+set a = build([], 5)
+[a, pop(a, 0), a - 0, a]''': '[[4, 3, 2, 1], 5, [3, 2, 1], [4, 3, 2, 1]]',
+    '''set a = [3, 1, 2]
+func take(list)
+    set list_ = list
+    pop(list_, 1)
+    extend(list_, ["y"])
+    return list_
+end
+set b = a
+append(b, 4)
+[a, b, take(a), a]''': '[[3, 1, 2], [3, 1, 2, 4], [3, 2, y], [3, 1, 2]]',
+}
+
+
+class ListSharingTest(EngineTestCase):
+    def test_functional_append_shares_the_store(self):
+        first = List([Number.of(1)])
+        second, _ = first.added_to(Number.of(2))
+        third, _ = second.added_to(String('x'))
+        self.assertIs(second.store, first.store)
+        self.assertEqual((repr(first), repr(second), repr(third)), ('[1]', '[1, 2]', '[1, 2, x]'))
+
+    def test_mutating_a_shared_list_leaves_the_others(self):
+        first = List([Number.of(1), Number.of(2)])
+        second, _ = first.added_to(Number.of(3))
+        shorter, _ = second.subtracted_by(Number.of(-1))
+        second.pop(0)
+        shorter.append(Number.of(4))
+        first.extend(first)
+        self.assertEqual([repr(list_) for list_ in (first, second, shorter)], ['[1, 2, 1, 2]', '[2, 3]', '[1, 2, 4]'])
+
+    def test_assignment_shares_until_changed(self):
+        original = List([Number.of(1), Number.of(2), Number.of(3)])
+        copy = original.copy_as_true_new()
+        self.assertIs(copy.store, original.store)
+        copy.pop(0)
+        self.assertIsNot(copy.store, original.store)
+        self.assertEqual((repr(original), repr(copy)), ('[1, 2, 3]', '[2, 3]'))
+
+    def test_programs_on_every_engine(self):
+        self.assert_programs_on_every_engine(PROGRAMS)
+
+
+if __name__ == '__main__':
+    unittest.main()
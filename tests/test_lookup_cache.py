@@ -0,0 +1,83 @@
+import unittest
+
+from fresh.run import run
+from fresh.symboltable import LookupCacheStats
+
+# g finds x in the global table first, then in the table of f that called it, then in the global table again
+SHADOWED = '''set x = 1
+func g() -> x
+func f(x) -> g() + 0
+func h()
+    set x = 3
+    return g() + 0
+end
+[g(), f(2), g(), h(), g()]
+'''
+
+REBOUND = '''func answer() -> 1
+func ask() -> answer()
+set first = ask()
+func answer() -> 2
+[first, ask()]
+'''
+
+LOOP = '''set total = 0
+for i = 0 to 100 then set total = total + len("ab")
+total
+'''
+
+# total is a local of sum_up, which keeps it from being cached while the program runs
+LOCAL_TOTAL = '''func sum_up(n)
+    set total = n
+    return total
+end
+sum_up(1)
+'''
+
+# g reads x from the global table until slot_caller has set its own x. The second run calls slot_caller again,
+# after the pins of the first run were dropped.
+DEFINE_SLOT_CALLER = '''set x = "global"
+func g() -> x
+func slot_caller()
+    set before = g()
+    set x = "local"
+    return [before, g()]
+end
+slot_caller()
+'''
+
+
+class LookupCacheTest(unittest.TestCase):
+    def run_program(self, text, **options):
+        value, error = run('<test>', text, **options)
+        self.assertIsNone(error, error and error.as_string())
+        return value.elements[-1]
+
+    def test_callers_shadow_cached_globals(self):
+        for resolve in (True, False):
+            with self.subTest(resolve=resolve):
+                value = self.run_program(SHADOWED, resolve=resolve)
+                self.assertEqual([element.value for element in value.elements], [1, 2, 1, 3, 1])
+
+    def test_rebound_global_is_seen(self):
+        value = self.run_program(REBOUND)
+        self.assertEqual([element.value for element in value.elements], [1, 2])
+
+    def test_loop_lookups_hit(self):
+        hits, misses = LookupCacheStats.hits, LookupCacheStats.misses
+        self.assertEqual(self.run_program(LOOP).value, 200)
+        # total and len are found once and then answered by the cache
+        self.assertGreater(LookupCacheStats.hits - hits, 190)
+        self.assertLess(LookupCacheStats.misses - misses, 10)
+
+    def test_pins_do_not_outlive_their_run(self):
+        self.run_program(LOCAL_TOTAL)
+        self.test_loop_lookups_hit()
+
+    def test_functions_from_earlier_runs_pin_again(self):
+        self.assertEqual(repr(self.run_program(DEFINE_SLOT_CALLER)), '[global, local]')
+        self.assertEqual(repr(self.run_program('slot_caller()')), '[global, local]')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import contextlib
+import io
+import unittest
+
+from fresh.run import run, ENGINES, global_symbol_table
+from fresh.values import BuiltInFunction
+
+FIB = '''func fib(n)
+    if n < 2 then return n
+    return fib(n - 1) + fib(n - 2)
+end
+fib(60)
+memo_stats(fib)
+'''
+
+# Each function is impure for a different reason, so none of them may be remembered
+IMPURE = '''set offset = 1
+func logs(n)
+    log(n)
+    return n
+end
+func reads_outer(n) -> n + offset
+func rolls(n) -> random_int(n, n)
+func appends(n) -> append([], n)
+func calls_other(n) -> logs(n)
+func breaks(n)
+    break
+end
+logs(1)
+reads_outer(1)
+rolls(1)
+appends(1)
+calls_other(1)
+[memo_stats(logs), memo_stats(reads_outer), memo_stats(rolls), memo_stats(appends), memo_stats(calls_other), memo_stats(breaks)]
+'''
+
+OPT_IN = '''set offset = 1
+func reads_outer(n) -> n + offset
+memoize(reads_outer)
+reads_outer(1)
+set offset = 2
+reads_outer(1)
+memo_stats(reads_outer)
+'''
+
+EVICTION = '''func square(n) -> n * n
+square(1)
+square(2)
+square(3)
+square(1)
+square(3)
+memo_stats(square)
+'''
+
+# 1 and 1.0 or 0.0 and -0.0 would be one key to Python, but give different results in Fresh
+NUMBER_KEYS = '''func describe(n) -> str(n)
+set zero = 0.0
+[describe(1), describe(1.0), describe(zero), describe(-zero)]
+'''
+
+# Scoping is dynamic, so a caller can rebind the name a function calls itself or a builtin by
+REBOUND_SELF = '''func f(n) -> if n < 1 then 1 else f(n - 1) + 1
+func outer(f, g) -> g(3) + 0
+log(outer(func (n) -> 1000, f))
+log(f(3))
+'''
+
+REBOUND_BUILTIN = '''func str(x) -> log(x)
+func p(n) -> str(n) + 0
+p(1)
+p(1)
+p(1)
+'''
+
+# Lines run one at a time against the same global table, like the shell does, so no run sees the bindings of the others
+REBOUND_BETWEEN_RUNS = (
+    (['func h(n) -> len(n)', 'log(h("abc"))', 'func len(x) -> 99', 'log(h("abc"))'], ['3', '99']),
+    (['func f(n) -> if n < 1 then 0 else f(n - 1) + 1', 'set g = f', 'log(g(3))', 'func f(n) -> 98', 'log(g(3))'], ['3', '99']),
+    (['func h(n) -> len(n)', 'func k(len) -> h("abc") + 0', 'log(h("abc"))', 'log(k(func (x) -> 7))', 'log(h("abc"))'], ['3', '7', '3']),
+)
+
+
+class MemoTest(unittest.TestCase):
+    def run_program(self, text, engine, **options):
+        value, error = run('<test>', text, engine=engine, **options)
+        self.assertIsNone(error, error and error.as_string())
+        return value.elements[-1]
+
+    @staticmethod
+    def stats(value):
+        return [element.value for element in value.elements]
+
+    def test_pure_function_is_memoized(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                value, error = run('<test>', FIB, engine=engine)
+                self.assertIsNone(error, error and error.as_string())
+                self.assertEqual(value.elements[-2].value, 1548008755920)
+                self.assertEqual(self.stats(value.elements[-1]), [58, 61])
+
+    def test_memo_size_zero_turns_memoization_off(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                self.assertEqual(self.stats(self.run_program('func f(n) -> n\nf(1)\nf(1)\nmemo_stats(f)', engine, memo_size=0)), [0, 0])
+
+    def test_impure_functions_are_not_memoized(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                value = self.run_program(IMPURE, engine)
+                self.assertEqual([self.stats(stats) for stats in value.elements], [[0, 0]] * 6)
+
+    def test_memoize_opts_in(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                self.assertEqual(self.stats(self.run_program(OPT_IN, engine)), [1, 1])
+
+    def test_least_recently_used_is_evicted(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                # With room for two results, square(1) is dropped by square(3) and square(3) is still there
+                self.assertEqual(self.stats(self.run_program(EVICTION, engine, memo_size=2)), [1, 4])
+
+    def test_number_keys_keep_their_type(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                value = self.run_program(NUMBER_KEYS, engine)
+                self.assertEqual(self.stats(value), ['1', '1.0', '0.0', '-0.0'])
+
+    def test_rebound_names_are_not_memoized(self):
+        # The program rebinds str in the global table the other tests share
+        self.addCleanup(global_symbol_table.set, 'str', BuiltInFunction.str)
+        for text, expected in ((REBOUND_SELF, ['1001', '4']), (REBOUND_BUILTIN, ['1', '1', '1'])):
+            for engine in ENGINES:
+                with self.subTest(text=text, engine=engine):
+                    with contextlib.redirect_stdout(io.StringIO()) as output:
+                        self.run_program(text, engine)
+                    self.assertEqual(output.getvalue().split(), expected)
+
+    def test_names_rebound_by_other_runs_are_not_memoized(self):
+        self.addCleanup(global_symbol_table.set, 'len', BuiltInFunction.len)
+        for lines, expected in REBOUND_BETWEEN_RUNS:
+            for engine in ENGINES:
+                with self.subTest(lines=lines, engine=engine):
+                    global_symbol_table.set('len', BuiltInFunction.len)
+                    with contextlib.redirect_stdout(io.StringIO()) as output:
+                        for line in lines:
+                            value, error = run('<shell>', line, engine=engine)
+                            self.assertIsNone(error, error and error.as_string())
+                    self.assertEqual(output.getvalue().split(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from array import array
+
+from fresh.values import List, Int, Float, String, Number
+
+from engines import EngineTestCase
+
+# Each program ends in a list whose elements are compared as their repr on every engine
+PROGRAMS = {
+    'set a = [1, 2, 3]; a + 4': '[1, 2, 3, 4]',
+    'set a = [1, 2, 3]; a + 4.5': '[1, 2, 3, 4.5]',
+    'set a = [1, 2]; a * [3, 4]': '[1, 2, 3, 4]',
+    'set a = [1.5]; a * [2.5, "x"]': '[1.5, 2.5, x]',
+    'set a = [1, 2, 3]; a - -1': '[1, 2]',
+    'set a = [1, 2, 3]; append(a, "s"); a': '[1, 2, 3, s]',
+    'set a = [1, 2]; extend(a, a); extend(a, [0.5]); a': '[1, 2, 1, 2, 0.5]',
+    'set a = [1, 2, 3]; [pop(a, 0), len(a), a ? -1]': '[1, 2, 3]',
+    'set a = [9223372036854775807]; a + 9223372036854775808': '[9223372036854775807, 9223372036854775808]',
+}
+
+
+class PackedListTest(EngineTestCase):
+    def test_homogeneous_numbers_are_packed(self):
+        self.assertEqual(List([Number.of(1), Number.of(2)]).store, array('q', [1, 2]))
+        self.assertEqual(List([Float(0.5)]).store, array('d', [0.5]))
+        for elements in ([], [Number.of(1), Float(0.5)], [String('a')], [Number.of(2 ** 64)]):
+            with self.subTest(elements=elements):
+                self.assertIs(type(List(elements).store), list)
+
+    def test_elements_are_boxed_on_access(self):
+        list_ = List([Float(0.5), Float(-0.0)])
+        value, error = list_.query_by(Number.of(1))
+        self.assertIsNone(error)
+        self.assertIs(type(value), Float)
+        self.assertEqual(repr(value), '-0.0')
+        self.assertIs(List([Number.of(7)]).get(0), Number.of(7))
+
+    def test_heterogeneous_append_unpacks(self):
+        list_ = List([])
+        list_.append(Number.of(3))
+        self.assertEqual(list_.store, array('q', [3]))
+        list_.append(Float(1.5))
+        self.assertEqual([type(element) for element in list_.store], [Int, Float])
+        self.assertEqual(repr(list_), '[3, 1.5]')
+
+    def test_operations_on_every_engine(self):
+        self.assert_programs_on_every_engine(PROGRAMS)
+
+
+if __name__ == '__main__':
+    unittest.main()
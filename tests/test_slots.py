@@ -0,0 +1,32 @@
+import unittest
+
+from fresh.closurecompiler import CompiledFunction
+from fresh.context import Context
+from fresh.position import Position, SourceFile
+from fresh.runtimeresult import RuntimeResult
+from fresh.symboltable import SymbolTable, Frame
+from fresh.tokens import Token, TT_INT
+from fresh.transpile import TranspiledFunction
+from fresh.values import Number, String, List, Function, BuiltInFunction
+from fresh.vm import BytecodeFunction
+
+SOURCE = SourceFile('<test>', '')
+
+
+class SlotsTest(unittest.TestCase):
+    def test_runtime_objects_have_no_dict(self):
+        objects = [
+            Number.of(2 ** 70), Number.of(0.5), Number.of(1j), Number.of(3), String('a'), List([]),
+            Function('f', None, [], True), BuiltInFunction('log'),
+            CompiledFunction('f', None, [], True, None), TranspiledFunction('f', None, [], True, None),
+            BytecodeFunction('f', None, [], True, None),
+            Context('<test>'), SymbolTable(), Frame(['a']), RuntimeResult(),
+            Token(TT_INT, 1), Position(0, SOURCE), SOURCE,
+        ]
+        for value in objects:
+            with self.subTest(type=type(value).__name__):
+                self.assertFalse(hasattr(value, '__dict__'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from fresh.values import String, SHORT_STRING_MAX
+
+from engines import EngineTestCase
+
+LONG = 'x' * SHORT_STRING_MAX
+
+# Each program ends in a list whose repr is compared on every engine
+PROGRAMS = {
+    '''set s = "a"
+set t = s + "b"
+set u = s + "c"
+[t, u, t + u, len(t + u), s]''': '[ab, ac, abac, 4, a]',
+    '''set s = ""
+set n = 0
+while n < 5 then
+    set s = s + str(n)
+    set n = n + 1
+end
+[s == "01234", s - "3", int(s + "5"), float(s + ".5")]''': '[1, 0124, 12345, 1234.5]',
+    '''func build(s, n) -> if n == 0 then s else build(s + "ab", n - 1)
+set s = build("", 1000)
+[len(s), s * 0, if "" + "" then 1 else 0]''': '[2000, , 0]',
+}
+
+
+class StringBuildingTest(EngineTestCase):
+    def test_concatenation_joins_on_first_read(self):
+        start = String(LONG)
+        longer, _ = start.added_to(String('b'))
+        longest, _ = longer.added_to(String('c'))
+        self.assertIsNone(longest.text)
+        self.assertIs(longest.pieces, longer.pieces)
+        self.assertEqual(longest.value, LONG + 'bc')
+        self.assertIsNone(longest.pieces)
+
+    def test_short_concatenation_is_joined_right_away(self):
+        joined, _ = String('a').added_to(String('b'))
+        self.assertEqual((joined.text, joined.pieces), ('ab', None))
+
+    def test_strings_over_the_same_pieces_stay_apart(self):
+        start, _ = String(LONG).added_to(String('b'))
+        first, _ = start.added_to(String('c'))
+        second, _ = start.added_to(String('d'))
+        third, _ = first.added_to(String('e'))
+        self.assertEqual([repr(string)[len(LONG):] for string in (start, first, second, third)], ['b', 'bc', 'bd', 'bce'])
+
+    def test_programs_on_every_engine(self):
+        self.assert_programs_on_every_engine(PROGRAMS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+from fresh.run import run, ENGINES
+
+TAIL_DEPTH = 1000000
+
+COUNT_DOWN = f'''func count(n, total)
+    if n == 0 then return total
+    return count(n - 1, total + 2)
+end
+count({TAIL_DEPTH}, 0)
+'''
+
+# Arrow functions and calls between two functions take the same path
+PING_PONG = f'''func ping(n) -> if n == 0 then "ping" else pong(n - 1)
+func pong(n) -> if n == 0 then "pong" else ping(n - 1)
+ping({TAIL_DEPTH + 1})
+'''
+
+# Each chain is run once as written and once with its recursive calls made non-tail by an operation that never runs
+FAILING_CHAINS = [
+    '''func f(n)
+    if n == 0 then return 1 / 0
+    return f(n - 1)
+end
+func start() -> f(6)
+log(start())
+''',
+    '''func f(n) -> if n == 0 then 1 / 0 else g(n - 1)
+func g(n)
+    if n == 0 then return int("x")
+    return f(n - 1)
+end
+func outer() -> 1 + f(5)
+log(outer())
+''',
+]
+
+
+def non_tail(text):
+    return text.replace('f(n - 1)', 'f(n - 1) + 0').replace('g(n - 1)', 'g(n - 1) + 0')
+
+
+class TailCallTest(unittest.TestCase):
+    def run_program(self, text, engine):
+        value, error = run('<test>', text, engine=engine)
+        self.assertIsNone(error, error and error.as_string())
+        return value.elements[-1].value
+
+    def test_deep_tail_recursion(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                self.assertEqual(self.run_program(COUNT_DOWN, engine), 2 * TAIL_DEPTH)
+
+    def test_deep_mutual_tail_recursion(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                self.assertEqual(self.run_program(PING_PONG, engine), 'pong')
+
+    def test_traceback_through_tail_calls(self):
+        for engine in ENGINES:
+            for text in FAILING_CHAINS:
+                with self.subTest(engine=engine, text=text):
+                    _, tail_error = run('<test>', text, engine=engine)
+                    _, error = run('<test>', non_tail(text), engine=engine)
+                    self.assertIsNotNone(error)
+                    self.assertEqual(tail_error.generate_traceback(), error.generate_traceback())
+                    self.assertEqual(tail_error.details, error.details)
+
+
+if __name__ == '__main__':
+    unittest.main()